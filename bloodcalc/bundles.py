@@ -0,0 +1,270 @@
+"""
+Per-page asset bundles.
+
+A page gets the stylesheets and scripts of ASSETS whose marker occurs in
+its template or in the templates it extends and includes, assets without
+a marker are used on every page. `build` concatenates the local files of
+every page into bundles under BUNDLES_ROOT and writes a manifest, the
+{% page_assets %} tag includes the bundles of the rendered page, or the
+files one by one when there is no manifest or DEBUG is on.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+
+
+Asset = namedtuple('Asset', ['kind', 'files', 'marker'])
+
+AMCHARTS = 'https://www.amcharts.com/lib/4/'
+
+PAGE_STYLES = (
+    ('users', 'login', range(1, 7)),
+    ('error', 'error', range(3, 7)),
+    ('wizard', 'wizard', range(1, 5))
+)
+
+ASSETS = (
+    Asset('css', ('plugins/global/plugins.bundle.css', 'css/style.bundle.css', 'css/custom_styles.css'), None),
+    Asset('js', (
+        'js/jquery-3.3.1.min.js', 'js/bootstrap.min.js', 'js/mdb.min.js', 'js/popper.min.js',
+        'plugins/global/plugins.bundle.js', 'js/scripts.bundle.js'
+    ), None),
+    Asset('css', ('plugins/custom/prismjs/prismjs.bundle.css',), r'class="[^"]*\blanguage-'),
+    Asset('js', ('js/modules/parallax.min.js',), r'\bdata-parallax\b'),
+    Asset('js', tuple(AMCHARTS + name for name in (
+        'core.js', 'charts.js', 'themes/material.js', 'themes/animated.js'
+    )), r'\bam4(core|charts|themes)\b'),
+) + tuple(
+    Asset('css', (f'css/pages/{group}/{name}-{number}.css',), rf'class="[^"]*\b{name}-{number}\b')
+    for group, name, numbers in PAGE_STYLES for number in numbers
+)
+
+KINDS = ('css', 'js')
+
+PREFIX = 'bundles'
+
+MANIFEST_NAME = 'manifest.json'
+
+TEMPLATE_REFERENCE = re.compile(r"""{%\s*(?:extends|include)\s+['"]([^'"]+)['"]""")
+
+PAGE_ASSETS_TAG = re.compile(r'{%\s*page_assets\b')
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)""")
+
+CSS_CHARSET = re.compile(r'@charset\s+"[^"]*";\s*')
+
+SOURCE_MAP = re.compile(r'/\*#\s*sourceMappingURL=[^*]*\*/|^//#\s*sourceMappingURL=.*$', re.M)
+
+BUNDLE_NAME = re.compile(r'^[0-9a-f]{12}\.(css|js)$')
+
+
+def is_external(name):
+    return name.startswith(('http:', 'https:', '//'))
+
+
+def template_directories():
+    directories = [directory for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    return directories + list(get_app_template_dirs('templates'))
+
+
+def template_names():
+    """
+    Returns names of all templates of the template directories.
+    """
+    names = set()
+    for directory in template_directories():
+        for root, _, files in os.walk(directory):
+            for file in files:
+                names.add(os.path.relpath(os.path.join(root, file), directory).replace(os.sep, '/'))
+    return names
+
+
+def template_closure(name, seen=None):
+    """
+    Returns sources of the template and of the templates it extends and
+    includes by a literal name, templates that cannot be found are skipped.
+    """
+    seen = set() if seen is None else seen
+    if not name or name in seen:
+        return ''
+    seen.add(name)
+    try:
+        source = get_template(name).template.source
+    except TemplateDoesNotExist:
+        return ''
+    parts = [source]
+    for reference in TEMPLATE_REFERENCE.findall(source):
+        parts.append(template_closure(reference, seen))
+    return '\n'.join(parts)
+
+
+def page_asset_list(name):
+    source = template_closure(name)
+    return [asset for asset in ASSETS if asset.marker is None or re.search(asset.marker, source)]
+
+
+def find_assets(name):
+    assets = {kind: [] for kind in KINDS}
+    for asset in page_asset_list(name):
+        assets[asset.kind].extend(asset.files)
+    return assets
+
+
+cached_assets = lru_cache(maxsize=None)(find_assets)
+
+
+def assets_for(name):
+    """
+    Returns {kind: files} of the assets the page needs. Templates do not
+    change without a restart in production, so the scan is cached there.
+    """
+    if settings.DEBUG:
+        return find_assets(name)
+    return cached_assets(name)
+
+
+def page_templates():
+    """
+    Returns names of templates rendered as pages: they include assets with
+    {% page_assets %} and are not extended or included by other templates.
+    """
+    names = template_names()
+    referenced = set()
+    for name in names:
+        referenced.update(TEMPLATE_REFERENCE.findall(template_closure(name)))
+    return [
+        name for name in sorted(names - referenced)
+        if PAGE_ASSETS_TAG.search(template_closure(name))
+    ]
+
+
+def rebase_css(content, name):
+    """
+    Rewrites relative url() of the stylesheet so they resolve from the
+    bundles directory.
+    """
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(posixpath.dirname(name), url))
+        return f'url({quote}{posixpath.relpath(url, PREFIX)}{quote})'
+    return CSS_URL.sub(rebase, content)
+
+
+def concatenate(kind, files):
+    parts = []
+    for name in files:
+        with open(finders.find(name), encoding='utf-8') as file:
+            content = SOURCE_MAP.sub('', file.read())
+        if kind == 'css':
+            parts.append(rebase_css(CSS_CHARSET.sub('', content), name))
+        else:
+            parts.append(content)
+    if kind == 'css':
+        return '@charset "UTF-8";\n' + '\n'.join(parts)
+    return '\n;\n'.join(parts)
+
+
+def bundle_root():
+    return getattr(settings, 'BUNDLES_ROOT', None)
+
+
+def write_bundle(root, kind, files):
+    """
+    Concatenates the local files into one bundle named by its content,
+    returns its static name and the external URLs.
+    """
+    local = [name for name in files if not is_external(name) and finders.find(name)]
+    names = []
+    if local:
+        content = concatenate(kind, local).encode('utf-8')
+        file = f'{hashlib.md5(content).hexdigest()[:12]}.{kind}'
+        with open(os.path.join(root, file), 'wb') as output:
+            output.write(content)
+        names.append(posixpath.join(PREFIX, file))
+    return names + [name for name in files if is_external(name)]
+
+
+def build(root=None):
+    """
+    Writes bundles of every page and their manifest, returns the manifest.
+    Assets used on every page go to one shared bundle, so browsers download
+    them once, assets of the page go to a second one. Files that cannot be
+    found are left out of the bundles.
+    """
+    root = root or bundle_root()
+    os.makedirs(root, exist_ok=True)
+    for file in os.listdir(root):
+        if BUNDLE_NAME.match(file):
+            os.remove(os.path.join(root, file))
+
+    manifest = {}
+    for page in page_templates():
+        assets = page_asset_list(page)
+        manifest[page] = {}
+        for kind in KINDS:
+            shared = [name for asset in assets if asset.kind == kind and asset.marker is None for name in asset.files]
+            own = [name for asset in assets if asset.kind == kind and asset.marker is not None for name in asset.files]
+            manifest[page][kind] = write_bundle(root, kind, shared) + write_bundle(root, kind, own)
+
+    with open(os.path.join(root, MANIFEST_NAME), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+_manifests = {}
+
+
+def load_manifest():
+    """
+    Returns the manifest written by `build`, an empty one if there is none.
+    It is read again when the file changes.
+    """
+    root = bundle_root()
+    if not root:
+        return {}
+    path = os.path.join(root, MANIFEST_NAME)
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _manifests.get(path, (None,))[0] != modified:
+        with open(path, encoding='utf-8') as file:
+            _manifests[path] = (modified, json.load(file))
+    return _manifests[path][1]
+
+
+def page_files(name, kind):
+    """
+    Returns the static names and external URLs to include on the page.
+    """
+    if not settings.DEBUG:
+        page = load_manifest().get(name)
+        if page is not None:
+            return page[kind]
+    return assets_for(name)[kind]
+
+
+def referenced():
+    """
+    Returns names of the local files pages include, bundled or not.
+    """
+    names = set()
+    for page in page_templates():
+        for files in find_assets(page).values():
+            names.update(name for name in files if not is_external(name))
+    for page in load_manifest().values():
+        for files in page.values():
+            names.update(name for name in files if not is_external(name))
+    return names
@@ -61,6 +61,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {
+                'bundles': 'bloodcalc.templatetags.bundles',
+            },
         },
     },
 ]
@@ -108,8 +111,19 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'src')]
+
 STATIC_ROOT = '/home/olessyakhussainova/Blood_calc/static'
 
+STATICFILES_FINDERS = [
+    'bloodcalc.staticfiles.ReferencedFilesFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder'
+]
+
+STATICFILES_STORAGE = 'bloodcalc.staticfiles.CompressedManifestStaticFilesStorage'
+
+BUNDLES_ROOT = os.path.join(BASE_DIR, 'src', 'bundles')
+
 
 SITE_ID = 1
 
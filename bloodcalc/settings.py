@@ -66,6 +66,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {
+                'bundles': 'bloodcalc.templatetags.bundles',
+            },
         },
     },
 ]
@@ -85,6 +88,14 @@ DATABASES = {
 }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bloodcalc'
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,6 +129,15 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'src')]
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+STATICFILES_FINDERS = [
+    'bloodcalc.staticfiles.ReferencedFilesFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder'
+]
+
+STATICFILES_STORAGE = 'bloodcalc.staticfiles.CompressedManifestStaticFilesStorage'
+
+BUNDLES_ROOT = os.path.join(BASE_DIR, 'src', 'bundles')
+
 
 SITE_ID = 1
 
@@ -0,0 +1,177 @@
+"""
+Static files pipeline.
+
+collectstatic copies only the files of STATICFILES_DIRS referenced by
+templates or page bundles, directly or through url() and @import of
+referenced CSS. The files are stored under content hashed names, CSS is
+minified and text files get .gz and, when brotli is installed, .br copies
+next to them. STATIC_ROOT is served by the web server configured with
+deploy/nginx/static.conf, which picks the precompressed copies and caches
+hashed names for a year.
+"""
+import gzip
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from bloodcalc import bundles
+
+
+STATIC_TAG = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+
+CSS_REFERENCE = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)|@import\s+['"]([^'"]+)['"]""")
+
+CSS_SPACE = re.compile(r'\s*([{};,])\s*')
+
+COMPRESSED_TYPES = ('.css', '.js', '.svg', '.eot', '.ttf', '.ico', '.json', '.txt')
+
+MIN_COMPRESS_SIZE = 1024
+
+
+def template_references():
+    """
+    Returns names of static files used with {% static %} in templates.
+    """
+    names = set()
+    for directory in bundles.template_directories():
+        for root, _, files in os.walk(directory):
+            for file in files:
+                with open(os.path.join(root, file), encoding='utf-8', errors='ignore') as template:
+                    names.update(STATIC_TAG.findall(template.read()))
+    return names
+
+
+def css_references(path, name):
+    """
+    Returns names of files the stylesheet refers to with url() and @import,
+    resolved against its own name.
+    """
+    with open(path, encoding='utf-8', errors='ignore') as file:
+        content = file.read()
+
+    names = set()
+    for match in CSS_REFERENCE.finditer(content):
+        url = (match.group(1) or match.group(2)).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+            continue
+        url = url.split('?')[0].split('#')[0]
+        names.add(posixpath.normpath(posixpath.join(posixpath.dirname(name), url)))
+    return names
+
+
+def minify_css(content):
+    """
+    Removes comments and whitespace around braces, semicolons and commas,
+    strings are kept as they are.
+    """
+    parts = re.split(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)''', content, flags=re.S)
+    result = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            if not part.startswith('/*'):
+                result.append(part)
+        else:
+            part = CSS_SPACE.sub(r'\1', re.sub(r'\s+', ' ', part))
+            result.append(part.replace(';}', '}'))
+    return ''.join(result).strip()
+
+
+class ReferencedFilesFinder(FileSystemFinder):
+    """
+    Lists only the files of STATICFILES_DIRS used by templates and page
+    bundles, so unused plugins, page styles and source maps are not
+    collected. Every file can still be found by name, e.g. by the
+    development server.
+    """
+
+    def referenced(self):
+        names = set()
+        pending = list(template_references() | bundles.referenced())
+        while pending:
+            name = pending.pop()
+            if name in names:
+                continue
+            path = self.find(name)
+            if not path:
+                continue
+            names.add(name)
+            if name.endswith('.css'):
+                pending.extend(css_references(path, name))
+        return names
+
+    def list(self, ignore_patterns):
+        referenced = self.referenced()
+        for path, storage in super().list(ignore_patterns):
+            name = path.replace(os.sep, '/')
+            if storage.prefix:
+                name = posixpath.join(storage.prefix, name)
+            if name in referenced:
+                yield path, storage
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that minifies hashed CSS and writes compressed
+    copies of hashed text files. References to missing files, e.g. images of
+    plugins the bundles were built with, are left unhashed instead of
+    failing collectstatic or the page.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        convert = super().url_converter(name, hashed_files, template)
+
+        def converter(matchobj):
+            try:
+                return convert(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+        return converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith('.css'):
+                self.minify(hashed_name)
+            if hashed_name.endswith(COMPRESSED_TYPES):
+                self.compress(hashed_name)
+
+    def minify(self, name):
+        with self.open(name) as file:
+            content = file.read().decode('utf-8')
+        self.delete(name)
+        self._save(name, ContentFile(minify_css(content).encode('utf-8')))
+
+    def compress(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
@@ -0,0 +1,24 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from bloodcalc.bundles import is_external, page_files
+
+
+register = template.Library()
+
+TAGS = {
+    'css': '<link href="{}" rel="stylesheet" type="text/css">',
+    'js': '<script type="text/javascript" src="{}"></script>'
+}
+
+
+@register.simple_tag(takes_context=True)
+def page_assets(context, kind):
+    """
+    Includes the stylesheets or scripts the rendered page needs.
+    """
+    name = context.template.name if context.template is not None else None
+    return format_html_join('\n', TAGS[kind], (
+        (name if is_external(name) else static(name),) for name in page_files(name, kind)
+    ))
@@ -0,0 +1,117 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from bloodcalc.bundles import assets_for, build, page_templates, rebase_css
+from patient.models import Patient
+
+
+AMCHARTS_CORE = 'https://www.amcharts.com/lib/4/core.js'
+
+
+class TestBundles(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+
+    def test_assets_for(self):
+        chart = assets_for('cbc/cbc_chart_common.html')
+        self.assertIn(AMCHARTS_CORE, chart['js'])
+        self.assertIn('css/style.bundle.css', chart['css'])
+        self.assertNotIn('js/modules/parallax.min.js', chart['js'])
+
+        listing = assets_for('cbc/cbc_list.html')
+        self.assertNotIn(AMCHARTS_CORE, listing['js'])
+        self.assertNotIn('plugins/custom/prismjs/prismjs.bundle.css', listing['css'])
+
+        self.assertIn('js/modules/parallax.min.js', assets_for('home/home.html')['js'])
+        self.assertIn('css/pages/users/login-2.css', assets_for('registration/login.html')['css'])
+        self.assertIn('css/pages/error/error-3.css', assets_for('404.html')['css'])
+        self.assertNotIn('css/pages/error/error-6.css', assets_for('404.html')['css'])
+
+    def test_page_templates(self):
+        pages = page_templates()
+        self.assertIn('cbc/cbc_chart_diff.html', pages)
+        self.assertIn('404.html', pages)
+        self.assertNotIn('index.html', pages)
+        self.assertNotIn('utils/head.html', pages)
+
+    def test_rebase_css(self):
+        content = 'a{background:url("../img/a.png")}b{background:url(data:image/png;base64,AA)}'
+        self.assertEqual(
+            rebase_css(content, 'css/pages/a.css'),
+            'a{background:url("../css/img/a.png")}b{background:url(data:image/png;base64,AA)}'
+        )
+
+    def test_view_page_assets(self):
+        response = self.client.get(reverse('patient:login'))
+        self.assertContains(response, 'css/pages/users/login-2.css')
+        self.assertNotContains(response, AMCHARTS_CORE)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('cbc:cbc-charts-diff'))
+        self.assertContains(response, AMCHARTS_CORE, count=1)
+        self.assertContains(response, 'js/scripts.bundle.js')
+        self.assertNotContains(response, 'parallax.min.js')
+
+    def test_build(self):
+        with override_settings(BUNDLES_ROOT=self.root):
+            manifest = build()
+            with open(os.path.join(self.root, 'manifest.json')) as file:
+                self.assertEqual(json.load(file), manifest)
+
+            chart = manifest['cbc/cbc_chart_common.html']
+            login = manifest['registration/login.html']
+            self.assertEqual(chart['css'], manifest['cbc/cbc_list.html']['css'])
+            self.assertEqual(chart['css'][0], login['css'][0])
+            self.assertEqual(len(login['css']), 2)
+            self.assertEqual(chart['js'][1:], [
+                'https://www.amcharts.com/lib/4/core.js',
+                'https://www.amcharts.com/lib/4/charts.js',
+                'https://www.amcharts.com/lib/4/themes/material.js',
+                'https://www.amcharts.com/lib/4/themes/animated.js'
+            ])
+
+            with open(os.path.join(self.root, os.path.basename(login['css'][1]))) as file:
+                content = file.read()
+            self.assertNotIn('sourceMappingURL', content)
+            self.assertTrue(content.startswith('@charset "UTF-8";'))
+
+            response = self.client.get(reverse('patient:login'))
+            for name in login['css']:
+                self.assertContains(response, name)
+            self.assertNotContains(response, 'css/pages/users/login-2.css')
+
+            with override_settings(DEBUG=True):
+                response = self.client.get(reverse('patient:login'))
+                self.assertContains(response, 'css/pages/users/login-2.css')
+
+    def test_tag_without_template_name(self):
+        rendered = Template("{% load bundles %}{% page_assets 'js' %}").render(Context())
+        self.assertIn('js/jquery-3.3.1.min.js', rendered)
+        self.assertNotIn(AMCHARTS_CORE, rendered)
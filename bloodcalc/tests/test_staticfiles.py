@@ -0,0 +1,58 @@
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from bloodcalc.staticfiles import ReferencedFilesFinder, minify_css
+
+
+class TestStaticFiles(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_minify_css(self):
+        content = '/* header */\na ,\nb {\n  color : red;\n  content: " ; { } ";\n}\n'
+        self.assertEqual(minify_css(content), 'a,b{color : red;content: " ; { } "}')
+
+    def test_referenced_files(self):
+        referenced = ReferencedFilesFinder().referenced()
+
+        self.assertIn('css/style.bundle.css', referenced)
+        self.assertIn('plugins/global/fonts/Ki.woff', referenced)
+        self.assertNotIn('css/style.bundle.css.map', referenced)
+        self.assertNotIn('js/pages/dashboard.js', referenced)
+
+        listed = {path for path, _ in ReferencedFilesFinder().list([])}
+        self.assertEqual(listed, referenced)
+
+    def test_collect(self):
+        with override_settings(STATIC_ROOT=self.root):
+            call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+
+            name = staticfiles_storage.stored_name('css/style.bundle.css')
+            self.assertRegex(name, r'^css/style\.bundle\.[0-9a-f]{12}\.css$')
+            self.assertEqual(staticfiles_storage.stored_name('plugins/global/plugins.bundle.js'),
+                             'plugins/global/plugins.bundle.js')
+
+            with open(os.path.join(self.root, name), 'rb') as file:
+                content = file.read()
+            with open(os.path.join(self.root, name + '.gz'), 'rb') as file:
+                self.assertEqual(gzip.decompress(file.read()), content)
+            self.assertNotIn(b'/*', content[:1000])
+
+    def test_nginx_hashed_names(self):
+        with open(os.path.join(settings.BASE_DIR, 'deploy', 'nginx', 'static.conf')) as file:
+            hashed = re.search(r'location ~ "(.+)"', file.read()).group(1)
+
+        self.assertRegex('css/style.bundle.0123456789ab.css', hashed)
+        self.assertNotRegex('css/style.bundle.css', hashed)
+        self.assertNotRegex('plugins/global/plugins.bundle.js', hashed)
@@ -1,13 +1,61 @@
 from django.contrib import admin
 
+from .diff_types import TYPE_CODES, type_name
+from .flags import analysis_flags
+from .indices import fill_indices, refresh_indices
 from .models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear
+from .stats import invalidate_cohort
+from .trends import WINDOW, refresh_analysis_trends, refresh_trends
 
 
 class CompleteBloodCountAdmin(admin.ModelAdmin):
     exclude = ['type', 'sum']
+    list_display = ['__str__', 'diff_type']
+    list_select_related = ['user']
+
+    def diff_type(self, obj):
+        return type_name(obj.type)
+    diff_type.short_description = 'Тип анализа'
+
+    def save_model(self, request, obj, form, change):
+        if change and {'sex', 'age'} & set(form.changed_data):
+            invalidate_cohort(form.initial.get('sex'), form.initial.get('age'))
+        super().save_model(request, obj, form, change)
+        if change:
+            # Indices of absolute smears depend on leukocyte, flags on indices.
+            refresh_indices(BloodSmear.objects.filter(cbc=obj))
+            diff = CompleteBloodCount.objects.with_diff().get(pk=obj.pk).diff
+        else:
+            diff = None
+        obj.flags = analysis_flags(obj, diff)
+        CompleteBloodCount.objects.filter(pk=obj.pk).update(flags=obj.flags)
+        refresh_analysis_trends(obj, form.initial.get('analysis_date'))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_trends(obj.user_id, obj.analysis_date, WINDOW - 1)
+
+    def delete_queryset(self, request, queryset):
+        analyses = list(queryset.values_list('user_id', 'analysis_date'))
+        super().delete_queryset(request, queryset)
+        for user_id, analysis_date in analyses:
+            refresh_trends(user_id, analysis_date, WINDOW - 1)
+
+
+class DiffAdmin(admin.ModelAdmin):
+    list_select_related = ['cbc__user']
+
+    def save_model(self, request, obj, form, change):
+        if isinstance(obj, BloodSmear):
+            fill_indices([obj])
+        obj.cbc.type = TYPE_CODES[type(obj)]
+        obj.cbc.flags = analysis_flags(obj.cbc, obj)
+        obj.cbc.save(update_fields=['type', 'flags', 'updated_at'])
+        super().save_model(request, obj, form, change)
+        refresh_trends(obj.cbc.user_id, obj.cbc.analysis_date)
 
 
 admin.site.register(CompleteBloodCount, CompleteBloodCountAdmin)
-admin.site.register(ThreeDiff)
-admin.site.register(FiveDiff)
-admin.site.register(BloodSmear)
+admin.site.register(ThreeDiff, DiffAdmin)
+admin.site.register(FiveDiff, DiffAdmin)
+admin.site.register(BloodSmear, DiffAdmin)
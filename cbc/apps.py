@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CbcConfig(AppConfig):
     name = 'cbc'
     verbose_name = 'Общий анализ крови'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,51 @@
+"""
+Per-user cache of chart payloads.
+
+Every payload key contains the version of the user's data, a DataVersion
+row incremented by every write to the user's analyses in the writing
+transaction. The version lives in the database, so all processes see it
+change exactly when the write commits and a payload built from data read
+before the write is never served after it, whatever process cached it.
+updated_at of the row serves as the Last-Modified of the user's pages.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from cbc.models import DataVersion
+
+
+def version_key(user_id):
+    return 'user:%s' % user_id
+
+
+def user_version(user_id):
+    """
+    Returns (version, updated_at) of the user's data, updated_at is None
+    before the first write.
+    """
+    version, updated_at = DataVersion.objects.current(version_key(user_id))
+    if updated_at is not None and timezone.is_naive(updated_at):
+        updated_at = timezone.make_aware(updated_at)
+    return version, updated_at
+
+
+def invalidate_user(user_id):
+    invalidate_users([user_id])
+
+
+def invalidate_users(user_ids):
+    DataVersion.objects.bump(version_key(user_id) for user_id in set(user_ids) - {None})
+
+
+def cached_payload(user_id, name, build):
+    """
+    Returns the user's payload from the cache, builds and stores it with
+    `build` on a miss.
+    """
+    version, _ = user_version(user_id)
+    key = 'cbc:%s:%s:%s' % (name, user_id, version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload)
+    return payload
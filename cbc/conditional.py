@@ -0,0 +1,70 @@
+"""
+ETag and Last-Modified of the pages built from a user's analyses.
+
+Chart pages are stamped with the user's data version from cbc.cache, so a
+conditional request costs a single primary key lookup. Detail pages also
+depend on the analysis itself, which may belong to another user, and add
+its updated_at.
+"""
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from cbc.cache import user_version
+from cbc.models import CompleteBloodCount
+
+
+def request_user_version(request):
+    """
+    Returns (version, updated_at) of the user's data, read once per request.
+    """
+    if '_user_version' not in request.__dict__:
+        request._user_version = user_version(request.user.pk)
+    return request._user_version
+
+
+def user_etag(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    return '"%s-%s"' % (request.user.pk, request_user_version(request)[0])
+
+
+def user_last_modified(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    return request_user_version(request)[1]
+
+
+def analysis_updated_at(request, pk):
+    """
+    Returns updated_at of the analysis as an aware datetime, None if it does
+    not exist. The value is read once per request.
+    """
+    stamps = request.__dict__.setdefault('_analysis_updated_at', {})
+    if pk not in stamps:
+        updated_at = CompleteBloodCount.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+        if updated_at is not None and timezone.is_naive(updated_at):
+            updated_at = timezone.make_aware(updated_at)
+        stamps[pk] = updated_at
+    return stamps[pk]
+
+
+def analysis_etag(request, pk, *args, **kwargs):
+    updated_at = analysis_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    etag = '%s-%s' % (pk, updated_at.timestamp())
+    if request.user.is_authenticated:
+        etag += '-%s-%s' % (request.user.pk, request_user_version(request)[0])
+    return '"%s"' % etag
+
+
+def analysis_last_modified(request, pk, *args, **kwargs):
+    updated_at = analysis_updated_at(request, pk)
+    if updated_at is None or not request.user.is_authenticated:
+        return updated_at
+    return max(filter(None, (updated_at, request_user_version(request)[1])))
+
+
+user_condition = condition(etag_func=user_etag, last_modified_func=user_last_modified)
+
+analysis_condition = condition(etag_func=analysis_etag, last_modified_func=analysis_last_modified)
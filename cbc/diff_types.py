@@ -0,0 +1,37 @@
+from cbc.models import ThreeDiff, FiveDiff, BloodSmear
+
+
+DIFF_MODELS = {
+    3: ThreeDiff,
+    5: FiveDiff,
+    9: BloodSmear
+}
+
+TYPE_CODES = {model: code for code, model in DIFF_MODELS.items()}
+
+DIFF_RELATIONS = {
+    code: model._meta.get_field('cbc').remote_field.get_accessor_name() for code, model in DIFF_MODELS.items()
+}
+
+
+def diff_model(code):
+    """
+    Returns the differential model of the analysis type code, None for an
+    unknown code.
+    """
+    return DIFF_MODELS.get(code)
+
+
+def diff_fields(model):
+    """
+    Returns names of the editable fields of the differential model.
+    """
+    return [
+        field.name for field in model._meta.fields
+        if field.editable and not field.primary_key and field.name != 'cbc'
+    ]
+
+
+def type_name(code):
+    model = diff_model(code)
+    return model._meta.verbose_name if model else ''
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: returns sorted positions of `threshold`
+    points that keep the visual shape of the y(x) line.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = size - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x = x[-1]
+            next_y = y[-1]
+
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def select_columns(x, columns, threshold):
+    """
+    Marks rows selected by LTTB of `threshold` points in any of the columns,
+    missing values are skipped.
+    """
+    mask = np.zeros(len(x), dtype=bool)
+    for values in columns:
+        present = np.flatnonzero(~np.isnan(values))
+        if len(present):
+            mask[present[lttb(x[present], values[present], threshold)]] = True
+    return mask
+
+
+def downsample_mask(x, columns, max_points, ranges):
+    """
+    Marks rows to keep when the columns are downsampled together to at most
+    `max_points` rows. Every column gets the largest LTTB threshold whose
+    union of selections still fits, missing values are skipped. Values
+    outside of (min, max) from `ranges` are always kept on top of that.
+    """
+    x = np.asarray(x, dtype=float)
+    values = {name: np.array(column, dtype=float) for name, column in columns.items()}
+
+    smallest, largest = 3, max_points
+    mask = select_columns(x, values.values(), smallest)
+    while smallest < largest:
+        threshold = (smallest + largest + 1) // 2
+        selected = select_columns(x, values.values(), threshold)
+        if selected.sum() <= max_points:
+            smallest, mask = threshold, selected
+        else:
+            largest = threshold - 1
+
+    kept = np.flatnonzero(mask)
+    if len(kept) > max_points:
+        mask[:] = False
+        mask[kept[np.linspace(0, len(kept) - 1, max_points).astype(int)]] = True
+
+    for name, column in values.items():
+        low, high = ranges.get(name, (None, None))
+        if low is not None:
+            mask |= column < low
+        if high is not None:
+            mask |= column > high
+
+    return mask
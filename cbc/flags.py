@@ -0,0 +1,201 @@
+"""
+Reference range flags.
+
+Every analyte, cell and index of FLAGGED has two bits in
+CompleteBloodCount.flags, one for a value below the range and one for a
+value above it. Flags are computed once, when the analysis is written,
+from the ranges of the sex and age of the analysis, so they keep the
+range that applied when the analysis was taken. NULL marks analyses
+written before flags existed, `refresh_flags` fills them.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+
+from cbc.indices import INDICES, INDEX_FIELDS
+from cbc.models import ANALYTES, CompleteBloodCount, FiveDiff, BloodSmear
+from range.lookup import get_cbc_range, get_index_range, get_reference_range
+
+
+LOW = 'low'
+HIGH = 'high'
+
+DIFF_ANALYTES = (
+    'neutrophil',
+    'promyelocyte',
+    'myelocyte',
+    'metamyelocyte',
+    'banded_neutrophil',
+    'segmented_neutrophil',
+    'lymphocyte',
+    'monocyte',
+    'eosinophil',
+    'basophil',
+    'plasma_cell'
+)
+
+# Bit positions follow this order, new names may only be appended.
+FLAGGED = ANALYTES + DIFF_ANALYTES + INDICES
+
+
+LABEL_MODELS = (CompleteBloodCount, FiveDiff, BloodSmear)
+
+
+def flag_label(name):
+    """
+    Returns verbose name of the analyte, cell or index.
+    """
+    for model in LABEL_MODELS:
+        for field in (name, f'{name}_value'):
+            try:
+                return model._meta.get_field(field).verbose_name
+            except FieldDoesNotExist:
+                continue
+    return name
+
+
+def flag_bit(name, direction):
+    return 1 << (2 * FLAGGED.index(name) + (direction == HIGH))
+
+
+def flag_mask(name, direction=None):
+    """
+    Returns the bits of the name in the given direction, in both when it
+    is None.
+    """
+    if direction is None:
+        return flag_bit(name, LOW) | flag_bit(name, HIGH)
+    return flag_bit(name, direction)
+
+
+def reference_bounds(sex, age, value_type=None):
+    """
+    Returns {name: (min, max)} of the ranges that apply to the sex and age,
+    cells are only bounded when value_type of the differential is given.
+    """
+    bounds = {}
+    cbc_range = get_cbc_range(sex, age)
+    if cbc_range is not None:
+        for name in ANALYTES:
+            bounds[name] = (getattr(cbc_range, f'{name}_min'), getattr(cbc_range, f'{name}_max'))
+
+    reference_range = get_reference_range(sex, age, value_type) if value_type else None
+    if reference_range is not None:
+        for name in DIFF_ANALYTES:
+            bounds[name] = (getattr(reference_range.diff, f'{name}_min'), getattr(reference_range.diff, f'{name}_max'))
+
+    index_range = get_index_range()
+    if index_range is not None:
+        for name in INDICES:
+            bounds[name] = (getattr(index_range, f'{name}_min'), getattr(index_range, f'{name}_max'))
+    return bounds
+
+
+def compute_flags(values, sex, age, value_type=None):
+    """
+    Returns the flags of {name: value}, missing values are not flagged.
+    """
+    flags = 0
+    for name, (low, high) in reference_bounds(sex, age, value_type).items():
+        value = values.get(name)
+        if value is None:
+            continue
+        if value < low:
+            flags |= flag_bit(name, LOW)
+        elif value > high:
+            flags |= flag_bit(name, HIGH)
+    return flags
+
+
+def analysis_flags(cbc, diff=None):
+    """
+    Returns the flags of the analysis and its differential, indices of a
+    smear must be filled before.
+    """
+    values = {name: getattr(cbc, name) for name in ANALYTES}
+    if diff is None:
+        return compute_flags(values, cbc.sex, cbc.age)
+
+    for name in DIFF_ANALYTES:
+        values[name] = getattr(diff, name, None)
+    for name, field in zip(INDICES, INDEX_FIELDS):
+        values[name] = getattr(diff, field, None)
+    return compute_flags(values, cbc.sex, cbc.age, diff.value_type)
+
+
+def decode_flags(flags):
+    """
+    Returns {name: LOW or HIGH} of the flagged names.
+    """
+    result = {}
+    for name in FLAGGED:
+        if flags & flag_bit(name, LOW):
+            result[name] = LOW
+        elif flags & flag_bit(name, HIGH):
+            result[name] = HIGH
+    return result
+
+
+def flag_names(flags):
+    """
+    Formats flags as 'leukocyte:low sed_rate:high'.
+    """
+    return ' '.join(f'{name}:{direction}' for name, direction in decode_flags(flags).items())
+
+
+def range_flags(cbc):
+    """
+    Returns decode_flags of the analysis, analyses without stored flags are
+    computed against the current ranges. The result is kept on the instance.
+    """
+    if not hasattr(cbc, '_range_flags'):
+        flags = cbc.flags
+        if flags is None:
+            flags = analysis_flags(cbc, cbc.diff)
+        cbc._range_flags = decode_flags(flags)
+    return cbc._range_flags
+
+
+def filter_flags(queryset, name=None, direction=None):
+    """
+    Filters analyses out of range, for the name and direction when given.
+    The test is done by the database on the stored flags, the flags > 0
+    condition lets it use the partial index of flagged analyses. A name is
+    always tested on both of its bits, the condition of its own partial
+    index on PostgreSQL, and the direction narrows it in a second one.
+    """
+    queryset = queryset.filter(flags__gt=0)
+    if name is None and direction is None:
+        return queryset
+    if name is None:
+        mask = 0
+        for flagged in FLAGGED:
+            mask |= flag_bit(flagged, direction)
+        return queryset.annotate(flag_match=F('flags').bitand(mask)).filter(flag_match__gt=0)
+
+    queryset = queryset.annotate(flag_name=F('flags').bitand(flag_mask(name))).filter(flag_name__gt=0)
+    if direction is None:
+        return queryset
+    return queryset.annotate(flag_match=F('flags').bitand(flag_bit(name, direction))).filter(flag_match__gt=0)
+
+
+def refresh_flags(queryset, batch_size=2000):
+    """
+    Recomputes and stores flags for every analysis of the queryset in
+    batches, returns the number of updated analyses.
+    """
+    queryset = queryset.with_diff().order_by('pk')
+    last_pk = 0
+    updated = 0
+
+    while True:
+        cbcs = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not cbcs:
+            break
+        for cbc in cbcs:
+            cbc.flags = analysis_flags(cbc, cbc.diff)
+        CompleteBloodCount.objects.bulk_update(cbcs, ['flags'])
+
+        last_pk = cbcs[-1].pk
+        updated += len(cbcs)
+
+    return updated
@@ -2,7 +2,9 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.forms.models import inlineformset_factory
 
+from .flags import FLAGGED, HIGH, LOW, flag_label
 from .models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear
+from .validators import validate_sum, duplicate_date_error
 
 
 class CBCModelForm(forms.ModelForm):
@@ -10,8 +12,6 @@ class CBCModelForm(forms.ModelForm):
         model = CompleteBloodCount
         exclude = [
             'user',
-            'content_type',
-            'object_id',
             'type'
         ]
         widgets = {
@@ -44,13 +44,14 @@ class CBCModelForm(forms.ModelForm):
         errors = {}
 
         if self.user.is_authenticated:
-            if CompleteBloodCount.objects.filter(user=self.user, analysis_date=date).exists():
-                date_formated = date.strftime('%d.%m.%Y')
-                errors['analysis_date'] = ValidationError('Результаты анализа за %s уже добавлены.' % date_formated)
+            analyses = CompleteBloodCount.objects.filter(user=self.user, analysis_date=date)
+            if analyses.exclude(pk=self.instance.pk).exists():
+                errors['analysis_date'] = duplicate_date_error(date)
 
-        if _sum < 98 or _sum > 102:
-            errors['sum'] = ValidationError('Сумма компонентов лейкоцитарной формулы не равна 100%. Пожалуйста, '
-                                             'проверьте введенные значения и повторите попытку.')
+        try:
+            validate_sum(_sum)
+        except ValidationError as error:
+            errors['sum'] = error
 
         if errors:
             raise ValidationError(errors)
@@ -119,3 +120,32 @@ BloodSmearFormSet = inlineformset_factory(
     extra=1,
     max_num=1
 )
+
+
+class SeriesFilterForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    max_points = forms.IntegerField(required=False, min_value=3)
+
+
+class OutOfRangeSearchForm(forms.Form):
+    name = forms.ChoiceField(required=False, label='Показатель')
+    direction = forms.ChoiceField(
+        required=False,
+        label='Отклонение',
+        choices=(('', 'Любое'), (LOW, 'Ниже нормы'), (HIGH, 'Выше нормы'))
+    )
+    date_from = forms.DateField(required=False, label='Дата с')
+    date_to = forms.DateField(required=False, label='Дата по')
+
+    def __init__(self, *args, **kwargs):
+        super(OutOfRangeSearchForm, self).__init__(*args, **kwargs)
+        self.fields['name'].choices = [('', 'Любой')] + [(name, flag_label(name)) for name in FLAGGED]
+        self.label_suffix = ""
+
+    def clean(self):
+        date_from = self.cleaned_data.get('date_from')
+        date_to = self.cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError({'date_to': 'Дата окончания раньше даты начала.'})
+        return self.cleaned_data
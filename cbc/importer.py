@@ -0,0 +1,267 @@
+import csv
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from cbc.cache import invalidate_users
+from cbc.diff_types import DIFF_MODELS, diff_fields
+from cbc.flags import analysis_flags
+from cbc.indices import CELL_FIELDS, fill_indices
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.stats import invalidate_cohorts
+from cbc.trends import refresh_trends
+from cbc.validators import validate_sum, duplicate_date_error
+
+
+CBC_FIELDS = (
+    'age',
+    'sex',
+    'analysis_date',
+    'leukocyte',
+    'erythrocyte',
+    'hemoglobin',
+    'hematocrit',
+    'sed_rate'
+)
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+
+
+def read_csv(path, delimiter=','):
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file, delimiter=delimiter):
+            yield row
+
+
+def read_xlsx(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [str(name).strip() for name in next(rows, ())]
+    for values in rows:
+        yield {name: '' if value is None else value for name, value in zip(header, values)}
+    workbook.close()
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), date_format).date()
+        except ValueError:
+            pass
+    raise ValidationError('Неверный формат даты: %s.' % value)
+
+
+def clean_field(model, name, value):
+    field = model._meta.get_field(name)
+    if name == 'analysis_date':
+        return parse_date(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if field.get_internal_type() in ('FloatField', 'IntegerField'):
+            value = value.replace(',', '.')
+            if field.get_internal_type() == 'IntegerField' and value.endswith('.0'):
+                value = value[:-2]
+    return field.clean(value, None)
+
+
+def smear_sum(diff):
+    if isinstance(diff, BloodSmear) and diff.value_type == BloodSmear.RELATIVE_CHOICE:
+        return sum(getattr(diff, name) for name in ['promyelocyte'] + list(CELL_FIELDS))
+    return 100
+
+
+class CBCImporter:
+    """
+    Imports analyses from rows of dicts in batches, every batch is written
+    with bulk_create in its own transaction. Rows are checked with the same
+    rules as CBCModelForm, rejected rows are collected with their errors.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.imported = 0
+        self.rejected = []
+        self.users = {}
+        self.seen = set()
+
+    def run(self, rows):
+        batch = []
+        for line, row in enumerate(rows, start=2):
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.imported
+
+    def load_users(self, batch):
+        usernames = {str(row.get('username') or '').strip() for _, row in batch} - {''}
+        missing = usernames - set(self.users)
+        if missing:
+            for user in User.objects.filter(username__in=missing).select_related('patient'):
+                self.users[user.username] = user
+
+    def parse(self, row):
+        errors = {}
+        username = str(row.get('username') or '').strip()
+        user = None
+        if username:
+            user = self.users.get(username)
+            if user is None:
+                errors['username'] = 'Пользователь %s не найден.' % username
+
+        cbc = CompleteBloodCount(user=user)
+        for name in CBC_FIELDS:
+            if username and name in ('age', 'sex'):
+                continue
+            try:
+                setattr(cbc, name, clean_field(CompleteBloodCount, name, row.get(name, '')))
+            except ValidationError as error:
+                errors[name] = ' '.join(error.messages)
+
+        if user is not None:
+            try:
+                cbc.age = user.patient.get_age()
+                cbc.sex = user.patient.sex
+            except User.patient.RelatedObjectDoesNotExist:
+                errors['username'] = 'У пользователя %s нет профиля пациента.' % username
+
+        try:
+            cbc.type = int(row.get('type') or 0)
+            model = DIFF_MODELS[cbc.type]
+        except (ValueError, KeyError):
+            errors['type'] = 'Тип анализа должен быть 3, 5 или 9.'
+            raise ValidationError(errors)
+
+        diff = model()
+        for name in diff_fields(model):
+            try:
+                setattr(diff, name, clean_field(model, name, row.get(name, '')))
+            except ValidationError as error:
+                errors[name] = ' '.join(error.messages)
+
+        if errors:
+            raise ValidationError(errors)
+
+        try:
+            cbc.sum = clean_field(CompleteBloodCount, 'sum', row.get('sum') or smear_sum(diff))
+            validate_sum(cbc.sum)
+        except ValidationError as error:
+            errors['sum'] = ' '.join(error.messages)
+
+        key = (user.pk, cbc.analysis_date) if user is not None else None
+        if key in self.seen:
+            errors['analysis_date'] = ' '.join(duplicate_date_error(cbc.analysis_date).messages)
+
+        if errors:
+            raise ValidationError(errors)
+
+        if key is not None:
+            self.seen.add(key)
+        return cbc, diff
+
+    def existing_dates(self, parsed):
+        keys = {(cbc.user_id, cbc.analysis_date) for _, cbc, _ in parsed if cbc.user_id}
+        if not keys:
+            return set()
+        existing = CompleteBloodCount.objects.filter(
+            user_id__in={user_id for user_id, _ in keys},
+            analysis_date__in={analysis_date for _, analysis_date in keys}
+        ).values_list('user_id', 'analysis_date')
+        return keys.intersection(existing)
+
+    def import_batch(self, batch):
+        self.load_users(batch)
+
+        parsed = []
+        rejected = []
+        for line, row in batch:
+            try:
+                cbc, diff = self.parse(row)
+            except ValidationError as error:
+                rejected.append((line, error.message_dict))
+            else:
+                parsed.append((line, cbc, diff))
+
+        existing = self.existing_dates(parsed)
+        valid = []
+        for line, cbc, diff in parsed:
+            if (cbc.user_id, cbc.analysis_date) in existing:
+                error = duplicate_date_error(cbc.analysis_date)
+                rejected.append((line, {'analysis_date': error.messages}))
+            else:
+                valid.append((cbc, diff))
+        self.rejected.extend(sorted(rejected, key=lambda item: item[0]))
+
+        if valid:
+            self.save(valid)
+
+    def save(self, valid):
+        """
+        Writes parsed analyses with new versions of their users and
+        cohorts, then recomputes trends.
+        """
+        with transaction.atomic():
+            self.write(valid)
+            invalidate_users(cbc.user_id for cbc, _ in valid)
+            invalidate_cohorts((cbc.sex, cbc.age) for cbc, _ in valid)
+        self.imported += len(valid)
+        self.refresh_trends(valid)
+
+    def refresh_trends(self, valid):
+        """
+        Recomputes trends of every analysis of the users from the earliest
+        imported date on.
+        """
+        first_dates = {}
+        for cbc, _ in valid:
+            if cbc.user_id is not None:
+                first_dates[cbc.user_id] = min(cbc.analysis_date, first_dates.get(cbc.user_id, cbc.analysis_date))
+        for user_id, first_date in first_dates.items():
+            refresh_trends(user_id, first_date, None)
+
+    def prepare(self, valid):
+        """
+        Fills indices of the smears and reference flags of the analyses
+        before they are written.
+        """
+        smears = []
+        for cbc, diff in valid:
+            diff.cbc = cbc
+            if isinstance(diff, BloodSmear):
+                smears.append(diff)
+        if smears:
+            fill_indices(smears)
+        for cbc, diff in valid:
+            cbc.flags = analysis_flags(cbc, diff)
+
+    def write(self, valid):
+        self.prepare(valid)
+        with transaction.atomic():
+            # bulk_create splits rows into statements the backend accepts,
+            # an explicit batch_size would override that limit on SQLite.
+            cbcs = [cbc for cbc, _ in valid]
+            if connection.features.can_return_ids_from_bulk_insert:
+                CompleteBloodCount.objects.bulk_create(cbcs)
+            else:
+                for cbc in cbcs:
+                    cbc.save()
+
+            for code, model in DIFF_MODELS.items():
+                diffs = []
+                for cbc, diff in valid:
+                    if cbc.type == code:
+                        diff.cbc = cbc
+                        diffs.append(diff)
+                if diffs:
+                    model.objects.bulk_create(diffs)
+
@@ -0,0 +1,170 @@
+import numpy as np
+
+from cbc.models import INDICES, INDEX_FIELDS, BloodSmear
+
+
+CELL_FIELDS = (
+    'myelocyte',
+    'metamyelocyte',
+    'banded_neutrophil',
+    'segmented_neutrophil',
+    'lymphocyte',
+    'monocyte',
+    'eosinophil',
+    'basophil',
+    'plasma_cell'
+)
+
+
+def compute_indices(cells, value_type, leukocyte):
+    """
+    Computes all indices for columns of smear values, absolute values are
+    converted to percents of leukocytes the same way BloodSmear methods do.
+    NaN marks an index with a zero denominator.
+    """
+    absolute = np.asarray(value_type) == BloodSmear.ABSOLUTE_CHOICE
+    leukocyte = np.asarray(leukocyte, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = {}
+        for field in CELL_FIELDS:
+            values = np.asarray(cells[field], dtype=float)
+            c[field] = np.where(absolute, values * 100 / leukocyte, values)
+
+        myel = c['myelocyte']
+        meta = c['metamyelocyte']
+        bn = c['banded_neutrophil']
+        sn = c['segmented_neutrophil']
+        lymph = c['lymphocyte']
+        mono = c['monocyte']
+        eo = c['eosinophil']
+        baso = c['basophil']
+        plasm = c['plasma_cell']
+
+        result = {
+            'intoxicationKK': (4 * myel + 3 * meta + 2 * bn + sn) * (plasm + 1) / ((mono + lymph) * (eo + 1)),
+            'intoxicationO': (sn + bn + meta + myel + plasm) / (mono + lymph + plasm),
+            'nuclear': (mono + meta + bn) / sn,
+            'shift': (sn + bn) / lymph,
+            'allergy': (lymph + 10 * (eo + 1)) / (bn + sn + mono + baso)
+        }
+
+    for values in result.values():
+        values[~np.isfinite(values)] = np.nan
+
+    return result
+
+
+def round_index(values):
+    """
+    Uses the builtin round() to match BloodSmear methods, NaN becomes None.
+    """
+    return [None if value != value else round(value, 2) for value in values.tolist()]
+
+
+def _rounded_indices(rows):
+    """
+    Computes rounded indices for rows that start with leukocyte count and
+    value type followed by CELL_FIELDS.
+    """
+    columns = list(zip(*rows))
+    leukocyte, value_type = columns[:2]
+    cells = dict(zip(CELL_FIELDS, columns[2:]))
+
+    result = compute_indices(cells, value_type, leukocyte)
+    return {name: round_index(values) for name, values in result.items()}
+
+
+def fill_indices(smears):
+    """
+    Sets indices on unsaved smears from their values, cbc of every smear
+    must be set to read the leukocyte count.
+    """
+    cells = {name: [getattr(smear, name) for smear in smears] for name in CELL_FIELDS}
+    result = compute_indices(
+        cells,
+        [smear.value_type for smear in smears],
+        [smear.cbc.leukocyte for smear in smears]
+    )
+    for name, field in zip(INDICES, INDEX_FIELDS):
+        for smear, value in zip(smears, round_index(result[name])):
+            setattr(smear, field, value)
+
+
+def queryset_indices(queryset):
+    """
+    Returns rounded indices with analysis pk, date and type for every smear
+    of the queryset, reading all values in a single query.
+    """
+    rows = list(queryset.values_list(
+        'cbc_id',
+        'cbc__analysis_date',
+        'cbc__type',
+        'cbc__leukocyte',
+        'value_type',
+        *CELL_FIELDS
+    ))
+    if not rows:
+        return []
+
+    rounded = _rounded_indices([row[3:] for row in rows])
+
+    indices = []
+    for i, row in enumerate(rows):
+        item = {
+            'pk': row[0],
+            'date': row[1],
+            'type': row[2]
+        }
+        for name in INDICES:
+            item[name] = rounded[name][i]
+        indices.append(item)
+    return indices
+
+
+def stored_indices(queryset):
+    """
+    Same as queryset_indices, but reads the values stored on BloodSmear.
+    """
+    rows = queryset.values_list(
+        'cbc_id',
+        'cbc__analysis_date',
+        'cbc__type',
+        *INDEX_FIELDS
+    )
+    return [dict(zip(('pk', 'date', 'type') + INDICES, row)) for row in rows]
+
+
+def refresh_indices(queryset, batch_size=2000):
+    """
+    Recomputes and stores indices for every smear of the queryset in batches,
+    returns the number of updated smears.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = 0
+    updated = 0
+
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values_list(
+            'pk',
+            'cbc__leukocyte',
+            'value_type',
+            *CELL_FIELDS
+        )[:batch_size])
+        if not rows:
+            break
+
+        rounded = _rounded_indices([row[1:] for row in rows])
+
+        blood_smears = []
+        for i, row in enumerate(rows):
+            blood_smear = BloodSmear(pk=row[0])
+            for name, field in zip(INDICES, INDEX_FIELDS):
+                setattr(blood_smear, field, rounded[name][i])
+            blood_smears.append(blood_smear)
+        BloodSmear.objects.bulk_update(blood_smears, INDEX_FIELDS)
+
+        last_pk = rows[-1][0]
+        updated += len(rows)
+
+    return updated
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from cbc.flags import refresh_flags
+from cbc.models import CompleteBloodCount
+
+
+class Command(BaseCommand):
+    help = 'Вычисляет и сохраняет отклонения от референтных значений для существующих анализов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Количество анализов, обновляемых за один запрос'
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Обновить только анализы без сохраненных отклонений'
+        )
+
+    def handle(self, *args, **options):
+        queryset = CompleteBloodCount.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(flags__isnull=True)
+
+        updated = refresh_flags(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено анализов: {updated}'))
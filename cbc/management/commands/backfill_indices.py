@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from cbc.indices import refresh_indices
+from cbc.models import BloodSmear
+
+
+class Command(BaseCommand):
+    help = 'Вычисляет и сохраняет лейкоцитарные индексы для существующих мазков крови'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Количество мазков, обновляемых за один запрос'
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Обновить только мазки без сохраненных индексов'
+        )
+
+    def handle(self, *args, **options):
+        queryset = BloodSmear.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(intoxicationKK_value__isnull=True)
+
+        updated = refresh_indices(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено мазков: {updated}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from cbc.models import CompleteBloodCount
+from cbc.trends import refresh_user_trends
+
+
+class Command(BaseCommand):
+    help = 'Вычисляет и сохраняет динамику показателей для существующих анализов'
+
+    def handle(self, *args, **options):
+        user_ids = CompleteBloodCount.objects.exclude(user=None).order_by().values_list('user_id', flat=True).distinct()
+        updated = refresh_user_trends(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Обновлено анализов: {updated}'))
@@ -0,0 +1,64 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from cbc.copy_import import CopyImporter
+from cbc.importer import CBCImporter, read_csv, read_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость импорта через bulk_create и через COPY, изменения откатываются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV или XLSX файлу')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, записываемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Разделитель полей CSV файла'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Количество запусков каждого способа'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path.lower().endswith('.xlsx'):
+                rows = list(read_xlsx(path))
+            else:
+                rows = list(read_csv(path, delimiter=options['delimiter']))
+        except (ImportError, OSError, csv.Error) as error:
+            raise CommandError(error)
+
+        importers = [('bulk_create', CBCImporter)]
+        if connection.vendor == 'postgresql':
+            importers.append(('copy', CopyImporter))
+        else:
+            self.stderr.write('COPY доступен только для PostgreSQL, замеряется только bulk_create.')
+
+        for name, importer_class in importers:
+            timings = []
+            for _ in range(options['repeat']):
+                with transaction.atomic():
+                    importer = importer_class(batch_size=options['batch_size'])
+                    start = time.perf_counter()
+                    importer.run(rows)
+                    timings.append(time.perf_counter() - start)
+                    transaction.set_rollback(True)
+
+            best = min(timings)
+            rate = importer.imported / best if best else 0
+            self.stdout.write(
+                f'{name}: строк {importer.imported}, лучшее время {best:.3f} с, {rate:.0f} строк/с'
+            )
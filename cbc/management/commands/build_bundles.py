@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bloodcalc.bundles import build
+
+
+class Command(BaseCommand):
+    help = 'Собирает стили и скрипты каждой страницы в отдельные бандлы, запускается перед collectstatic'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--root',
+            help='Каталог для бандлов, по умолчанию BUNDLES_ROOT'
+        )
+
+    def handle(self, *args, **options):
+        manifest = build(options['root'])
+        files = {name for page in manifest.values() for names in page.values() for name in names}
+        self.stdout.write(self.style.SUCCESS(f'Страниц: {len(manifest)}, файлов: {len(files)}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from range.drafts import estimate_ranges
+
+
+class Command(BaseCommand):
+    help = 'Оценивает референтные значения по сохраненным анализам и сохраняет их как черновики'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Количество процессов, по умолчанию по числу процессоров'
+        )
+
+    def handle(self, *args, **options):
+        drafts = estimate_ranges(workers=options['workers'])
+        for draft in drafts:
+            self.stdout.write(f'{draft}: {draft.sample_size}')
+        self.stdout.write(self.style.SUCCESS(f'Создано черновиков: {len(drafts)}'))
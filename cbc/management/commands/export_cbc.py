@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cbc.export import export_csv
+from cbc.models import CompleteBloodCount
+
+
+class Command(BaseCommand):
+    help = 'Выгружает результаты общего анализа крови в CSV файл'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Путь к CSV файлу, по умолчанию стандартный вывод'
+        )
+        parser.add_argument(
+            '--username',
+            help='Выгрузить анализы только этого пользователя'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Количество строк, читаемых из базы за один раз'
+        )
+
+    def handle(self, *args, **options):
+        queryset = CompleteBloodCount.objects.all()
+        if options['username']:
+            queryset = queryset.filter(user__username=options['username'])
+
+        lines = export_csv(queryset, chunk_size=options['chunk_size'])
+        if options['output']:
+            try:
+                with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                    file.writelines(lines)
+            except OSError as error:
+                raise CommandError(error)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cbc.models import CompleteBloodCount
+from cbc.parquet import export_parquet
+
+
+class Command(BaseCommand):
+    help = 'Выгружает результаты общего анализа крови в Parquet, разбитый по годам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('root', help='Каталог набора данных Parquet')
+        parser.add_argument(
+            '--username',
+            help='Выгрузить анализы только этого пользователя'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Количество строк в одном блоке записи'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise CommandError('Для выгрузки в Parquet необходимо установить pyarrow.')
+
+        queryset = CompleteBloodCount.objects.all()
+        if options['username']:
+            queryset = queryset.filter(user__username=options['username'])
+
+        try:
+            written = export_parquet(queryset, options['root'], chunk_size=options['chunk_size'])
+        except OSError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено анализов: {written}'))
@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from cbc.synthetic import MAX_AGE, SyntheticGenerator
+
+
+class Command(BaseCommand):
+    help = 'Создает пациентов со сгенерированными результатами анализов для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patients',
+            type=int,
+            default=100,
+            help='Количество пациентов'
+        )
+        parser.add_argument(
+            '--analyses',
+            type=int,
+            default=100,
+            help='Количество анализов у каждого пациента'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--out-of-range',
+            type=float,
+            default=0.1,
+            help='Доля анализов со значениями вне референтного интервала'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество анализов, записываемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Префикс имен создаваемых пользователей'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['out_of_range'] <= 1:
+            raise CommandError('Доля анализов вне интервала должна быть от 0 до 1.')
+        if options['analyses'] >= MAX_AGE * 365:
+            raise CommandError(f'Количество анализов должно быть меньше {MAX_AGE * 365}.')
+        usernames = [f'{options["prefix"]}{i}' for i in range(options['patients'])]
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError(f'Пользователи с префиксом {options["prefix"]} уже существуют.')
+
+        generator = SyntheticGenerator(
+            seed=options['seed'],
+            out_of_range=options['out_of_range'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix']
+        )
+        start = time.perf_counter()
+        written = generator.run(options['patients'], options['analyses'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пациентов: {options["patients"]}, анализов: {written} '
+            f'за {time.perf_counter() - start:.1f} с'
+        ))
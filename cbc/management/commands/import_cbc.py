@@ -0,0 +1,71 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from cbc.copy_import import CopyImporter
+from cbc.importer import CBCImporter, read_csv, read_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Импортирует результаты общего анализа крови из CSV или XLSX файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV или XLSX файлу')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, записываемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--delimiter',
+            default=',',
+            help='Разделитель полей CSV файла'
+        )
+        parser.add_argument(
+            '--rejected',
+            help='Путь к CSV файлу для отклоненных строк'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загружать строки через COPY и промежуточные таблицы (только PostgreSQL)'
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('Режим --copy доступен только для PostgreSQL.')
+
+        path = options['path']
+        if path.lower().endswith('.xlsx'):
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                raise CommandError('Для импорта XLSX необходимо установить openpyxl.')
+            rows = read_xlsx(path)
+        else:
+            rows = read_csv(path, delimiter=options['delimiter'])
+
+        importer_class = CopyImporter if options['copy'] else CBCImporter
+        importer = importer_class(batch_size=options['batch_size'])
+        try:
+            importer.run(rows)
+        except (OSError, csv.Error) as error:
+            raise CommandError(error)
+
+        if options['rejected']:
+            with open(options['rejected'], 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(['line', 'field', 'error'])
+                for line, errors in importer.rejected:
+                    for field, messages in errors.items():
+                        writer.writerow([line, field, ' '.join(messages)])
+        else:
+            for line, errors in importer.rejected:
+                for field, messages in errors.items():
+                    self.stderr.write(f'Строка {line}, {field}: {" ".join(messages)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано: {importer.imported}, отклонено: {len(importer.rejected)}'
+        ))
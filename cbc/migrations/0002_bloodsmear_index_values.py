@@ -0,0 +1,38 @@
+# Generated by Django 2.2 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodsmear',
+            name='allergy_value',
+            field=models.FloatField(editable=False, null=True, verbose_name='Индекс аллергизации'),
+        ),
+        migrations.AddField(
+            model_name='bloodsmear',
+            name='intoxicationKK_value',
+            field=models.FloatField(editable=False, null=True, verbose_name='Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа'),
+        ),
+        migrations.AddField(
+            model_name='bloodsmear',
+            name='intoxicationO_value',
+            field=models.FloatField(editable=False, null=True, verbose_name='Лейкоцитарный индекс интоксикации В. К. Островского'),
+        ),
+        migrations.AddField(
+            model_name='bloodsmear',
+            name='nuclear_value',
+            field=models.FloatField(editable=False, null=True, verbose_name='Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца'),
+        ),
+        migrations.AddField(
+            model_name='bloodsmear',
+            name='shift_value',
+            field=models.FloatField(editable=False, null=True, verbose_name='Индекс сдвига лейкоцитов Н. И. Ябучинского'),
+        ),
+    ]
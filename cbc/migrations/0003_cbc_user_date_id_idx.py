@@ -0,0 +1,17 @@
+# Generated by Django 2.2 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0002_bloodsmear_index_values'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completebloodcount',
+            index=models.Index(fields=['user', 'analysis_date', 'id'], name='cbc_user_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0003_cbc_user_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='completebloodcount',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пациент'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodsmear',
+            index=models.Index(condition=models.Q(intoxicationKK_value__isnull=True), fields=['id'], name='smear_missing_indices_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='completebloodcount',
+            constraint=models.UniqueConstraint(fields=('user', 'analysis_date'), name='cbc_unique_user_date'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2 on 2026-10-18 10:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DIFFS = (
+    (3, 'ThreeDiff'),
+    (5, 'FiveDiff'),
+    (9, 'BloodSmear')
+)
+
+
+def type_from_diffs(apps, schema_editor):
+    CompleteBloodCount = apps.get_model('cbc', 'CompleteBloodCount')
+    for code, name in DIFFS:
+        model = apps.get_model('cbc', name)
+        CompleteBloodCount.objects.filter(pk__in=model.objects.values('cbc_id')).update(type=code)
+
+
+def generic_relation_from_diffs(apps, schema_editor):
+    CompleteBloodCount = apps.get_model('cbc', 'CompleteBloodCount')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    for code, name in DIFFS:
+        model = apps.get_model('cbc', name)
+        content_type, _ = ContentType.objects.get_or_create(app_label='cbc', model=name.lower())
+        for cbc_id, diff_id in model.objects.values_list('cbc_id', 'id').iterator():
+            CompleteBloodCount.objects.filter(pk=cbc_id).update(content_type=content_type, object_id=diff_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('cbc', '0004_cbc_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='completebloodcount',
+            name='content_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType'),
+        ),
+        migrations.AlterField(
+            model_name='completebloodcount',
+            name='object_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(type_from_diffs, generic_relation_from_diffs),
+        migrations.RemoveField(
+            model_name='completebloodcount',
+            name='content_type',
+        ),
+        migrations.RemoveField(
+            model_name='completebloodcount',
+            name='object_id',
+        ),
+    ]
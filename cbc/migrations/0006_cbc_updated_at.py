@@ -0,0 +1,18 @@
+# Generated by Django 2.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0005_remove_generic_relation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completebloodcount',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменён'),
+        ),
+    ]
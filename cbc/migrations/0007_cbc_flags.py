@@ -0,0 +1,18 @@
+# Generated by Django 2.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0006_cbc_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completebloodcount',
+            name='flags',
+            field=models.BigIntegerField(editable=False, null=True, verbose_name='Отклонения от нормы'),
+        ),
+    ]
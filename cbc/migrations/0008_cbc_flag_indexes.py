@@ -0,0 +1,48 @@
+# Generated by Django 2.2 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+# Bit positions of cbc.flags.FLAGGED at the time of the migration.
+FLAGGED = (
+    'leukocyte', 'erythrocyte', 'hemoglobin', 'hematocrit', 'sed_rate',
+    'neutrophil', 'promyelocyte', 'myelocyte', 'metamyelocyte', 'banded_neutrophil',
+    'segmented_neutrophil', 'lymphocyte', 'monocyte', 'eosinophil', 'basophil', 'plasma_cell',
+    'intoxicationKK', 'intoxicationO', 'nuclear', 'shift', 'allergy'
+)
+
+
+def index_name(name):
+    return f'cbc_flag_{name.lower()}_idx'
+
+
+def create_flag_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for position, name in enumerate(FLAGGED):
+        schema_editor.execute(
+            f'CREATE INDEX {index_name(name)} ON cbc_completebloodcount (analysis_date, id) '
+            f'WHERE (flags & {3 << 2 * position}) > 0'
+        )
+
+
+def drop_flag_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in FLAGGED:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0007_cbc_flags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completebloodcount',
+            index=models.Index(condition=models.Q(flags__gt=0), fields=['analysis_date', 'id'], name='cbc_flagged_date_idx'),
+        ),
+        migrations.RunPython(create_flag_indexes, drop_flag_indexes),
+    ]
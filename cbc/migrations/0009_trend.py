@@ -0,0 +1,56 @@
+# Generated by Django 2.2 on 2026-10-18 11:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbc', '0008_cbc_flag_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trend',
+            fields=[
+                ('cbc', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='cbc.CompleteBloodCount', verbose_name='Анализ')),
+                ('days', models.IntegerField(null=True, verbose_name='Дней после предыдущего анализа')),
+                ('leukocyte_delta', models.FloatField(null=True, verbose_name='Лейкоциты: изменение')),
+                ('leukocyte_change', models.FloatField(null=True, verbose_name='Лейкоциты: изменение, %')),
+                ('leukocyte_slope', models.FloatField(null=True, verbose_name='Лейкоциты: наклон в день')),
+                ('erythrocyte_delta', models.FloatField(null=True, verbose_name='Эритроциты: изменение')),
+                ('erythrocyte_change', models.FloatField(null=True, verbose_name='Эритроциты: изменение, %')),
+                ('erythrocyte_slope', models.FloatField(null=True, verbose_name='Эритроциты: наклон в день')),
+                ('hemoglobin_delta', models.FloatField(null=True, verbose_name='Гемоглобин: изменение')),
+                ('hemoglobin_change', models.FloatField(null=True, verbose_name='Гемоглобин: изменение, %')),
+                ('hemoglobin_slope', models.FloatField(null=True, verbose_name='Гемоглобин: наклон в день')),
+                ('hematocrit_delta', models.FloatField(null=True, verbose_name='Гематокрит: изменение')),
+                ('hematocrit_change', models.FloatField(null=True, verbose_name='Гематокрит: изменение, %')),
+                ('hematocrit_slope', models.FloatField(null=True, verbose_name='Гематокрит: наклон в день')),
+                ('sed_rate_delta', models.FloatField(null=True, verbose_name='СОЭ: изменение')),
+                ('sed_rate_change', models.FloatField(null=True, verbose_name='СОЭ: изменение, %')),
+                ('sed_rate_slope', models.FloatField(null=True, verbose_name='СОЭ: наклон в день')),
+                ('intoxicationKK_delta', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: изменение')),
+                ('intoxicationKK_change', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: изменение, %')),
+                ('intoxicationKK_slope', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: наклон в день')),
+                ('intoxicationO_delta', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации В. К. Островского: изменение')),
+                ('intoxicationO_change', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации В. К. Островского: изменение, %')),
+                ('intoxicationO_slope', models.FloatField(null=True, verbose_name='Лейкоцитарный индекс интоксикации В. К. Островского: наклон в день')),
+                ('nuclear_delta', models.FloatField(null=True, verbose_name='Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: изменение')),
+                ('nuclear_change', models.FloatField(null=True, verbose_name='Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: изменение, %')),
+                ('nuclear_slope', models.FloatField(null=True, verbose_name='Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: наклон в день')),
+                ('shift_delta', models.FloatField(null=True, verbose_name='Индекс сдвига лейкоцитов Н. И. Ябучинского: изменение')),
+                ('shift_change', models.FloatField(null=True, verbose_name='Индекс сдвига лейкоцитов Н. И. Ябучинского: изменение, %')),
+                ('shift_slope', models.FloatField(null=True, verbose_name='Индекс сдвига лейкоцитов Н. И. Ябучинского: наклон в день')),
+                ('allergy_delta', models.FloatField(null=True, verbose_name='Индекс аллергизации: изменение')),
+                ('allergy_change', models.FloatField(null=True, verbose_name='Индекс аллергизации: изменение, %')),
+                ('allergy_slope', models.FloatField(null=True, verbose_name='Индекс аллергизации: наклон в день')),
+                ('previous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cbc.CompleteBloodCount', verbose_name='Предыдущий анализ')),
+            ],
+            options={
+                'verbose_name': 'Динамика показателей',
+                'verbose_name_plural': 'Динамика показателей',
+            },
+        ),
+    ]
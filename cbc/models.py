@@ -1,7 +1,42 @@
 from django.conf import settings
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
+
+
+ANALYTES = (
+    'leukocyte',
+    'erythrocyte',
+    'hemoglobin',
+    'hematocrit',
+    'sed_rate'
+)
+
+INDICES = (
+    'intoxicationKK',
+    'intoxicationO',
+    'nuclear',
+    'shift',
+    'allergy'
+)
+
+INDEX_FIELDS = (
+    'intoxicationKK_value',
+    'intoxicationO_value',
+    'nuclear_value',
+    'shift_value',
+    'allergy_value'
+)
+
+
+class CBCQuerySet (models.QuerySet):
+    def with_diff(self):
+        """
+        Loads the differential of every analysis in the same query, it is
+        available as `diff` without further queries.
+        """
+        from cbc.diff_types import DIFF_RELATIONS
+
+        return self.select_related(*DIFF_RELATIONS.values())
 
 
 class CompleteBloodCount (models.Model):
@@ -18,6 +53,7 @@ class CompleteBloodCount (models.Model):
         on_delete=models.CASCADE,
         blank=True,
         null=True,
+        db_index=False,
         verbose_name="Пациент"
     )
     age = models.IntegerField(
@@ -49,19 +85,65 @@ class CompleteBloodCount (models.Model):
     )
     type = models.IntegerField()
     sum = models.FloatField()
+    flags = models.BigIntegerField(
+        verbose_name="Отклонения от нормы",
+        null=True,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Изменён"
+    )
 
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey('content_type', 'object_id')
+    objects = CBCQuerySet.as_manager()
 
     class Meta:
         ordering = ['-analysis_date']
+        indexes = [
+            models.Index(fields=['user', 'analysis_date', 'id'], name='cbc_user_date_id_idx'),
+            models.Index(fields=['analysis_date', 'id'], name='cbc_flagged_date_idx', condition=models.Q(flags__gt=0))
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'analysis_date'], name='cbc_unique_user_date')
+        ]
         verbose_name = "Общий анализ крови"
         verbose_name_plural = "Общий анализ крови"
 
     def __str__(self):
         return f"{self.user}: {self.analysis_date}"
 
+    @property
+    def diff(self):
+        """
+        Differential of the analysis, one of three_diff, five_diff and
+        blood_smear, or None when there is none.
+        """
+        from cbc.diff_types import DIFF_RELATIONS
+
+        for relation in DIFF_RELATIONS.values():
+            try:
+                return getattr(self, relation)
+            except models.ObjectDoesNotExist:
+                pass
+        return None
+
+
+class DiffQuerySet (models.QuerySet):
+    CBC_FIELDS = (
+        'cbc__user',
+        'cbc__analysis_date',
+        'cbc__type',
+        'cbc__leukocyte'
+    )
+
+    def for_user(self, user):
+        """
+        Differentials of the user's analyses with the analysis fields used by
+        templates and index methods loaded in the same query.
+        """
+        fields = [field.name for field in self.model._meta.concrete_fields]
+        return self.filter(cbc__user=user).select_related('cbc').only(*fields, *self.CBC_FIELDS)
+
 
 class ThreeDiff (models.Model):
     RELATIVE_CHOICE = 'relative'
@@ -94,6 +176,8 @@ class ThreeDiff (models.Model):
         verbose_name="Моноциты"
     )
 
+    objects = DiffQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Лейкоцитарная формула класса 3-диф"
         verbose_name_plural = "Лейкоцитарная формула класса 3-диф"
@@ -139,6 +223,8 @@ class FiveDiff (models.Model):
         verbose_name="Базофилы"
     )
 
+    objects = DiffQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Лейкоцитарная формула класса 5-диф"
         verbose_name_plural = "Лейкоцитарная формула класса 5-диф"
@@ -198,6 +284,31 @@ class BloodSmear (models.Model):
     plasma_cell = models.FloatField(
         verbose_name="Плазмациты"
     )
+    intoxicationKK_value = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа",
+        null=True,
+        editable=False
+    )
+    intoxicationO_value = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации В. К. Островского",
+        null=True,
+        editable=False
+    )
+    nuclear_value = models.FloatField(
+        verbose_name="Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца",
+        null=True,
+        editable=False
+    )
+    shift_value = models.FloatField(
+        verbose_name="Индекс сдвига лейкоцитов Н. И. Ябучинского",
+        null=True,
+        editable=False
+    )
+    allergy_value = models.FloatField(
+        verbose_name="Индекс аллергизации",
+        null=True,
+        editable=False
+    )
 
     def intoxicationKK(self):
         if self.value_type == "relative":
@@ -280,10 +391,212 @@ class BloodSmear (models.Model):
 
         return round((lymph + 10 * (eo + 1)) / (bn + sn + mono + baso), 2)
 
+    objects = DiffQuerySet.as_manager()
+
     class Meta:
         ordering = ['-cbc__analysis_date']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='smear_missing_indices_idx',
+                condition=models.Q(intoxicationKK_value__isnull=True)
+            )
+        ]
         verbose_name = "Микроскопия мазка крови"
         verbose_name_plural = "Микроскопия мазка крови"
 
     def __str__(self):
         return f"{self.cbc.user}: {self.cbc.analysis_date}"
+
+
+class DataVersionQuerySet (models.QuerySet):
+    def bump(self, keys):
+        """
+        Increments versions of the keys in the current transaction, missing
+        keys are created.
+        """
+        keys = set(keys)
+        if keys:
+            self.bulk_create([DataVersion(key=key) for key in keys], ignore_conflicts=True)
+            self.filter(key__in=keys).update(version=models.F('version') + 1, updated_at=timezone.now())
+
+    def current(self, key):
+        """
+        Returns (version, updated_at) of the key, (0, None) before its first bump.
+        """
+        return self.filter(key=key).values_list('version', 'updated_at').first() or (0, None)
+
+
+class DataVersion (models.Model):
+    key = models.CharField(
+        verbose_name="Ключ",
+        max_length=64,
+        primary_key=True
+    )
+    version = models.PositiveIntegerField(
+        verbose_name="Версия",
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Изменено",
+        default=timezone.now
+    )
+
+    objects = DataVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
+
+
+class Trend (models.Model):
+    cbc = models.OneToOneField(
+        CompleteBloodCount,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend',
+        verbose_name="Анализ"
+    )
+    previous = models.ForeignKey(
+        CompleteBloodCount,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Предыдущий анализ"
+    )
+    days = models.IntegerField(
+        verbose_name="Дней после предыдущего анализа",
+        null=True
+    )
+    leukocyte_delta = models.FloatField(
+        verbose_name="Лейкоциты: изменение",
+        null=True
+    )
+    leukocyte_change = models.FloatField(
+        verbose_name="Лейкоциты: изменение, %",
+        null=True
+    )
+    leukocyte_slope = models.FloatField(
+        verbose_name="Лейкоциты: наклон в день",
+        null=True
+    )
+    erythrocyte_delta = models.FloatField(
+        verbose_name="Эритроциты: изменение",
+        null=True
+    )
+    erythrocyte_change = models.FloatField(
+        verbose_name="Эритроциты: изменение, %",
+        null=True
+    )
+    erythrocyte_slope = models.FloatField(
+        verbose_name="Эритроциты: наклон в день",
+        null=True
+    )
+    hemoglobin_delta = models.FloatField(
+        verbose_name="Гемоглобин: изменение",
+        null=True
+    )
+    hemoglobin_change = models.FloatField(
+        verbose_name="Гемоглобин: изменение, %",
+        null=True
+    )
+    hemoglobin_slope = models.FloatField(
+        verbose_name="Гемоглобин: наклон в день",
+        null=True
+    )
+    hematocrit_delta = models.FloatField(
+        verbose_name="Гематокрит: изменение",
+        null=True
+    )
+    hematocrit_change = models.FloatField(
+        verbose_name="Гематокрит: изменение, %",
+        null=True
+    )
+    hematocrit_slope = models.FloatField(
+        verbose_name="Гематокрит: наклон в день",
+        null=True
+    )
+    sed_rate_delta = models.FloatField(
+        verbose_name="СОЭ: изменение",
+        null=True
+    )
+    sed_rate_change = models.FloatField(
+        verbose_name="СОЭ: изменение, %",
+        null=True
+    )
+    sed_rate_slope = models.FloatField(
+        verbose_name="СОЭ: наклон в день",
+        null=True
+    )
+    intoxicationKK_delta = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: изменение",
+        null=True
+    )
+    intoxicationKK_change = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: изменение, %",
+        null=True
+    )
+    intoxicationKK_slope = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации Я.Я. Кальф-Калифа: наклон в день",
+        null=True
+    )
+    intoxicationO_delta = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации В. К. Островского: изменение",
+        null=True
+    )
+    intoxicationO_change = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации В. К. Островского: изменение, %",
+        null=True
+    )
+    intoxicationO_slope = models.FloatField(
+        verbose_name="Лейкоцитарный индекс интоксикации В. К. Островского: наклон в день",
+        null=True
+    )
+    nuclear_delta = models.FloatField(
+        verbose_name="Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: изменение",
+        null=True
+    )
+    nuclear_change = models.FloatField(
+        verbose_name="Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: изменение, %",
+        null=True
+    )
+    nuclear_slope = models.FloatField(
+        verbose_name="Ядерный индекс степени эндотоксикоза Г.Д. Даштаянца: наклон в день",
+        null=True
+    )
+    shift_delta = models.FloatField(
+        verbose_name="Индекс сдвига лейкоцитов Н. И. Ябучинского: изменение",
+        null=True
+    )
+    shift_change = models.FloatField(
+        verbose_name="Индекс сдвига лейкоцитов Н. И. Ябучинского: изменение, %",
+        null=True
+    )
+    shift_slope = models.FloatField(
+        verbose_name="Индекс сдвига лейкоцитов Н. И. Ябучинского: наклон в день",
+        null=True
+    )
+    allergy_delta = models.FloatField(
+        verbose_name="Индекс аллергизации: изменение",
+        null=True
+    )
+    allergy_change = models.FloatField(
+        verbose_name="Индекс аллергизации: изменение, %",
+        null=True
+    )
+    allergy_slope = models.FloatField(
+        verbose_name="Индекс аллергизации: наклон в день",
+        null=True
+    )
+
+    class Meta:
+        verbose_name = "Динамика показателей"
+        verbose_name_plural = "Динамика показателей"
+
+    def __str__(self):
+        return f"{self.cbc_id}: {self.previous_id}"
+
@@ -0,0 +1,38 @@
+import datetime
+
+from django.db.models import Q
+
+
+PER_PAGE = 50
+
+
+def encode_cursor(cbc):
+    return f'{cbc.analysis_date.isoformat()}.{cbc.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Returns (analysis_date, pk) of a cursor, raises ValueError if it is invalid.
+    """
+    date, _, pk = cursor.partition('.')
+    return datetime.date.fromisoformat(date), int(pk)
+
+
+def keyset_page(queryset, cursor=None, per_page=PER_PAGE):
+    """
+    Returns analyses of the page after the cursor, newest first, and the
+    cursor of the next page or None for the last page. Pages are selected by
+    (analysis_date, id) instead of OFFSET, so every page costs the same. The
+    separate analysis_date <= date condition lets the database seek the
+    (user, analysis_date, id) index.
+    """
+    queryset = queryset.order_by('-analysis_date', '-id')
+    if cursor:
+        date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(analysis_date__lt=date) | Q(id__lt=pk), analysis_date__lte=date)
+
+    items = list(queryset[:per_page + 1])
+    if len(items) > per_page:
+        items = items[:per_page]
+        return items, encode_cursor(items[-1])
+    return items, None
@@ -0,0 +1,97 @@
+import glob
+import os
+import shutil
+from collections import defaultdict
+
+from cbc.export import CBC_COLUMNS, DIFF_COLUMNS, export_items
+from cbc.indices import INDICES
+
+
+INT_COLUMNS = ('id', 'age', 'hemoglobin', 'sed_rate', 'type')
+
+DICTIONARY_COLUMNS = ('sex', 'value_type')
+
+COLUMNS = CBC_COLUMNS + DIFF_COLUMNS + INDICES + ('flags',)
+
+
+def parquet_schema():
+    """
+    Returns the Arrow schema of exported analyses, year of the analysis date
+    is not stored in files but in the partition directory name.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for name in COLUMNS:
+        if name in DICTIONARY_COLUMNS:
+            type_ = pa.dictionary(pa.int32(), pa.string())
+        elif name == 'username':
+            type_ = pa.string()
+        elif name == 'analysis_date':
+            type_ = pa.date32()
+        elif name in INT_COLUMNS:
+            type_ = pa.int32()
+        elif name == 'flags':
+            type_ = pa.int64()
+        else:
+            type_ = pa.float64()
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def record_batch(items, schema):
+    import pyarrow as pa
+
+    arrays = []
+    for field in schema:
+        values = [item[field.name] for item in items]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_parquet(queryset, root, chunk_size=50000):
+    """
+    Writes analyses into a Parquet dataset partitioned by year, one file per
+    year at root/year=YYYY/part-0.parquet. Rows are converted to Arrow record
+    batches in chunks of chunk_size. Partitions of a previous export are
+    removed first. Returns the number of written rows.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for directory in glob.glob(os.path.join(root, 'year=*')):
+        shutil.rmtree(directory)
+
+    schema = parquet_schema()
+    writers = {}
+    written = 0
+
+    def flush(chunk):
+        for year, items in sorted(chunk.items()):
+            if year not in writers:
+                directory = os.path.join(root, f'year={year}')
+                os.makedirs(directory, exist_ok=True)
+                writers[year] = pq.ParquetWriter(os.path.join(directory, 'part-0.parquet'), schema)
+            writers[year].write_table(pa.Table.from_batches([record_batch(items, schema)]))
+
+    try:
+        chunk = defaultdict(list)
+        size = 0
+        for item in export_items(queryset, chunk_size=min(chunk_size, 2000)):
+            chunk[item['analysis_date'].year].append(item)
+            size += 1
+            if size >= chunk_size:
+                flush(chunk)
+                written += size
+                chunk = defaultdict(list)
+                size = 0
+        flush(chunk)
+        written += size
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return written
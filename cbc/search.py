@@ -0,0 +1,25 @@
+"""
+Clinic-wide search of analyses out of their reference ranges.
+
+The search runs on the flags stored with every analysis (see cbc.flags)
+instead of joining the ranges on age, sex and value type, so the database
+tests bits of one column. The flags > 0 condition matches the partial
+(analysis_date, id) index of flagged analyses, on PostgreSQL every analyte
+has a partial index of its own. Pages are read with keyset_page, newest
+first, and only ever touch the rows they return.
+"""
+from cbc.flags import filter_flags
+from cbc.models import CompleteBloodCount
+
+
+def out_of_range(name=None, direction=None, date_from=None, date_to=None):
+    """
+    Returns analyses of all patients with the name out of range in the
+    direction, any flagged analysis when they are not given.
+    """
+    queryset = CompleteBloodCount.objects.select_related('user')
+    if date_from:
+        queryset = queryset.filter(analysis_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(analysis_date__lte=date_to)
+    return filter_flags(queryset, name or None, direction or None)
@@ -0,0 +1,96 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from cbc.cache import cached_payload
+from cbc.diff_types import DIFF_MODELS, DIFF_RELATIONS, diff_fields
+from cbc.downsample import downsample_mask
+from cbc.indices import INDICES, INDEX_FIELDS
+from cbc.models import ANALYTES, CompleteBloodCount
+from range.lookup import get_cbc_range, get_index_range
+
+
+COLUMNS = ('pk', 'date', 'type') + ANALYTES + INDICES
+
+
+def series_ranges(user):
+    """
+    Returns (min, max) of every analyte and index the user's charts are drawn with.
+    """
+    ranges = {}
+    cbc_range = get_cbc_range(user.patient.sex, user.patient.get_age())
+    index_range = get_index_range()
+    for names, range_ in ((ANALYTES, cbc_range), (INDICES, index_range)):
+        if range_ is not None:
+            for name in names:
+                ranges[name] = (getattr(range_, f'{name}_min'), getattr(range_, f'{name}_max'))
+    return ranges
+
+
+def user_series(user, date_from=None, date_to=None, max_points=None):
+    """
+    Returns columnar chart data of the user's analyses ordered by date: one
+    list per column of COLUMNS, indices are None for analyses without smear.
+    With `max_points` analytes and indices are downsampled together to at
+    most that many analyses, analyses out of the reference range are kept
+    on top of them.
+    """
+    queryset = CompleteBloodCount.objects.filter(user=user)
+    if date_from:
+        queryset = queryset.filter(analysis_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(analysis_date__lte=date_to)
+
+    fields = ('pk', 'analysis_date', 'type') + ANALYTES + tuple(f'blood_smear__{field}' for field in INDEX_FIELDS)
+    rows = queryset.order_by('analysis_date', 'pk').values_list(*fields)
+
+    columns = list(zip(*rows)) or [()] * len(COLUMNS)
+    series = {name: list(column) for name, column in zip(COLUMNS, columns)}
+
+    if max_points and len(series['pk']) > max_points:
+        mask = downsample_mask(
+            [date.toordinal() for date in series['date']],
+            {name: series[name] for name in ANALYTES + INDICES},
+            max_points,
+            series_ranges(user)
+        )
+        series = {name: [value for value, keep in zip(column, mask) if keep] for name, column in series.items()}
+
+    series['date'] = [date.isoformat() for date in series['date']]
+    return series
+
+
+def cached_series(user, date_from=None, date_to=None, max_points=None):
+    """
+    Same as user_series, serialized to JSON and cached per user until the
+    user's analyses change.
+    """
+    return cached_payload(
+        user.pk,
+        'series:%s:%s:%s' % (date_from, date_to, max_points),
+        lambda: json.dumps(user_series(user, date_from, date_to, max_points), cls=DjangoJSONEncoder)
+    )
+
+
+def diff_series(user):
+    """
+    Returns differentials of the user's analyses ordered by date, a list of
+    dicts with analysis pk, date, type, leukocyte count and the values of
+    the differential for each of three_diff, five_diff and blood_smear.
+    """
+    result = {}
+    for code, model in DIFF_MODELS.items():
+        names = ('pk', 'date', 'type', 'leukocyte') + tuple(diff_fields(model))
+        rows = model.objects.filter(cbc__user=user).order_by('cbc__analysis_date', 'pk').values_list(
+            'cbc_id',
+            'cbc__analysis_date',
+            'cbc__type',
+            'cbc__leukocyte',
+            *diff_fields(model)
+        )
+        result[DIFF_RELATIONS[code]] = [dict(zip(names, row)) for row in rows]
+    return result
+
+
+def cached_diff_series(user):
+    return cached_payload(user.pk, 'diff', lambda: diff_series(user))
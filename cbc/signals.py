@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+from .models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear
+from .stats import invalidate_cohort
+
+
+def invalidate(user_id, sex, age):
+    """
+    Bumps versions of the user and the cohort in the writing transaction,
+    they change for every process when the write commits.
+    """
+    invalidate_user(user_id)
+    invalidate_cohort(sex, age)
+
+
+@receiver(post_save, sender=CompleteBloodCount)
+@receiver(post_delete, sender=CompleteBloodCount)
+def invalidate_cbc(sender, instance, **kwargs):
+    invalidate(instance.user_id, instance.sex, instance.age)
+
+
+@receiver(post_save, sender=ThreeDiff)
+@receiver(post_save, sender=FiveDiff)
+@receiver(post_save, sender=BloodSmear)
+@receiver(post_delete, sender=ThreeDiff)
+@receiver(post_delete, sender=FiveDiff)
+@receiver(post_delete, sender=BloodSmear)
+def invalidate_diff(sender, instance, **kwargs):
+    if sender.cbc.is_cached(instance):
+        user_id, sex, age = instance.cbc.user_id, instance.cbc.sex, instance.cbc.age
+    else:
+        cbc = CompleteBloodCount.objects.filter(pk=instance.cbc_id).values_list('user_id', 'sex', 'age').first()
+        user_id, sex, age = cbc or (None, None, None)
+    invalidate(user_id, sex, age)
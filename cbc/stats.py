@@ -0,0 +1,126 @@
+"""
+Population statistics of analytes and indices.
+
+Analyses are grouped into cohorts by sex and by the age bands of CBCRange,
+an analysis belongs to the band get_cbc_range resolves its age to. Count,
+mean, sample SD and the 2.5/50/97.5 percentiles of a cohort are computed
+by NumPy from its columns, read once in chunks.
+
+Every cohort is cached under the versions of the (sex, age) pairs it
+covers, DataVersion rows a write increments in its transaction like
+cbc.cache does for users. Only cohorts with new, changed or deleted
+analyses are computed again, the others are served from the cache.
+"""
+from itertools import islice
+
+import numpy as np
+from django.core.cache import cache
+
+from cbc.indices import INDICES, INDEX_FIELDS
+from cbc.models import ANALYTES, CompleteBloodCount, DataVersion
+from range.lookup import get_cbc_range
+from range.models import CBCRange
+
+
+PERCENTILES = (2.5, 50, 97.5)
+
+STAT_FIELDS = tuple(zip(ANALYTES, ANALYTES)) + tuple(
+    (name, f'blood_smear__{field}') for name, field in zip(INDICES, INDEX_FIELDS)
+)
+
+
+def version_key(sex, age):
+    return 'cohort:%s:%s' % (sex, age)
+
+
+def invalidate_cohort(sex, age):
+    invalidate_cohorts([(sex, age)])
+
+
+def invalidate_cohorts(pairs):
+    DataVersion.objects.bump(version_key(sex, age) for sex, age in set(pairs) if sex is not None)
+
+
+def cohort_versions(bands):
+    """
+    Returns a version of every cohort of `cohorts()`, the sum of versions
+    of its (sex, age) pairs, read in one query.
+    """
+    keys = [[version_key(sex, age) for age in ages] for sex, _, _, ages in bands]
+    versions = dict(DataVersion.objects.filter(
+        key__in=[key for band_keys in keys for key in band_keys]
+    ).values_list('key', 'version'))
+    return [sum(versions.get(key, 0) for key in band_keys) for band_keys in keys]
+
+
+def cohorts():
+    """
+    Returns (sex, age_min, age_max, ages) of every band of CBCRange, ages
+    are the whole ages get_cbc_range resolves to the band.
+    """
+    result = []
+    bands = CBCRange.objects.filter(is_draft=False).exclude(sex=None).order_by('sex', 'age_min', 'age_max')
+    for sex, age_min, age_max in bands.values_list('sex', 'age_min', 'age_max'):
+        ages = []
+        for age in range(age_min, age_max + 1):
+            band = get_cbc_range(sex, age)
+            if band is not None and (band.age_min, band.age_max) == (age_min, age_max):
+                ages.append(age)
+        result.append((sex, age_min, age_max, ages))
+    return result
+
+
+def read_columns(queryset, fields, chunk_size=2000):
+    """
+    Returns the fields of the queryset as a float array of one column per
+    field, NULL is read as NaN. Rows are read with a server-side cursor in
+    chunks, so only the array grows with the queryset.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=float))
+    if not chunks:
+        return np.empty((0, len(fields)))
+    return np.concatenate(chunks)
+
+
+def cohort_stats(sex, ages, chunk_size=2000):
+    """
+    Returns {name: {count, mean, sd, p2_5, p50, p97_5}} of the analyses of
+    the sex and ages, statistics of names without values are None.
+    """
+    queryset = CompleteBloodCount.objects.filter(sex=sex, age__in=ages)
+    columns = read_columns(queryset, [field for _, field in STAT_FIELDS], chunk_size)
+
+    stats = {}
+    for position, (name, _) in enumerate(STAT_FIELDS):
+        values = columns[:, position]
+        values = values[~np.isnan(values)]
+        count = int(values.size)
+        mean = float(values.mean()) if count else None
+        sd = float(values.std(ddof=1)) if count > 1 else None
+        percentiles = np.percentile(values, PERCENTILES).tolist() if count else [None] * len(PERCENTILES)
+
+        stats[name] = dict(count=count, mean=mean, sd=sd, p2_5=percentiles[0], p50=percentiles[1], p97_5=percentiles[2])
+    return stats
+
+
+def population_stats():
+    """
+    Returns a dict of sex, age_min, age_max and stats per cohort, cohorts
+    are computed again only when their analyses changed.
+    """
+    result = []
+    bands = cohorts()
+    for (sex, age_min, age_max, ages), version in zip(bands, cohort_versions(bands)):
+        key = 'cbc:stats:%s:%s:%s:%s' % (sex, age_min, age_max, version)
+        stats = cache.get(key)
+        if stats is None:
+            stats = cohort_stats(sex, ages)
+            cache.set(key, stats)
+        result.append(dict(sex=sex, age_min=age_min, age_max=age_max, stats=stats))
+    return result
@@ -0,0 +1,175 @@
+import datetime
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+
+from cbc.copy_import import CopyImporter
+from cbc.diff_types import DIFF_MODELS, diff_fields
+from cbc.importer import CBCImporter
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.series import ANALYTES
+from patient.models import Patient
+from range.lookup import get_cbc_range, get_reference_range
+
+
+DEFAULT_CBC_RANGE = {
+    'leukocyte': (4, 9),
+    'erythrocyte': (3.9, 5.5),
+    'hemoglobin': (120, 160),
+    'hematocrit': (36, 48),
+    'sed_rate': (2, 15)
+}
+
+DEFAULT_DIFF_RANGE = {
+    'neutrophil': (47, 72),
+    'promyelocyte': (0, 0),
+    'myelocyte': (0, 0),
+    'metamyelocyte': (0, 1),
+    'banded_neutrophil': (1, 6),
+    'segmented_neutrophil': (47, 72),
+    'lymphocyte': (19, 37),
+    'monocyte': (3, 11),
+    'eosinophil': (0.5, 5),
+    'basophil': (0, 1),
+    'plasma_cell': (0, 0)
+}
+
+TYPES = tuple(DIFF_MODELS)
+
+INTEGER_ANALYTES = ('hemoglobin', 'sed_rate')
+
+EPOCH = datetime.date(2020, 1, 1)
+
+MAX_AGE = 90
+
+
+def cbc_bounds(sex, age):
+    range_ = get_cbc_range(sex, age)
+    if range_ is None:
+        return DEFAULT_CBC_RANGE
+    return {name: (getattr(range_, f'{name}_min'), getattr(range_, f'{name}_max')) for name in ANALYTES}
+
+
+def diff_bounds(sex, age):
+    range_ = get_reference_range(sex, age, BloodSmear.RELATIVE_CHOICE)
+    if range_ is None:
+        return DEFAULT_DIFF_RANGE
+    return {
+        name: (getattr(range_.diff, f'{name}_min'), getattr(range_.diff, f'{name}_max'))
+        for name in DEFAULT_DIFF_RANGE
+    }
+
+
+class SyntheticGenerator:
+    """
+    Creates patients with analyses drawn around their reference ranges.
+    Every value is normally distributed within the range of the patient's
+    sex and age, about out_of_range of analyses get an analyte pushed out of
+    the range. Analyses are dated between the patient's birth and `epoch`,
+    so the same seed always gives the same data. Analyses are written with
+    CopyImporter on PostgreSQL and with CBCImporter elsewhere, like an
+    import of the same rows.
+    """
+
+    def __init__(self, seed=0, out_of_range=0.1, batch_size=5000, prefix='synthetic', epoch=EPOCH):
+        self.rng = np.random.default_rng(seed)
+        self.out_of_range = out_of_range
+        self.prefix = prefix
+        importer_class = CopyImporter if connection.vendor == 'postgresql' else CBCImporter
+        self.importer = importer_class(batch_size=batch_size)
+        self.batch_size = batch_size
+        self.epoch = epoch
+
+    def create_patients(self, count, analyses=0):
+        """
+        Creates count patients, every one old enough to have an analysis a
+        day from birth to the epoch.
+        """
+        users = []
+        for i in range(count):
+            user = User(username=f'{self.prefix}{i}', email=f'{self.prefix}{i}@example.com')
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users)
+        users = list(User.objects.filter(username__in=[user.username for user in users]).order_by('id'))
+
+        sexes = self.rng.choice([Patient.MALE_CHOICE, Patient.FEMALE_CHOICE], count)
+        days = self.rng.integers(max(365, analyses), MAX_AGE * 365, count)
+        patients = []
+        for user, sex, day in zip(users, sexes.tolist(), days.tolist()):
+            date_of_birth = self.epoch - datetime.timedelta(days=day)
+            patients.append(Patient(user=user, email=user.email, sex=sex, date_of_birth=date_of_birth))
+        Patient.objects.bulk_create(patients)
+        for user, patient in zip(users, patients):
+            user.patient = patient
+        return users
+
+    def draw(self, bounds, ages, size):
+        low = np.array([bounds[age][0] for age in ages], dtype=float)
+        high = np.array([bounds[age][1] for age in ages], dtype=float)
+        values = self.rng.normal((low + high) / 2, np.maximum(high - low, 1e-9) / 4, size)
+        return np.clip(values, low, high), low, high
+
+    def analyses(self, user, count):
+        patient = user.patient
+        birth = patient.date_of_birth
+        span = (self.epoch - birth).days + 1
+        offsets = np.sort(self.rng.choice(span, count, replace=False))[::-1]
+        dates = [self.epoch - datetime.timedelta(days=offset) for offset in offsets.tolist()]
+        ages = [date.year - birth.year for date in dates]
+        types = self.rng.choice(TYPES, count).tolist()
+
+        cbc_ranges = {age: cbc_bounds(patient.sex, age) for age in set(ages)}
+        diff_ranges = {age: diff_bounds(patient.sex, age) for age in set(ages)}
+
+        values = {}
+        for name in ANALYTES:
+            bounds = {age: cbc_ranges[age][name] for age in cbc_ranges}
+            values[name], low, high = self.draw(bounds, ages, count)
+
+            shifted = self.rng.random(count) < self.out_of_range / len(ANALYTES)
+            offset = self.rng.uniform(0.05, 0.5, count) * np.maximum(high - low, 1)
+            below = (self.rng.random(count) < 0.5) & (low - offset >= 0)
+            values[name] = np.where(shifted, np.where(below, low - offset, high + offset), values[name])
+
+        cells = {}
+        for name in DEFAULT_DIFF_RANGE:
+            bounds = {age: diff_ranges[age][name] for age in diff_ranges}
+            cells[name], _, _ = self.draw(bounds, ages, count)
+
+        for i, (date, age, type_) in enumerate(zip(dates, ages, types)):
+            cbc = CompleteBloodCount(
+                user_id=user.pk,
+                age=age,
+                sex=patient.sex,
+                analysis_date=date,
+                type=type_
+            )
+            for name in ANALYTES:
+                value = values[name][i]
+                setattr(cbc, name, int(round(value)) if name in INTEGER_ANALYTES else round(float(value), 2))
+
+            model = DIFF_MODELS[type_]
+            names = [name for name in diff_fields(model) if name != 'value_type']
+            total = sum(cells[name][i] for name in names) or 1
+            diff = model(value_type=BloodSmear.RELATIVE_CHOICE)
+            for name in names:
+                setattr(diff, name, round(float(cells[name][i] * 100 / total), 1))
+            cbc.sum = round(sum(getattr(diff, name) for name in names), 2) if model is BloodSmear else 100
+            yield cbc, diff
+
+    def run(self, patients, analyses):
+        """
+        Creates the patients and their analyses, returns the number of analyses.
+        """
+        batch = []
+        for user in self.create_patients(patients, analyses):
+            for item in self.analyses(user, analyses):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self.importer.save(batch)
+                    batch = []
+        if batch:
+            self.importer.save(batch)
+        return self.importer.imported
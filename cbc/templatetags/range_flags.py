@@ -0,0 +1,23 @@
+from django import template
+
+from cbc.flags import decode_flags, flag_label, range_flags
+
+
+register = template.Library()
+
+
+@register.filter
+def flag(cbc, name):
+    """
+    Returns 'low' or 'high' when the value of the analysis was out of its
+    reference range, an empty string otherwise.
+    """
+    return range_flags(cbc).get(name, '')
+
+
+@register.filter
+def flag_labels(flags):
+    """
+    Returns (label, 'low' or 'high') of the stored flags.
+    """
+    return [(flag_label(name), direction) for name, direction in decode_flags(flags or 0).items()]
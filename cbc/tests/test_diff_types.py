@@ -0,0 +1,85 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cbc.diff_types import DIFF_MODELS, DIFF_RELATIONS, TYPE_CODES, diff_fields, diff_model, type_name
+from cbc.models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear
+
+
+class TestDiffTypes(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_superuser(
+            username='admin',
+            password='qwerty123',
+            email='admin@gmail.com'
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.user.delete()
+
+    def create_cbc(self, day, type_):
+        return CompleteBloodCount.objects.create(
+            user=self.user,
+            sex='male',
+            age=30,
+            analysis_date=datetime.date(2020, 1, 1) + datetime.timedelta(days=day),
+            leukocyte=5,
+            erythrocyte=4.5,
+            hemoglobin=140,
+            hematocrit=44,
+            sed_rate=5,
+            type=type_,
+            sum=100
+        )
+
+    def test_diff_types_registry(self):
+        self.assertEqual(DIFF_RELATIONS, {3: 'three_diff', 5: 'five_diff', 9: 'blood_smear'})
+        self.assertEqual(TYPE_CODES, {ThreeDiff: 3, FiveDiff: 5, BloodSmear: 9})
+        self.assertEqual(diff_model(5), FiveDiff)
+        self.assertIsNone(diff_model(2))
+        self.assertEqual(type_name(9), 'Микроскопия мазка крови')
+        self.assertEqual(type_name(2), '')
+        self.assertEqual(diff_fields(ThreeDiff), ['value_type', 'neutrophil', 'lymphocyte', 'monocyte'])
+
+        for code, model in DIFF_MODELS.items():
+            self.assertEqual(CompleteBloodCount._meta.get_field(DIFF_RELATIONS[code]).related_model, model)
+
+    def test_diff_types_admin_changelist(self):
+        url = reverse('admin:cbc_completebloodcount_changelist')
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(context)
+
+        self.create_cbc(0, 3)
+        count = count_queries()
+        for day in range(1, 6):
+            self.create_cbc(day, 5)
+
+        self.assertEqual(count_queries(), count)
+        self.assertContains(self.client.get(url), 'Лейкоцитарная формула класса 5-диф', count=5)
+
+    def test_diff_types_admin_sets_type(self):
+        cbc = self.create_cbc(0, 3)
+        response = self.client.post(reverse('admin:cbc_fivediff_add'), {
+            'cbc': cbc.pk,
+            'value_type': 'relative',
+            'neutrophil': 60,
+            'lymphocyte': 30,
+            'monocyte': 6,
+            'eosinophil': 3,
+            'basophil': 1
+        })
+
+        self.assertEqual(response.status_code, 302)
+        cbc.refresh_from_db()
+        self.assertEqual(cbc.type, 5)
@@ -0,0 +1,60 @@
+import math
+
+from django.test import SimpleTestCase
+
+from cbc.downsample import lttb, downsample_mask
+
+
+class TestDownsampleCBC(SimpleTestCase):
+
+    def test_lttb_keeps_size(self):
+        x = list(range(10))
+
+        self.assertEqual(list(lttb(x, x, 20)), x)
+        self.assertEqual(list(lttb(x, x, 2)), x)
+
+    def test_lttb_selects_threshold(self):
+        x = list(range(1000))
+        y = [math.sin(i / 10) for i in x]
+        selected = lttb(x, y, 50)
+
+        self.assertEqual(len(selected), 50)
+        self.assertEqual(selected[0], 0)
+        self.assertEqual(selected[-1], 999)
+        self.assertEqual(list(selected), sorted(set(selected)))
+
+    def test_lttb_keeps_peak(self):
+        x = list(range(100))
+        y = [1] * 100
+        y[42] = 50
+
+        self.assertIn(42, lttb(x, y, 10))
+
+    def test_downsample_mask_keeps_out_of_range(self):
+        x = list(range(100))
+        columns = {
+            'leukocyte': [5] * 100,
+            'allergy': [None] * 100
+        }
+        columns['leukocyte'][17] = 3
+        columns['leukocyte'][63] = 12
+        mask = downsample_mask(x, columns, 5, {'leukocyte': (4, 9)})
+
+        self.assertTrue(mask[17])
+        self.assertTrue(mask[63])
+        self.assertTrue(mask[0])
+        self.assertTrue(mask[99])
+        self.assertLessEqual(mask.sum(), 7)
+
+    def test_downsample_mask_limits_merged_rows(self):
+        x = list(range(1000))
+        columns = {
+            'leukocyte': [math.sin(i / 10) for i in x],
+            'erythrocyte': [math.cos(i / 7) for i in x],
+            'hemoglobin': [i % 37 for i in x],
+            'allergy': [None if i % 2 else math.sin(i / 3) for i in x]
+        }
+
+        for max_points in (3, 10, 50):
+            self.assertLessEqual(downsample_mask(x, columns, max_points, {}).sum(), max_points)
+        self.assertGreater(downsample_mask(x, columns, 50, {}).sum(), 40)
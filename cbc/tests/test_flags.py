@@ -0,0 +1,199 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from cbc.flags import HIGH, LOW, decode_flags, filter_flags, flag_bit, flag_names, refresh_flags
+from cbc.importer import CBCImporter
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.search import out_of_range
+from patient.models import Patient
+from range.lookup import range_index
+from range.models import CBCRange, DiffRange, IndexRange, ReferenceRange
+
+
+SMEAR = {
+    'value_type': 'relative',
+    'promyelocyte': 0,
+    'myelocyte': 0,
+    'metamyelocyte': 0,
+    'banded_neutrophil': 4,
+    'segmented_neutrophil': 66,
+    'lymphocyte': 22,
+    'monocyte': 8,
+    'eosinophil': 0,
+    'basophil': 0,
+    'plasma_cell': 0
+}
+
+
+class TestFlags(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.addCleanup(range_index.invalidate)
+
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.client.force_login(self.user)
+
+        self.cbc_range = CBCRange.objects.create(
+            sex='male', age_min=18, age_max=60,
+            leukocyte_min=4, leukocyte_max=9,
+            erythrocyte_min=3.9, erythrocyte_max=5.5,
+            hemoglobin_min=120, hemoglobin_max=160,
+            hematocrit_min=36, hematocrit_max=48,
+            sed_rate_min=2, sed_rate_max=15
+        )
+        self.diff_range = DiffRange.objects.create(
+            age_min=18, age_max=60, value_type='relative',
+            promyelocyte_min=0, promyelocyte_max=0,
+            myelocyte_min=0, myelocyte_max=0,
+            metamyelocyte_min=0, metamyelocyte_max=1,
+            neutrophil_min=47, neutrophil_max=72,
+            banded_neutrophil_min=1, banded_neutrophil_max=6,
+            segmented_neutrophil_min=47, segmented_neutrophil_max=72,
+            lymphocyte_min=25, lymphocyte_max=37,
+            monocyte_min=3, monocyte_max=11,
+            eosinophil_min=0.5, eosinophil_max=5,
+            basophil_min=0, basophil_max=1,
+            plasma_cell_min=0, plasma_cell_max=0
+        )
+        self.reference_range = ReferenceRange.objects.create(cbc=self.cbc_range, diff=self.diff_range)
+        self.index_range = IndexRange.objects.create(
+            intoxicationKK_min=0.3, intoxicationKK_max=1.5,
+            intoxicationO_min=0.5, intoxicationO_max=1.5,
+            nuclear_min=0.05, nuclear_max=0.08,
+            shift_min=1.7, shift_max=2.4,
+            allergy_min=0.4, allergy_max=1.2
+        )
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+        self.reference_range.delete()
+        self.cbc_range.delete()
+        self.diff_range.delete()
+        self.index_range.delete()
+
+    def post_smear(self, date, leukocyte):
+        data = {
+            'analysis_date': date,
+            'leukocyte': leukocyte,
+            'erythrocyte': 4.5,
+            'hemoglobin': 140,
+            'hematocrit': 44,
+            'sed_rate': 20,
+            'sum': 100,
+            'blood_smear-TOTAL_FORMS': 1,
+            'blood_smear-INITIAL_FORMS': 0,
+            'blood_smear-MAX_NUM_FORMS': 1
+        }
+        data.update({f'blood_smear-0-{name}': value for name, value in SMEAR.items()})
+        response = self.client.post(reverse_lazy('cbc:blood-smear-create'), data)
+        self.assertEqual(response.status_code, 302)
+        return CompleteBloodCount.objects.get(user=self.user, analysis_date=date)
+
+    def test_flags_on_create(self):
+        cbc = self.post_smear('2020-05-05', 3)
+
+        self.assertEqual(decode_flags(cbc.flags), {
+            'leukocyte': LOW,
+            'sed_rate': HIGH,
+            'lymphocyte': LOW,
+            'eosinophil': LOW,
+            'intoxicationKK': HIGH,
+            'intoxicationO': HIGH,
+            'nuclear': HIGH,
+            'shift': HIGH
+        })
+        self.assertEqual(flag_names(flag_bit('leukocyte', LOW) | flag_bit('sed_rate', HIGH)),
+                         'leukocyte:low sed_rate:high')
+
+    def test_flags_keep_range(self):
+        cbc = self.post_smear('2020-05-05', 3)
+        flags = cbc.flags
+
+        self.cbc_range.leukocyte_min = 2
+        self.cbc_range.save()
+        cbc.refresh_from_db()
+        self.assertEqual(cbc.flags, flags)
+
+        response = self.client.get(reverse_lazy('cbc:blood-smear-detail', args=[cbc.pk]))
+        self.assertContains(response, 'Понижено')
+
+    def test_filter_flags(self):
+        low = self.post_smear('2020-05-05', 3)
+        high = self.post_smear('2020-05-06', 12)
+        normal = CompleteBloodCount.objects.create(
+            user=self.user, sex='male', age=30, analysis_date=datetime.date(2020, 5, 7),
+            leukocyte=5, erythrocyte=4.5, hemoglobin=140, hematocrit=44, sed_rate=5,
+            type=9, sum=100, flags=0
+        )
+        queryset = CompleteBloodCount.objects.filter(user=self.user)
+
+        self.assertEqual(list(filter_flags(queryset, 'leukocyte', LOW)), [low])
+        self.assertEqual(list(filter_flags(queryset, 'leukocyte', HIGH)), [high])
+        self.assertEqual(set(filter_flags(queryset, 'leukocyte')), {low, high})
+        self.assertNotIn(normal, filter_flags(queryset))
+
+    def test_refresh_flags(self):
+        cbc = CompleteBloodCount.objects.create(
+            user=self.user, sex='male', age=30, analysis_date=datetime.date(2020, 5, 5),
+            leukocyte=10, erythrocyte=4.5, hemoglobin=140, hematocrit=44, sed_rate=5,
+            type=9, sum=100
+        )
+        BloodSmear.objects.create(cbc=cbc, **SMEAR)
+        self.assertIsNone(cbc.flags)
+
+        self.assertEqual(refresh_flags(CompleteBloodCount.objects.filter(flags__isnull=True)), 1)
+        cbc.refresh_from_db()
+        self.assertEqual(decode_flags(cbc.flags)['leukocyte'], HIGH)
+        self.assertEqual(decode_flags(cbc.flags)['lymphocyte'], LOW)
+
+    def test_importer_flags(self):
+        importer = CBCImporter()
+        importer.run([dict(
+            username='test', analysis_date='2020-05-05', leukocyte=3, erythrocyte=4.5,
+            hemoglobin=140, hematocrit=44, sed_rate=5, type=9, **SMEAR
+        )])
+        self.assertEqual(importer.rejected, [])
+
+        cbc = CompleteBloodCount.objects.get(user=self.user)
+        self.assertEqual(decode_flags(cbc.flags)['leukocyte'], LOW)
+        self.assertEqual(decode_flags(cbc.flags)['intoxicationKK'], HIGH)
+
+    def test_flags_on_profile(self):
+        cbc = self.post_smear('2020-05-05', 3)
+        self.assertIn(cbc, out_of_range('leukocyte', LOW))
+
+        CBCRange.objects.create(
+            sex='female', age_min=18, age_max=60,
+            leukocyte_min=2, leukocyte_max=9,
+            erythrocyte_min=3.9, erythrocyte_max=5.5,
+            hemoglobin_min=120, hemoglobin_max=160,
+            hematocrit_min=36, hematocrit_max=48,
+            sed_rate_min=2, sed_rate_max=15
+        )
+        range_index.invalidate()
+        response = self.client.post(reverse_lazy('patient:edit_profile', args=[self.patient.pk]), {
+            'email': self.user.email,
+            'sex': 'female',
+            'date_of_birth': '1990-04-25'
+        })
+        self.assertEqual(response.status_code, 302)
+
+        cbc.refresh_from_db()
+        self.assertNotIn('leukocyte', decode_flags(cbc.flags))
+        self.assertEqual(decode_flags(cbc.flags)['sed_rate'], HIGH)
+        self.assertNotIn(cbc, out_of_range('leukocyte', LOW))
@@ -3,7 +3,8 @@ import datetime
 from django.contrib.auth.models import User
 from django.test import TestCase
 
-from cbc.forms import ThreeDiffFormSet, FiveDiffFormSet, BloodSmearFormSet
+from cbc.forms import CBCModelForm, ThreeDiffFormSet, FiveDiffFormSet, BloodSmearFormSet
+from cbc.models import CompleteBloodCount
 from patient.models import Patient
 
 
@@ -76,3 +77,34 @@ class TestFormsCBC(TestCase):
             }
         )
         self.assertTrue(form.is_valid())
+
+    def test_form_duplicate_date(self):
+        cbc = CompleteBloodCount.objects.create(
+            user=self.user,
+            sex=self.user.patient.sex,
+            age=self.user.patient.get_age(),
+            analysis_date=datetime.date(2020, 4, 29),
+            leukocyte=1,
+            erythrocyte=1,
+            hemoglobin=1,
+            hematocrit=1,
+            sed_rate=1,
+            type=3,
+            sum=100
+        )
+        data = {
+            'analysis_date': '2020-04-29',
+            'leukocyte': 1,
+            'erythrocyte': 1,
+            'hemoglobin': 1,
+            'hematocrit': 1,
+            'sed_rate': 1,
+            'sum': 100
+        }
+
+        form = CBCModelForm(self.user, data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('analysis_date', form.errors)
+
+        form = CBCModelForm(self.user, data=data, instance=cbc)
+        self.assertTrue(form.is_valid())
@@ -0,0 +1,138 @@
+import csv
+import datetime
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from cbc.copy_import import CopyImporter
+from cbc.importer import CBCImporter
+from cbc.models import CompleteBloodCount, ThreeDiff, BloodSmear
+from patient.models import Patient
+
+
+class TestImporterCBC(TestCase):
+
+    importer_class = CBCImporter
+    command_options = ()
+
+    header = [
+        'username', 'age', 'sex', 'analysis_date', 'leukocyte', 'erythrocyte', 'hemoglobin', 'hematocrit',
+        'sed_rate', 'type', 'value_type', 'neutrophil', 'lymphocyte', 'monocyte', 'eosinophil', 'basophil',
+        'promyelocyte', 'myelocyte', 'metamyelocyte', 'banded_neutrophil', 'segmented_neutrophil', 'plasma_cell'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.cbc = CompleteBloodCount.objects.create(
+            user=self.user,
+            sex=self.user.patient.sex,
+            age=self.user.patient.get_age(),
+            analysis_date=datetime.date(2020, 4, 29),
+            leukocyte=1,
+            erythrocyte=1,
+            hemoglobin=1,
+            hematocrit=1,
+            sed_rate=1,
+            type=3,
+            sum=100
+        )
+        self.rows = [
+            ['test', '', '', '2020-05-01', '5,5', '4.5', '140', '44', '5', '3', 'relative', '60', '30', '10',
+             '', '', '', '', '', '', '', ''],
+            ['', '30', 'female', '02.05.2020', '10.5', '4.5', '140', '44', '5', '9', 'relative', '', '22', '8',
+             '0', '0', '0', '0', '0', '4', '66', '0'],
+            ['test', '', '', '2020-04-29', '5', '4.5', '140', '44', '5', '3', 'relative', '60', '30', '10',
+             '', '', '', '', '', '', '', ''],
+            ['test', '', '', '2020-05-01', '5', '4.5', '140', '44', '5', '3', 'relative', '60', '30', '10',
+             '', '', '', '', '', '', '', ''],
+            ['', '30', 'female', '2020-05-03', '5', '4.5', '140', '44', '5', '9', 'relative', '', '22', '8',
+             '0', '0', '0', '0', '0', '4', '50', '0'],
+            ['unknown', '', '', '2020-05-04', '5', '4.5', '140', '44', '5', '7', 'relative', '60', '30', '10',
+             '', '', '', '', '', '', '', '']
+        ]
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+        self.cbc.delete()
+
+    def test_importer_rows(self):
+        importer = self.importer_class(batch_size=2)
+        importer.run(dict(zip(self.header, row)) for row in self.rows)
+
+        self.assertEqual(importer.imported, 2)
+        self.assertEqual(
+            [(line, sorted(errors)) for line, errors in importer.rejected],
+            [(4, ['analysis_date']), (5, ['analysis_date']), (6, ['sum']), (7, ['type', 'username'])]
+        )
+
+        three_diff = ThreeDiff.objects.get(cbc__analysis_date=datetime.date(2020, 5, 1))
+        self.assertEqual(three_diff.cbc.user, self.user)
+        self.assertEqual(three_diff.cbc.leukocyte, 5.5)
+        self.assertEqual(three_diff.cbc.sum, 100)
+        self.assertEqual(three_diff.cbc.diff, three_diff)
+
+        blood_smear = BloodSmear.objects.get()
+        self.assertIsNone(blood_smear.cbc.user)
+        self.assertEqual(blood_smear.cbc.sex, 'female')
+        self.assertEqual(blood_smear.cbc.type, 9)
+        self.assertEqual(blood_smear.cbc.diff, blood_smear)
+        self.assertEqual(blood_smear.intoxicationKK_value, 2.47)
+
+    def test_importer_corrected_row(self):
+        rows = [
+            ['test', '', '', '2020-05-05', '5', '4.5', '140', '44', '5', '9', 'relative', '', '22', '8',
+             '0', '0', '0', '0', '0', '4', '50', '0'],
+            ['test', '', '', '2020-05-05', '5', '4.5', '140', '44', '5', '9', 'relative', '', '22', '8',
+             '0', '0', '0', '0', '0', '4', '66', '0']
+        ]
+        importer = self.importer_class()
+        importer.run(dict(zip(self.header, row)) for row in rows)
+
+        self.assertEqual(importer.imported, 1)
+        self.assertEqual([(line, sorted(errors)) for line, errors in importer.rejected], [(2, ['sum'])])
+        self.assertEqual(BloodSmear.objects.get(cbc__user=self.user).segmented_neutrophil, 66)
+
+    def test_importer_command(self):
+        path = tempfile.mktemp(suffix='.csv')
+        rejected = tempfile.mktemp(suffix='.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(self.header)
+            writer.writerows(self.rows)
+
+        out = StringIO()
+        try:
+            call_command('import_cbc', path, '--rejected', rejected, *self.command_options, stdout=out)
+            with open(rejected, encoding='utf-8') as file:
+                lines = list(csv.reader(file))
+        finally:
+            os.remove(path)
+            os.remove(rejected)
+
+        self.assertIn('Импортировано: 2, отклонено: 4', out.getvalue())
+        self.assertEqual(lines[0], ['line', 'field', 'error'])
+        self.assertEqual(len(lines), 6)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY requires PostgreSQL')
+class TestCopyImporterCBC(TestImporterCBC):
+
+    importer_class = CopyImporter
+    command_options = ('--copy',)
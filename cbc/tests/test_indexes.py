@@ -0,0 +1,61 @@
+import datetime
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import TestCase
+
+from cbc.flags import HIGH, LOW, flag_bit
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.pagination import PER_PAGE
+from cbc.search import out_of_range
+from cbc.synthetic import SyntheticGenerator
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked on PostgreSQL')
+class TestIndexesCBC(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticGenerator(seed=0, prefix='index').run(40, 500)
+        analyses = CompleteBloodCount.objects.all()
+        analyses.update(flags=0)
+        analyses.annotate(rest=F('id') % 5).filter(rest=0).update(flags=flag_bit('hemoglobin', LOW))
+        analyses.annotate(rest=F('id') % 50).filter(rest=0).update(flags=flag_bit('leukocyte', HIGH))
+        with connection.cursor() as cursor:
+            for model in (CompleteBloodCount, BloodSmear):
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(model._meta.db_table))
+        cls.user = User.objects.get(username='index0')
+
+    def assertIndexScan(self, queryset, index, model=CompleteBloodCount):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn(f'Seq Scan on {model._meta.db_table}', plan)
+
+    def test_index_user_analyses(self):
+        queryset = CompleteBloodCount.objects.filter(user=self.user).order_by('-analysis_date', '-id')[:51]
+        self.assertIndexScan(queryset, 'cbc_user_date_id_idx')
+
+    def test_index_user_date(self):
+        date = CompleteBloodCount.objects.filter(user=self.user).values_list('analysis_date', flat=True)[0]
+        queryset = CompleteBloodCount.objects.filter(user=self.user, analysis_date=date)
+        self.assertIndexScan(queryset, 'cbc_unique_user_date')
+
+    def test_index_user_smears(self):
+        self.assertIndexScan(BloodSmear.objects.for_user(self.user), 'cbc_unique_user_date')
+
+    def test_index_missing_indices(self):
+        queryset = BloodSmear.objects.filter(intoxicationKK_value__isnull=True).order_by('pk')
+        self.assertIndexScan(queryset, 'smear_missing_indices_idx', BloodSmear)
+
+    def test_index_flag_direction(self):
+        queryset = out_of_range('leukocyte', HIGH).order_by('-analysis_date', '-id')[:PER_PAGE + 1]
+        self.assertIndexScan(queryset, 'cbc_flag_leukocyte_idx')
+
+    def test_unique_user_date(self):
+        analysis = CompleteBloodCount.objects.filter(user=self.user).first()
+        analysis.pk = None
+        with self.assertRaises(IntegrityError) as context, transaction.atomic():
+            analysis.save()
+        self.assertIn('cbc_unique_user_date', str(context.exception))
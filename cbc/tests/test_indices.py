@@ -0,0 +1,156 @@
+import datetime
+import math
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from cbc.indices import INDICES, compute_indices, queryset_indices, stored_indices, refresh_indices
+from cbc.models import CompleteBloodCount, BloodSmear
+from patient.models import Patient
+
+
+class TestIndicesCBC(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.cbc_relative = CompleteBloodCount.objects.create(
+            user=self.user,
+            sex=self.user.patient.sex,
+            age=self.user.patient.get_age(),
+            analysis_date=datetime.date(2020, 4, 29),
+            leukocyte=10.5,
+            erythrocyte=3.5,
+            hemoglobin=110,
+            hematocrit=33,
+            sed_rate=4,
+            type=9,
+            sum=100
+        )
+        self.cbc_absolute = CompleteBloodCount.objects.create(
+            user=self.user,
+            sex=self.user.patient.sex,
+            age=self.user.patient.get_age(),
+            analysis_date=datetime.date(2020, 4, 30),
+            leukocyte=10.5,
+            erythrocyte=3.5,
+            hemoglobin=110,
+            hematocrit=33,
+            sed_rate=4,
+            type=9,
+            sum=100
+        )
+        self.blood_smear_relative = BloodSmear.objects.create(
+            cbc=self.cbc_relative,
+            value_type='relative',
+            promyelocyte=0,
+            myelocyte=1,
+            metamyelocyte=2,
+            banded_neutrophil=4,
+            segmented_neutrophil=61,
+            lymphocyte=22,
+            monocyte=8,
+            eosinophil=1,
+            basophil=0,
+            plasma_cell=1
+        )
+        self.blood_smear_absolute = BloodSmear.objects.create(
+            cbc=self.cbc_absolute,
+            value_type='absolute',
+            promyelocyte=0,
+            myelocyte=0,
+            metamyelocyte=0,
+            banded_neutrophil=0.42,
+            segmented_neutrophil=6.93,
+            lymphocyte=2.31,
+            monocyte=0.84,
+            eosinophil=0,
+            basophil=0,
+            plasma_cell=0
+        )
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+        self.cbc_relative.delete()
+        self.cbc_absolute.delete()
+
+    def test_indices_queryset_matches_model(self):
+        indices = queryset_indices(BloodSmear.objects.filter(cbc__user=self.user))
+
+        self.assertEqual(len(indices), 2)
+        for item, blood_smear in zip(indices, [self.blood_smear_absolute, self.blood_smear_relative]):
+            self.assertEqual(item['pk'], blood_smear.cbc.pk)
+            self.assertEqual(item['date'], blood_smear.cbc.analysis_date)
+            self.assertEqual(item['type'], 9)
+            for name in INDICES:
+                self.assertEqual(item[name], getattr(blood_smear, name)())
+
+    def test_indices_queryset_empty(self):
+        self.assertEqual(queryset_indices(BloodSmear.objects.none()), [])
+
+    def test_indices_zero_denominator(self):
+        cells = {
+            'myelocyte': [0],
+            'metamyelocyte': [0],
+            'banded_neutrophil': [0],
+            'segmented_neutrophil': [0],
+            'lymphocyte': [0],
+            'monocyte': [0],
+            'eosinophil': [0],
+            'basophil': [0],
+            'plasma_cell': [0]
+        }
+        result = compute_indices(cells, ['relative'], [0])
+
+        for name in INDICES:
+            self.assertTrue(math.isnan(result[name][0]))
+
+    def test_indices_refresh(self):
+        queryset = BloodSmear.objects.filter(cbc__user=self.user)
+
+        self.assertEqual(refresh_indices(queryset, batch_size=1), 2)
+        self.assertEqual(stored_indices(queryset), queryset_indices(queryset))
+
+    def test_indices_backfill_command(self):
+        call_command('backfill_indices', '--missing', stdout=StringIO())
+
+        blood_smear = BloodSmear.objects.get(pk=self.blood_smear_relative.pk)
+        self.assertEqual(blood_smear.intoxicationKK_value, blood_smear.intoxicationKK())
+        self.assertEqual(blood_smear.allergy_value, blood_smear.allergy())
+
+    def test_indices_admin_leukocyte(self):
+        refresh_indices(BloodSmear.objects.filter(cbc__user=self.user))
+        admin = User.objects.create_superuser(username='admin', password='qwerty123', email='admin@gmail.com')
+        self.client.force_login(admin)
+
+        response = self.client.post(reverse('admin:cbc_completebloodcount_change', args=[self.cbc_absolute.pk]), {
+            'user': self.user.pk,
+            'age': self.cbc_absolute.age,
+            'sex': self.cbc_absolute.sex,
+            'analysis_date': '2020-04-30',
+            'leukocyte': 5.25,
+            'erythrocyte': 3.5,
+            'hemoglobin': 110,
+            'hematocrit': 33,
+            'sed_rate': 4
+        })
+        self.assertEqual(response.status_code, 302)
+
+        blood_smear = BloodSmear.objects.get(pk=self.blood_smear_absolute.pk)
+        self.assertEqual(blood_smear.cbc.leukocyte, 5.25)
+        self.assertEqual(blood_smear.allergy_value, blood_smear.allergy())
+        self.assertNotEqual(blood_smear.allergy_value, self.blood_smear_absolute.allergy())
+        admin.delete()
@@ -32,8 +32,6 @@ class TestModelCBC(TestCase):
             hematocrit=33,
             sed_rate=4,
             type=9,
-            content_type_id=7,
-            object_id=1,
             sum=100
         )
 
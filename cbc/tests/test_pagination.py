@@ -0,0 +1,52 @@
+import datetime
+
+from django.test import TestCase
+
+from cbc.models import CompleteBloodCount
+from cbc.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+class TestPaginationCBC(TestCase):
+
+    def setUp(self):
+        self.cbcs = []
+        for day in (1, 2, 2, 2, 3, 4, 4):
+            self.cbcs.append(CompleteBloodCount.objects.create(
+                sex='male',
+                age=30,
+                analysis_date=datetime.date(2020, 5, day),
+                leukocyte=1,
+                erythrocyte=1,
+                hemoglobin=1,
+                hematocrit=1,
+                sed_rate=1,
+                type=3,
+                sum=100
+            ))
+
+    def tearDown(self):
+        for cbc in self.cbcs:
+            cbc.delete()
+
+    def test_pagination_pages(self):
+        queryset = CompleteBloodCount.objects.all()
+        pages = []
+        cursor = None
+        while True:
+            items, cursor = keyset_page(queryset, cursor, per_page=3)
+            pages.append(items)
+            if cursor is None:
+                break
+
+        self.assertEqual([len(items) for items in pages], [3, 3, 1])
+        expected = sorted(self.cbcs, key=lambda cbc: (cbc.analysis_date, cbc.pk), reverse=True)
+        self.assertEqual([cbc for items in pages for cbc in items], expected)
+
+    def test_pagination_cursor(self):
+        cursor = encode_cursor(self.cbcs[2])
+
+        self.assertEqual(decode_cursor(cursor), (datetime.date(2020, 5, 2), self.cbcs[2].pk))
+        with self.assertRaises(ValueError):
+            decode_cursor('2020-05-02')
+        with self.assertRaises(ValueError):
+            decode_cursor('2020-05-32.1')
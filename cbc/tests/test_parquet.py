@@ -0,0 +1,83 @@
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cbc.models import CompleteBloodCount, BloodSmear
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+@skipUnless(pq, 'pyarrow is not installed')
+class TestParquetCBC(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cbcs = []
+        for analysis_date, type_ in ((datetime.date(2019, 12, 31), 3), (datetime.date(2020, 1, 1), 9)):
+            self.cbcs.append(CompleteBloodCount.objects.create(
+                sex='female',
+                age=30,
+                analysis_date=analysis_date,
+                leukocyte=5,
+                erythrocyte=4.5,
+                hemoglobin=140,
+                hematocrit=44,
+                sed_rate=5,
+                type=type_,
+                sum=100
+            ))
+        self.blood_smear = BloodSmear.objects.create(
+            cbc=self.cbcs[1],
+            value_type='relative',
+            promyelocyte=0,
+            myelocyte=0,
+            metamyelocyte=0,
+            banded_neutrophil=4,
+            segmented_neutrophil=66,
+            lymphocyte=22,
+            monocyte=8,
+            eosinophil=0,
+            basophil=0,
+            plasma_cell=0,
+            shift_value=3.18
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        self.blood_smear.delete()
+        for cbc in self.cbcs:
+            cbc.delete()
+
+    def test_parquet_command(self):
+        out = StringIO()
+        call_command('export_parquet', self.root, '--chunk-size', '1', stdout=out)
+
+        self.assertIn('Выгружено анализов: 2', out.getvalue())
+        table = pq.read_table(self.root)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(str(table.schema.field('sex').type), 'dictionary<values=string, indices=int32, ordered=0>')
+
+        rows = sorted(table.to_pylist(), key=lambda row: row['id'])
+        self.assertEqual([str(row['year']) for row in rows], ['2019', '2020'])
+        self.assertEqual(rows[1]['analysis_date'], datetime.date(2020, 1, 1))
+        self.assertEqual(rows[1]['value_type'], 'relative')
+        self.assertEqual(rows[1]['shift'], 3.18)
+        self.assertIsNone(rows[0]['shift'])
+
+    def test_parquet_rerun(self):
+        call_command('export_parquet', self.root, stdout=StringIO())
+        self.cbcs[0].analysis_date = datetime.date(2021, 6, 1)
+        self.cbcs[0].save()
+        call_command('export_parquet', self.root, stdout=StringIO())
+
+        table = pq.read_table(self.root)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(sorted(str(year) for year in table.column('year').to_pylist()), ['2020', '2021'])
@@ -0,0 +1,175 @@
+import datetime
+import os
+import time
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cbc.flags import HIGH, flag_bit
+from cbc.indices import refresh_indices
+from cbc.models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear
+from patient.models import Patient
+from range.lookup import range_index
+from tests.json_test_reporter import record
+
+
+SIZES = [int(size) for size in os.environ.get('PERF_SIZES', '10,100,1000,10000').split(',')]
+
+BUDGET = float(os.environ.get('PERF_BUDGET', '2'))
+
+DIFFS = (
+    (3, ThreeDiff, {'neutrophil': 60, 'lymphocyte': 30, 'monocyte': 10}),
+    (5, FiveDiff, {'neutrophil': 60, 'lymphocyte': 30, 'monocyte': 6, 'eosinophil': 3, 'basophil': 1}),
+    (9, BloodSmear, {
+        'promyelocyte': 0, 'myelocyte': 0, 'metamyelocyte': 0, 'banded_neutrophil': 4,
+        'segmented_neutrophil': 66, 'lymphocyte': 22, 'monocyte': 8, 'eosinophil': 0,
+        'basophil': 0, 'plasma_cell': 0
+    })
+)
+
+
+def seed_analyses(user, start, count):
+    """
+    Adds count analyses to the user, types of differentials alternate and
+    every fourth one is flagged. No signal is sent, cached payloads of the
+    user are stale afterwards.
+    """
+    cbcs = []
+    for i in range(start, start + count):
+        code = DIFFS[i % len(DIFFS)][0]
+        cbcs.append(CompleteBloodCount(
+            user=user,
+            sex=user.patient.sex,
+            age=user.patient.get_age(),
+            analysis_date=datetime.date(1990, 1, 1) + datetime.timedelta(days=i),
+            leukocyte=5 + i % 4,
+            erythrocyte=4.5,
+            hemoglobin=140,
+            hematocrit=44,
+            sed_rate=5,
+            type=code,
+            sum=100,
+            flags=flag_bit('leukocyte', HIGH) if i % 4 == 3 else 0
+        ))
+    CompleteBloodCount.objects.bulk_create(cbcs)
+    cbcs = list(CompleteBloodCount.objects.filter(user=user, analysis_date__in=[cbc.analysis_date for cbc in cbcs]))
+
+    for code, model, values in DIFFS:
+        model.objects.bulk_create([
+            model(cbc=cbc, value_type='relative', **values) for cbc in cbcs if cbc.type == code
+        ])
+    refresh_indices(BloodSmear.objects.filter(cbc__in=cbcs))
+
+
+@skipUnless(os.environ.get('PERF_TESTS'), 'set PERF_TESTS=1 to run performance tests')
+class TestPerformanceViews(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.client.force_login(self.user)
+
+        self.staff_client = Client()
+        self.staff = User.objects.create(
+            username='staff',
+            password='qwerty123',
+            email='staff@gmail.com',
+            is_staff=True
+        )
+        self.staff_patient = Patient.objects.create(
+            user=self.staff,
+            email=self.staff.email,
+            sex='female',
+            date_of_birth=datetime.date(1980, 1, 1)
+        )
+        self.staff_client.force_login(self.staff)
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+        self.staff.delete()
+        self.staff_patient.delete()
+
+    def get_urls(self):
+        analyses = {
+            cbc.type: cbc.pk for cbc in CompleteBloodCount.objects.filter(user=self.user).order_by('pk')[:3]
+        }
+        return [
+            reverse('cbc:home'),
+            reverse('cbc:cbc-list'),
+            reverse('cbc:cbc-delete', args=[analyses[9]]),
+            reverse('cbc:cbc-charts-common'),
+            reverse('cbc:cbc-charts-diff'),
+            reverse('cbc:cbc-charts-index'),
+            reverse('cbc:cbc-api-list'),
+            reverse('cbc:cbc-api-series'),
+            reverse('cbc:cbc-export'),
+            reverse('cbc:three-dif-create'),
+            reverse('cbc:three-dif-detail', args=[analyses[3]]),
+            reverse('cbc:three-dif-update', args=[analyses[3]]),
+            reverse('cbc:five-dif-create'),
+            reverse('cbc:five-dif-detail', args=[analyses[5]]),
+            reverse('cbc:five-dif-update', args=[analyses[5]]),
+            reverse('cbc:blood-smear-create'),
+            reverse('cbc:blood-smear-detail', args=[analyses[9]]),
+            reverse('cbc:blood-smear-update', args=[analyses[9]]),
+            reverse('patient:login'),
+            reverse('patient:register'),
+            reverse('patient:edit_profile', args=[self.patient.pk]),
+            reverse('patient:tos')
+        ]
+
+    def get_staff_urls(self):
+        return [
+            reverse('cbc:cbc-search'),
+            reverse('cbc:cbc-api-search'),
+            reverse('cbc:cbc-search-export'),
+            reverse('cbc:cbc-stats')
+        ]
+
+    def measure(self, client, url):
+        range_index.invalidate()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200, url)
+        return len(context), elapsed, size
+
+    def test_performance_views(self):
+        seeded = 0
+        queries = {}
+        for size in sorted(SIZES):
+            seed_analyses(self.user, seeded, size - seeded)
+            seeded = size
+            cache.clear()
+
+            urls = [(self.client, url) for url in self.get_urls()]
+            urls += [(self.staff_client, url) for url in self.get_staff_urls()]
+            for client, url in urls:
+                client.get(url)
+                count, elapsed, length = self.measure(client, url)
+                record(suite='views', url=url, analyses=size, queries=count, time=round(elapsed, 4), size=length)
+
+                with self.subTest(url=url, analyses=size):
+                    self.assertEqual(count, queries.setdefault(url, count), 'query count grows with analyses')
+                    self.assertLessEqual(elapsed, BUDGET, 'time budget exceeded')
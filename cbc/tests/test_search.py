@@ -0,0 +1,111 @@
+import datetime
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from cbc.flags import HIGH, LOW, flag_bit
+from cbc.models import CompleteBloodCount
+from cbc.pagination import PER_PAGE
+from cbc.search import out_of_range
+from patient.models import Patient
+
+
+class TestOutOfRangeSearch(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+
+        self.staff = User.objects.create(username='staff', email='staff@gmail.com', is_staff=True)
+        self.staff_patient = Patient.objects.create(
+            user=self.staff,
+            email=self.staff.email,
+            sex='female',
+            date_of_birth=datetime.date(1985, 1, 10)
+        )
+        self.patients = [
+            User.objects.create(username=f'patient{number}', email=f'patient{number}@gmail.com')
+            for number in range(2)
+        ]
+        self.low = self.create(self.patients[0], datetime.date(2020, 5, 5), flag_bit('leukocyte', LOW))
+        self.high = self.create(self.patients[1], datetime.date(2020, 6, 5),
+                                flag_bit('leukocyte', HIGH) | flag_bit('shift', HIGH))
+        self.index = self.create(self.patients[1], datetime.date(2020, 7, 5), flag_bit('nuclear', LOW))
+        self.normal = self.create(self.patients[0], datetime.date(2020, 6, 6), 0)
+
+    def tearDown(self):
+        CompleteBloodCount.objects.all().delete()
+        self.staff_patient.delete()
+        self.staff.delete()
+        for patient in self.patients:
+            patient.delete()
+
+    def create(self, user, date, flags):
+        return CompleteBloodCount.objects.create(
+            user=user, sex='male', age=30, analysis_date=date,
+            leukocyte=5, erythrocyte=4.5, hemoglobin=140, hematocrit=44, sed_rate=5,
+            type=9, sum=100, flags=flags
+        )
+
+    def test_out_of_range(self):
+        self.assertEqual(set(out_of_range()), {self.low, self.high, self.index})
+        self.assertEqual(set(out_of_range('leukocyte')), {self.low, self.high})
+        self.assertEqual(list(out_of_range('leukocyte', HIGH)), [self.high])
+        self.assertEqual(set(out_of_range(direction=LOW)), {self.low, self.index})
+        self.assertEqual(
+            list(out_of_range('leukocyte', date_from=datetime.date(2020, 6, 1), date_to=datetime.date(2020, 6, 30))),
+            [self.high]
+        )
+
+    def test_view_staff_only(self):
+        self.client.force_login(self.patients[0])
+        for name in ('cbc:cbc-search', 'cbc:cbc-api-search', 'cbc:cbc-search-export'):
+            response = self.client.get(reverse_lazy(name))
+            self.assertEqual(response.status_code, 302)
+
+    def test_view_search(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse_lazy('cbc:cbc-search'), {'name': 'leukocyte', 'direction': 'high'})
+        self.assertEqual(list(response.context['object_list']), [self.high])
+        self.assertContains(response, 'patient1')
+        self.assertContains(response, 'Лейкоциты')
+        self.assertNotContains(response, 'patient0')
+
+        response = self.client.get(reverse_lazy('cbc:cbc-search'), {'date_from': '2020-07-01', 'date_to': '2020-06-01'})
+        self.assertIn('date_to', response.context['form'].errors)
+
+    def test_view_pages(self):
+        for day in range(PER_PAGE + 5):
+            self.create(self.staff, datetime.date(2019, 1, 1) + datetime.timedelta(days=day), flag_bit('sed_rate', HIGH))
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse_lazy('cbc:cbc-api-search'), {'name': 'sed_rate'})
+        data = response.json()
+        self.assertEqual(len(data['results']), PER_PAGE)
+        self.assertEqual(data['results'][0]['flags'], 'sed_rate:high')
+
+        response = self.client.get(reverse_lazy('cbc:cbc-api-search'), {'name': 'sed_rate', 'cursor': data['next']})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+
+        response = self.client.get(reverse_lazy('cbc:cbc-api-search'), {'name': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_export(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse_lazy('cbc:cbc-search-export'), {'name': 'leukocyte'})
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('leukocyte:high shift:high', lines[2])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'partial indexes of analytes are created on PostgreSQL')
+    def test_partial_index(self):
+        queryset = out_of_range('leukocyte', HIGH, date_from=datetime.date(2020, 1, 1)).order_by('-analysis_date', '-id')
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            plan = queryset.explain()
+            cursor.execute('RESET enable_seqscan')
+        self.assertRegex(plan, r'cbc_flag(ged_date|_leukocyte)_idx')
@@ -0,0 +1,137 @@
+import datetime
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.stats import cohort_stats, cohorts, population_stats
+from patient.models import Patient
+from range.lookup import range_index
+from range.models import CBCRange
+
+
+class TestPopulationStats(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.addCleanup(range_index.invalidate)
+
+        self.user = User.objects.create(username='staff', email='staff@gmail.com', is_staff=True)
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        bounds = dict(
+            leukocyte_min=4, leukocyte_max=9,
+            erythrocyte_min=3.9, erythrocyte_max=5.5,
+            hemoglobin_min=120, hemoglobin_max=160,
+            hematocrit_min=36, hematocrit_max=48,
+            sed_rate_min=2, sed_rate_max=15
+        )
+        self.ranges = [
+            CBCRange.objects.create(sex='male', age_min=18, age_max=60, **bounds),
+            CBCRange.objects.create(sex='male', age_min=60, age_max=100, **bounds)
+        ]
+        self.leukocytes = [3.5, 4.2, 5.0, 6.1, 7.3, 8.8]
+        for day, leukocyte in enumerate(self.leukocytes):
+            self.create(datetime.date(2020, 1, day + 1), 30 + day, leukocyte)
+        self.create(datetime.date(2020, 2, 1), 60, 10)
+
+    def tearDown(self):
+        CompleteBloodCount.objects.all().delete()
+        for cbc_range in self.ranges:
+            cbc_range.delete()
+        self.patient.delete()
+        self.user.delete()
+
+    def create(self, date, age, leukocyte):
+        return CompleteBloodCount.objects.create(
+            user=self.user, sex='male', age=age, analysis_date=date,
+            leukocyte=leukocyte, erythrocyte=4.5, hemoglobin=140, hematocrit=44, sed_rate=5,
+            type=9, sum=100
+        )
+
+    def test_cohorts(self):
+        bands = {(age_min, age_max): ages for _, age_min, age_max, ages in cohorts()}
+        self.assertEqual(bands[(18, 60)], list(range(18, 60)))
+        self.assertEqual(bands[(60, 100)], list(range(60, 101)))
+
+    def test_population_stats(self):
+        young, old = population_stats()
+        leukocyte = young['stats']['leukocyte']
+
+        self.assertEqual(leukocyte['count'], 6)
+        self.assertAlmostEqual(leukocyte['mean'], np.mean(self.leukocytes))
+        self.assertAlmostEqual(leukocyte['sd'], np.std(self.leukocytes, ddof=1))
+        self.assertAlmostEqual(leukocyte['p2_5'], np.percentile(self.leukocytes, 2.5))
+        self.assertAlmostEqual(leukocyte['p50'], np.median(self.leukocytes))
+        self.assertEqual(young['stats']['nuclear']['count'], 0)
+        self.assertIsNone(young['stats']['nuclear']['p50'])
+
+        self.assertEqual(old['stats']['leukocyte']['count'], 1)
+        self.assertIsNone(old['stats']['leukocyte']['sd'])
+
+    def test_sd_large_values(self):
+        leukocytes = [1e9 + 1, 1e9 + 2, 1e9 + 3]
+        for day, leukocyte in enumerate(leukocytes):
+            self.create(datetime.date(2020, 3, day + 1), 70, leukocyte)
+
+        leukocyte = cohort_stats('male', [70])['leukocyte']
+        self.assertEqual(leukocyte['count'], 3)
+        self.assertAlmostEqual(leukocyte['mean'], 1e9 + 2)
+        self.assertAlmostEqual(leukocyte['sd'], 1)
+
+    def test_incremental(self):
+        population_stats()
+        with self.assertNumQueries(2):
+            population_stats()
+
+        cbc = self.create(datetime.date(2020, 3, 1), 40, 6)
+        with self.assertNumQueries(3):
+            young, old = population_stats()
+        self.assertEqual(young['stats']['leukocyte']['count'], 7)
+        self.assertEqual(old['stats']['leukocyte']['count'], 1)
+
+        BloodSmear.objects.create(
+            cbc=cbc, value_type='relative', promyelocyte=0, myelocyte=0, metamyelocyte=0,
+            banded_neutrophil=4, segmented_neutrophil=66, lymphocyte=22, monocyte=8,
+            eosinophil=0, basophil=0, plasma_cell=0, nuclear_value=0.06
+        )
+        young, _ = population_stats()
+        self.assertEqual(young['stats']['nuclear']['count'], 1)
+
+        cbc.delete()
+        young, _ = population_stats()
+        self.assertEqual(young['stats']['leukocyte']['count'], 6)
+
+    def test_profile(self):
+        population_stats()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse_lazy('patient:edit_profile', args=[self.patient.pk]), {
+            'email': self.user.email,
+            'sex': 'female',
+            'date_of_birth': '1990-04-25'
+        })
+        self.assertEqual(response.status_code, 302)
+
+        young, old = population_stats()
+        self.assertEqual(young['stats']['leukocyte']['count'], 0)
+        self.assertEqual(old['stats']['leukocyte']['count'], 0)
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse_lazy('cbc:cbc-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Лейкоциты')
+        self.assertEqual(response.context['cohorts'][0]['sex'], 'Мужской')
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse_lazy('cbc:cbc-stats'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from cbc.models import CompleteBloodCount, ThreeDiff, FiveDiff, BloodSmear, Trend
+from cbc.series import ANALYTES
+from cbc.synthetic import DEFAULT_CBC_RANGE, EPOCH, SyntheticGenerator
+
+
+class TestSyntheticCBC(TestCase):
+
+    def values(self, prefix):
+        return list(
+            CompleteBloodCount.objects.filter(user__username__startswith=prefix)
+            .order_by('user__username', 'analysis_date')
+            .values_list('analysis_date', 'type', 'sum', *ANALYTES)
+        )
+
+    def test_synthetic_generator(self):
+        written = SyntheticGenerator(seed=1, batch_size=7, prefix='a').run(3, 5)
+
+        self.assertEqual(written, 15)
+        self.assertEqual(CompleteBloodCount.objects.count(), 15)
+        self.assertEqual(
+            ThreeDiff.objects.count() + FiveDiff.objects.count() + BloodSmear.objects.count(), 15
+        )
+        for user in User.objects.filter(username__startswith='a'):
+            self.assertFalse(user.has_usable_password())
+            self.assertEqual(user.patient.email, user.email)
+
+        for cbc in CompleteBloodCount.objects.with_diff():
+            self.assertEqual(cbc.diff.cbc, cbc)
+            self.assertTrue(98 <= cbc.sum <= 102)
+
+        self.assertFalse(BloodSmear.objects.filter(intoxicationO_value__isnull=True).exists())
+
+        SyntheticGenerator(seed=1, prefix='b').run(3, 5)
+        self.assertEqual(self.values('a'), self.values('b'))
+
+    def test_synthetic_dates(self):
+        SyntheticGenerator(seed=3, prefix='a').run(20, 400)
+
+        for user in User.objects.filter(username__startswith='a').select_related('patient'):
+            dates = list(user.completebloodcount_set.values_list('analysis_date', 'age'))
+            self.assertTrue(all(user.patient.date_of_birth <= date <= EPOCH for date, _ in dates))
+            self.assertTrue(all(age == date.year - user.patient.date_of_birth.year for date, age in dates))
+        self.assertEqual(Trend.objects.count(), 8000)
+        self.assertEqual(Trend.objects.filter(previous=None).count(), 20)
+
+    def test_synthetic_out_of_range(self):
+        SyntheticGenerator(seed=2, out_of_range=0, prefix='a').run(2, 10)
+        for name, (low, high) in DEFAULT_CBC_RANGE.items():
+            values = CompleteBloodCount.objects.values_list(name, flat=True)
+            self.assertTrue(all(low <= value <= high for value in values), name)
+
+        SyntheticGenerator(seed=2, out_of_range=1, prefix='b').run(2, 50)
+        shifted = CompleteBloodCount.objects.filter(user__username__startswith='b').exclude(
+            leukocyte__range=DEFAULT_CBC_RANGE['leukocyte'],
+            erythrocyte__range=DEFAULT_CBC_RANGE['erythrocyte'],
+            hemoglobin__range=DEFAULT_CBC_RANGE['hemoglobin'],
+            hematocrit__range=DEFAULT_CBC_RANGE['hematocrit'],
+            sed_rate__range=DEFAULT_CBC_RANGE['sed_rate']
+        )
+        self.assertGreater(shifted.count(), 30)
+
+    def test_synthetic_command(self):
+        out = StringIO()
+        call_command('generate_synthetic', '--patients', '2', '--analyses', '3', stdout=out)
+
+        self.assertIn('Создано пациентов: 2, анализов: 6', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic', '--patients', '1', stdout=out)
@@ -0,0 +1,153 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from cbc.importer import CBCImporter
+from cbc.models import CompleteBloodCount, Trend
+from cbc.trends import WINDOW, refresh_trends
+from patient.models import Patient
+
+
+THREE_DIFF = {'value_type': 'relative', 'neutrophil': 60, 'lymphocyte': 30, 'monocyte': 10}
+
+
+class TestTrends(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+
+    def analysis_data(self, date, leukocyte):
+        return {
+            'analysis_date': date,
+            'leukocyte': leukocyte,
+            'erythrocyte': 4.5,
+            'hemoglobin': 140,
+            'hematocrit': 44,
+            'sed_rate': 5,
+            'sum': 100,
+            'three_diff-TOTAL_FORMS': 0,
+            'three_diff-INITIAL_FORMS': 0,
+            'three_diff-MAX_NUM_FORMS': 1
+        }
+
+    def post_analysis(self, date, leukocyte):
+        response = self.client.post(reverse_lazy('cbc:three-dif-create'), self.analysis_data(date, leukocyte))
+        self.assertEqual(response.status_code, 302)
+        return CompleteBloodCount.objects.get(user=self.user, analysis_date=date)
+
+    def trend(self, cbc):
+        return Trend.objects.get(cbc=cbc)
+
+    def test_trends_on_create(self):
+        first = self.post_analysis('2020-05-01', 4)
+        second = self.post_analysis('2020-05-11', 5)
+        third = self.post_analysis('2020-05-21', 8)
+
+        self.assertIsNone(self.trend(first).previous_id)
+        self.assertIsNone(self.trend(first).leukocyte_delta)
+
+        trend = self.trend(second)
+        self.assertEqual(trend.previous_id, first.pk)
+        self.assertEqual(trend.days, 10)
+        self.assertEqual(trend.leukocyte_delta, 1)
+        self.assertEqual(trend.leukocyte_change, 25)
+        self.assertEqual(trend.hemoglobin_delta, 0)
+        self.assertIsNone(trend.nuclear_delta)
+
+        self.assertAlmostEqual(self.trend(second).leukocyte_slope, 0.1)
+        self.assertAlmostEqual(self.trend(third).leukocyte_slope, 0.2)
+
+    def test_trends_insert_older(self):
+        first = self.post_analysis('2020-05-01', 4)
+        later = [self.post_analysis(f'2020-06-{day:02}', 5) for day in range(1, WINDOW + 2)]
+        last_trend = self.trend(later[-1])
+
+        middle = self.post_analysis('2020-05-15', 6)
+        self.assertEqual(self.trend(middle).previous_id, first.pk)
+        self.assertEqual(self.trend(middle).leukocyte_delta, 2)
+        self.assertEqual(self.trend(later[0]).previous_id, middle.pk)
+        self.assertEqual(self.trend(later[0]).leukocyte_delta, -1)
+        self.assertEqual(self.trend(later[-1]).leukocyte_slope, last_trend.leukocyte_slope)
+
+    def test_trends_update_moves(self):
+        first = self.post_analysis('2020-05-01', 4)
+        second = self.post_analysis('2020-05-11', 5)
+        third = self.post_analysis('2020-05-21', 8)
+
+        response = self.client.post(
+            reverse_lazy('cbc:three-dif-update', args=[first.pk]),
+            self.analysis_data('2020-06-01', 4)
+        )
+        self.assertEqual(response.status_code, 302)
+
+        self.assertIsNone(self.trend(second).previous_id)
+        self.assertEqual(self.trend(third).previous_id, second.pk)
+        self.assertEqual(self.trend(first).previous_id, third.pk)
+        self.assertEqual(self.trend(first).leukocyte_delta, -4)
+
+    def test_trends_delete(self):
+        first = self.post_analysis('2020-05-01', 4)
+        second = self.post_analysis('2020-05-11', 5)
+        third = self.post_analysis('2020-05-21', 8)
+
+        response = self.client.post(reverse_lazy('cbc:cbc-delete', args=[second.pk]))
+        self.assertEqual(response.status_code, 302)
+
+        trend = self.trend(third)
+        self.assertEqual(trend.previous_id, first.pk)
+        self.assertEqual(trend.leukocyte_delta, 4)
+        self.assertEqual(trend.leukocyte_change, 100)
+        self.assertFalse(Trend.objects.filter(cbc_id=second.pk).exists())
+
+    def test_refresh_trends_bounded(self):
+        for day in range(1, 20):
+            CompleteBloodCount.objects.create(
+                user=self.user, sex='male', age=30, analysis_date=datetime.date(2020, 5, day),
+                leukocyte=day, erythrocyte=4.5, hemoglobin=140, hematocrit=44, sed_rate=5,
+                type=3, sum=100
+            )
+        self.assertEqual(refresh_trends(self.user.pk, datetime.date(2020, 5, 5)), WINDOW)
+        self.assertEqual(Trend.objects.count(), WINDOW)
+        self.assertEqual(refresh_trends(self.user.pk, datetime.date.min, None), 19)
+        self.assertEqual(refresh_trends(None, datetime.date.min), 0)
+
+    def test_importer_trends(self):
+        self.post_analysis('2020-05-01', 4)
+        importer = CBCImporter()
+        importer.run([
+            dict(username='test', analysis_date='2020-04-01', leukocyte=2, erythrocyte=4.5,
+                 hemoglobin=140, hematocrit=44, sed_rate=5, type=3, **THREE_DIFF),
+            dict(username='test', analysis_date='2020-06-01', leukocyte=6, erythrocyte=4.5,
+                 hemoglobin=140, hematocrit=44, sed_rate=5, type=3, **THREE_DIFF)
+        ])
+        self.assertEqual(importer.rejected, [])
+
+        deltas = list(Trend.objects.order_by('cbc__analysis_date').values_list('leukocyte_delta', flat=True))
+        self.assertEqual(deltas, [None, 2, 2])
+
+    def test_api_trend(self):
+        self.post_analysis('2020-05-01', 4)
+        self.post_analysis('2020-05-11', 5)
+
+        response = self.client.get(reverse_lazy('cbc:cbc-api-list'))
+        results = response.json()['results']
+        self.assertEqual(results[0]['trend']['leukocyte'], {'delta': 1, 'change': 25, 'slope': 0.1})
@@ -1,6 +1,8 @@
 from django.test import SimpleTestCase
 from django.urls import reverse_lazy, resolve
 
+from cbc.views.api import SeriesView, CBCPageView
+from cbc.views.export import ExportView
 from cbc.views.general import (
     HomeView,
     CBCListView,
@@ -44,6 +46,21 @@ class TestUrlsChart(SimpleTestCase):
         self.assertEqual(resolve(url).func.view_class, IndexChartsTemplateView)
 
 
+class TestUrlsApi(SimpleTestCase):
+
+    def test_url_cbc_api_list(self):
+        url = reverse_lazy('cbc:cbc-api-list')
+        self.assertEqual(resolve(url).func.view_class, CBCPageView)
+
+    def test_url_cbc_api_series(self):
+        url = reverse_lazy('cbc:cbc-api-series')
+        self.assertEqual(resolve(url).func.view_class, SeriesView)
+
+    def test_url_cbc_export(self):
+        url = reverse_lazy('cbc:cbc-export')
+        self.assertEqual(resolve(url).func.view_class, ExportView)
+
+
 class TestUrlsThreeDiff(SimpleTestCase):
 
     def test_url_cbc_three_diff_create(self):
@@ -1,13 +1,23 @@
+import csv
 import datetime
+import json
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import Http404
 from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse_lazy
 
+from cbc.cache import user_version
 from cbc.models import CompleteBloodCount, BloodSmear, FiveDiff, ThreeDiff
 from patient.models import Patient
+from range.lookup import range_index
 from range.models import ReferenceRange, DiffRange, CBCRange
 
+from cbc.views.api import SeriesView, CBCPageView
+from cbc.views.export import ExportView
 from cbc.views.general import (
     CBCListView,
     CBCDeleteView,
@@ -23,6 +33,7 @@ from cbc.views.blood_smear import BloodSmearCreateView, BloodSmearUpdateView, Bl
 class TestViewsGeneral(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.factory = RequestFactory()
 
@@ -49,9 +60,7 @@ class TestViewsGeneral(TestCase):
             hematocrit=1,
             sed_rate=1,
             type=3,
-            sum=100,
-            object_id=1,
-            content_type_id=10
+            sum=100
         )
         self.cbc_five_diff = CompleteBloodCount.objects.create(
             sex='female',
@@ -63,9 +72,7 @@ class TestViewsGeneral(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=9
+            sum=100
         )
         self.cbc_blood_smear = CompleteBloodCount.objects.create(
             user=self.user,
@@ -78,9 +85,7 @@ class TestViewsGeneral(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=7
+            sum=100
         )
         self.three_diff = ThreeDiff.objects.create(
             cbc=self.cbc_three_diff,
@@ -120,6 +125,9 @@ class TestViewsGeneral(TestCase):
         self.url_cbc_chart_common = reverse_lazy('cbc:cbc-charts-common')
         self.url_cbc_chart_diff = reverse_lazy('cbc:cbc-charts-diff')
         self.url_cbc_chart_index = reverse_lazy('cbc:cbc-charts-index')
+        self.url_cbc_api_series = reverse_lazy('cbc:cbc-api-series')
+        self.url_cbc_api_list = reverse_lazy('cbc:cbc-api-list')
+        self.url_cbc_export = reverse_lazy('cbc:cbc-export')
 
     def tearDown(self):
         self.user.delete()
@@ -152,6 +160,37 @@ class TestViewsGeneral(TestCase):
             map(repr, [self.blood_smear])
         )
 
+    def test_view_cbc_list_cursor(self):
+        request = self.factory.get(self.url_cbc_list, {'cursor': f'2020-04-30.{self.cbc_three_diff.pk}'})
+        request.user = self.user
+        response = CBCListView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context_data.get('object_list')), [self.cbc_blood_smear])
+        self.assertIsNone(response.context_data.get('next_cursor'))
+
+        request = self.factory.get(self.url_cbc_list, {'cursor': 'yesterday'})
+        request.user = self.user
+        with self.assertRaises(Http404):
+            CBCListView.as_view()(request)
+
+    def test_view_cbc_api_list(self):
+        request = self.factory.get(self.url_cbc_api_list, {'cursor': f'2020-04-30.{self.cbc_three_diff.pk}'})
+        request.user = self.user
+        response = CBCPageView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        page = json.loads(response.content)
+        self.assertEqual([item['pk'] for item in page['results']], [self.cbc_blood_smear.pk])
+        self.assertIsNone(page['next'])
+        self.assertIn(str(reverse_lazy('cbc:cbc-delete', args=[self.cbc_blood_smear.pk])), page['html'])
+
+        request = self.factory.get(self.url_cbc_api_list, {'cursor': '2020-04-30'})
+        request.user = self.user
+        response = CBCPageView.as_view()(request)
+
+        self.assertEqual(response.status_code, 400)
+
     def test_view_cbc_delete(self):
         request = self.factory.get(self.url_cbc_delete)
         request.user = self.user
@@ -178,9 +217,9 @@ class TestViewsGeneral(TestCase):
             response.context_data.get('cbc'),
             map(repr, [self.cbc_three_diff, self.cbc_blood_smear])
         )
-        self.assertQuerysetEqual(
-            response.context_data.get('blood_diagram'),
-            map(repr, [self.blood_smear])
+        self.assertEqual(
+            [item['pk'] for item in response.context_data.get('blood_diagram')],
+            [self.cbc_blood_smear.pk]
         )
 
     def test_view_cbc_chart_diff(self):
@@ -194,21 +233,16 @@ class TestViewsGeneral(TestCase):
             map(repr, [self.cbc_three_diff, self.cbc_blood_smear])
         )
 
-        self.assertQuerysetEqual(
-            response.context_data.get('three_dif'),
-            map(repr, [self.three_diff])
+        self.assertEqual(
+            [item['pk'] for item in response.context_data.get('three_dif')],
+            [self.cbc_three_diff.pk]
         )
-        self.assertQuerysetEqual(
-            response.context_data.get('five_dif'), []
-        )
-        self.assertQuerysetEqual(
-            response.context_data.get('blood_smear'),
-            map(repr, [self.blood_smear])
-        )
-        self.assertQuerysetEqual(
-            response.context_data.get('blood_diagram'),
-            map(repr, [self.blood_smear])
+        self.assertEqual(response.context_data.get('five_dif'), [])
+        self.assertEqual(
+            [item['pk'] for item in response.context_data.get('blood_smear')],
+            [self.cbc_blood_smear.pk]
         )
+        self.assertEqual(response.context_data.get('blood_diagram'), response.context_data.get('blood_smear'))
 
     def test_view_cbc_chart_index(self):
         request = self.factory.get(self.url_cbc_chart_index)
@@ -220,15 +254,104 @@ class TestViewsGeneral(TestCase):
             response.context_data.get('cbc'),
             map(repr, [self.cbc_three_diff, self.cbc_blood_smear])
         )
-        self.assertQuerysetEqual(
-            response.context_data.get('blood_diagram'),
-            map(repr, [self.blood_smear])
+        self.assertEqual(
+            [item['pk'] for item in response.context_data.get('blood_diagram')],
+            [self.cbc_blood_smear.pk]
         )
 
 
+    def test_view_cbc_api_series(self):
+        self.blood_smear.intoxicationKK_value = 1.5
+        self.blood_smear.save()
+
+        request = self.factory.get(self.url_cbc_api_series)
+        request.user = self.user
+        response = SeriesView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        series = json.loads(response.content)
+        self.assertEqual(series['pk'], [self.cbc_blood_smear.pk, self.cbc_three_diff.pk])
+        self.assertEqual(series['date'], ['2020-04-29', '2020-04-30'])
+        self.assertEqual(series['type'], [2, 3])
+        self.assertEqual(series['leukocyte'], [2, 1])
+        self.assertEqual(series['intoxicationKK'], [1.5, None])
+
+    def test_view_cbc_api_series_window(self):
+        request = self.factory.get(self.url_cbc_api_series, {'date_from': '2020-04-30'})
+        request.user = self.user
+        response = SeriesView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['pk'], [self.cbc_three_diff.pk])
+
+        request = self.factory.get(self.url_cbc_api_series, {'date_to': '2020-04-01'})
+        request.user = self.user
+        response = SeriesView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['pk'], [])
+
+        request = self.factory.get(self.url_cbc_api_series, {'date_from': 'yesterday'})
+        request.user = self.user
+        response = SeriesView.as_view()(request)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_cbc_api_series_max_points(self):
+        for day in range(1, 21):
+            CompleteBloodCount.objects.create(
+                user=self.user,
+                sex=self.user.patient.sex,
+                age=self.user.patient.get_age(),
+                analysis_date=datetime.date(2019, 1, day),
+                leukocyte=1,
+                erythrocyte=1,
+                hemoglobin=1,
+                hematocrit=1,
+                sed_rate=1,
+                type=3,
+                sum=100
+            )
+
+        request = self.factory.get(self.url_cbc_api_series, {'max_points': 5})
+        request.user = self.user
+        response = SeriesView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        series = json.loads(response.content)
+        self.assertLess(len(series['pk']), 22)
+        self.assertEqual(series['date'][0], '2019-01-01')
+        self.assertEqual(series['date'][-1], '2020-04-30')
+        self.assertEqual(len(series['pk']), len(series['allergy']))
+
+    def test_view_cbc_export(self):
+        self.addCleanup(range_index.invalidate)
+        CBCRange.objects.create(
+            sex='male', age_min=18, age_max=60,
+            leukocyte_min=4, leukocyte_max=9,
+            erythrocyte_min=0, erythrocyte_max=9,
+            hemoglobin_min=0, hemoglobin_max=200,
+            hematocrit_min=0, hematocrit_max=50,
+            sed_rate_min=0, sed_rate_max=15
+        )
+
+        request = self.factory.get(self.url_cbc_export)
+        request.user = self.user
+        response = ExportView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        lines = list(csv.reader(b''.join(response.streaming_content).decode('utf-8').splitlines()))
+        self.assertEqual(lines[0][:3], ['id', 'username', 'analysis_date'])
+        self.assertEqual(len(lines), 3)
+        row = dict(zip(lines[0], lines[1]))
+        self.assertEqual(row['id'], str(self.cbc_three_diff.pk))
+        self.assertEqual(row['neutrophil'], '1.0')
+        self.assertEqual(row['flags'], 'leukocyte:low')
+
 class TestViewsThreeDiff(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.factory = RequestFactory()
 
@@ -255,9 +378,7 @@ class TestViewsThreeDiff(TestCase):
             hematocrit=1,
             sed_rate=1,
             type=3,
-            sum=100,
-            object_id=1,
-            content_type_id=10
+            sum=100
         )
         self.cbc_blood_smear = CompleteBloodCount.objects.create(
             user=self.user,
@@ -270,9 +391,7 @@ class TestViewsThreeDiff(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=7
+            sum=100
         )
         self.three_diff = ThreeDiff.objects.create(
             cbc=self.cbc_three_diff,
@@ -411,6 +530,7 @@ class TestViewsThreeDiff(TestCase):
 class TestViewsFiveDiff(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.factory = RequestFactory()
 
@@ -435,9 +555,7 @@ class TestViewsFiveDiff(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=9
+            sum=100
         )
         self.cbc_blood_smear = CompleteBloodCount.objects.create(
             user=self.user,
@@ -450,9 +568,7 @@ class TestViewsFiveDiff(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=7
+            sum=100
         )
         self.five_diff = FiveDiff.objects.create(
             cbc=self.cbc_five_diff,
@@ -597,6 +713,7 @@ class TestViewsFiveDiff(TestCase):
 class TestViewsBloodSmear(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.factory = RequestFactory()
 
@@ -623,9 +740,7 @@ class TestViewsBloodSmear(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=7
+            sum=100
         )
         self.blood_smear = BloodSmear.objects.create(
             cbc=self.cbc_blood_smear,
@@ -759,3 +874,224 @@ class TestViewsBloodSmear(TestCase):
             response.context_data.get('blood_diagram'),
             map(repr, [self.blood_smear])
         )
+
+
+class TestViewsQueries(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create(
+            username='test',
+            password='qwerty123',
+            email='test@gmail.com'
+        )
+        self.patient = Patient.objects.create(
+            user=self.user,
+            email=self.user.email,
+            sex='male',
+            date_of_birth=datetime.date(1990, 4, 25)
+        )
+        self.client.force_login(self.user)
+        self.day = 0
+
+    def tearDown(self):
+        self.user.delete()
+        self.patient.delete()
+
+    def data_queries(self, context):
+        """
+        Queries of analyses, lookups of data versions left out.
+        """
+        return [query['sql'] for query in context if 'cbc_' in query['sql'] and 'cbc_dataversion' not in query['sql']]
+
+    def create_analyses(self, count):
+        for _ in range(count):
+            for type_, model, values in (
+                (3, ThreeDiff, {'neutrophil': 60, 'lymphocyte': 30, 'monocyte': 10}),
+                (5, FiveDiff, {'neutrophil': 60, 'lymphocyte': 30, 'monocyte': 6, 'eosinophil': 3, 'basophil': 1}),
+                (9, BloodSmear, {
+                    'promyelocyte': 0, 'myelocyte': 0, 'metamyelocyte': 0, 'banded_neutrophil': 4,
+                    'segmented_neutrophil': 66, 'lymphocyte': 22, 'monocyte': 8, 'eosinophil': 0,
+                    'basophil': 0, 'plasma_cell': 0
+                })
+            ):
+                self.day += 1
+                cbc = CompleteBloodCount.objects.create(
+                    user=self.user,
+                    sex=self.user.patient.sex,
+                    age=self.user.patient.get_age(),
+                    analysis_date=datetime.date(2020, 1, 1) + datetime.timedelta(days=self.day),
+                    leukocyte=5,
+                    erythrocyte=4.5,
+                    hemoglobin=140,
+                    hematocrit=44,
+                    sed_rate=5,
+                    type=type_,
+                    sum=100
+                )
+                model.objects.create(cbc=cbc, value_type='relative', **values)
+
+    def count_queries(self, url):
+        range_index.invalidate()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_view_queries_fixed(self):
+        urls = [
+            reverse_lazy('cbc:cbc-list'),
+            reverse_lazy('cbc:cbc-charts-common'),
+            reverse_lazy('cbc:cbc-charts-diff'),
+            reverse_lazy('cbc:cbc-charts-index')
+        ]
+
+        self.create_analyses(1)
+        counts = [self.count_queries(url) for url in urls]
+        self.create_analyses(5)
+
+        self.assertEqual([self.count_queries(url) for url in urls], counts)
+
+    def test_view_create_queries(self):
+        data = {
+            'analysis_date': '2020-05-05',
+            'leukocyte': 5,
+            'erythrocyte': 4.5,
+            'hemoglobin': 140,
+            'hematocrit': 44,
+            'sed_rate': 5,
+            'sum': 100,
+            'blood_smear-TOTAL_FORMS': 1,
+            'blood_smear-INITIAL_FORMS': 0,
+            'blood_smear-MAX_NUM_FORMS': 1,
+            'blood_smear-0-value_type': 'relative',
+            'blood_smear-0-promyelocyte': 0,
+            'blood_smear-0-myelocyte': 0,
+            'blood_smear-0-metamyelocyte': 0,
+            'blood_smear-0-banded_neutrophil': 4,
+            'blood_smear-0-segmented_neutrophil': 66,
+            'blood_smear-0-lymphocyte': 22,
+            'blood_smear-0-monocyte': 8,
+            'blood_smear-0-eosinophil': 0,
+            'blood_smear-0-basophil': 0,
+            'blood_smear-0-plasma_cell': 0
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse_lazy('cbc:blood-smear-create'), data)
+        self.assertEqual(response.status_code, 302)
+
+        writes = [query['sql'].split()[0] + ' ' + query['sql'].split()[2] for query in context
+                  if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'cbc_dataversion' not in query['sql']]
+        self.assertEqual(writes, ['INSERT "cbc_completebloodcount"', 'INSERT "cbc_bloodsmear"', 'INSERT "cbc_trend"'])
+        self.assertEqual(user_version(self.user.pk)[0], 2)
+
+        cbc = CompleteBloodCount.objects.get(user=self.user)
+        self.assertEqual(cbc.type, 9)
+        self.assertEqual(cbc.diff.intoxicationKK_value, 2.47)
+
+    def test_view_charts_cached(self):
+        cache.clear()
+        self.create_analyses(2)
+        urls = [
+            reverse_lazy('cbc:cbc-charts-common'),
+            reverse_lazy('cbc:cbc-charts-diff'),
+            reverse_lazy('cbc:cbc-charts-index'),
+            reverse_lazy('cbc:cbc-api-series')
+        ]
+        for url in urls:
+            self.client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(self.data_queries(context))
+
+        url_series = reverse_lazy('cbc:cbc-api-series')
+        self.create_analyses(1)
+        self.assertEqual(len(json.loads(self.client.get(url_series).content)['pk']), 9)
+
+        cbc = CompleteBloodCount.objects.filter(user=self.user).first()
+        self.client.post(reverse_lazy('cbc:cbc-delete', args=[cbc.pk]))
+        self.assertEqual(len(json.loads(self.client.get(url_series).content)['pk']), 8)
+
+        self.client.get(reverse_lazy('cbc:cbc-charts-diff'))
+        BloodSmear.objects.filter(cbc__user=self.user).delete()
+        response = self.client.get(reverse_lazy('cbc:cbc-charts-diff'))
+        self.assertEqual(response.context_data['blood_smear'], [])
+
+    def test_view_charts_cache_rollback(self):
+        url_series = reverse_lazy('cbc:cbc-api-series')
+        self.client.get(url_series)
+        version = user_version(self.user.pk)
+
+        with transaction.atomic():
+            self.create_analyses(1)
+            self.assertEqual(len(json.loads(self.client.get(url_series).content)['pk']), 3)
+            transaction.set_rollback(True)
+        self.assertEqual(user_version(self.user.pk), version)
+        self.assertEqual(json.loads(self.client.get(url_series).content)['pk'], [])
+
+    def test_view_charts_cache_profile(self):
+        cache.clear()
+        self.create_analyses(1)
+        url_series = reverse_lazy('cbc:cbc-api-series')
+        self.client.get(url_series)
+
+        response = self.client.post(reverse_lazy('patient:edit_profile', args=[self.patient.pk]), {
+            'email': self.user.email,
+            'sex': 'male',
+            'date_of_birth': '2000-04-25'
+        })
+        self.assertEqual(response.status_code, 302)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url_series)
+        self.assertTrue(self.data_queries(context))
+
+    def test_view_charts_conditional(self):
+        self.create_analyses(1)
+        url = reverse_lazy('cbc:cbc-charts-common')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(self.data_queries(context))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.create_analyses(1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_view_detail_conditional(self):
+        self.create_analyses(1)
+        cbc = CompleteBloodCount.objects.get(user=self.user, type=3)
+        url = reverse_lazy('cbc:three-dif-detail', args=[cbc.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        updated_at = cbc.updated_at
+        cbc.leukocyte = 6
+        cbc.save()
+        self.assertGreater(cbc.updated_at, updated_at)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_queryset_with_diff(self):
+        self.create_analyses(2)
+
+        with self.assertNumQueries(1):
+            diffs = [(cbc.type, cbc.diff) for cbc in CompleteBloodCount.objects.with_diff()]
+        self.assertEqual(
+            [(type_, type(diff)) for type_, diff in diffs],
+            [(9, BloodSmear), (5, FiveDiff), (3, ThreeDiff)] * 2
+        )
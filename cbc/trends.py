@@ -0,0 +1,131 @@
+"""
+Per-patient trends of analytes and indices.
+
+The Trend of an analysis holds the delta and percent change of every
+analyte and index against the patient's previous analysis and a slope per
+day, fitted by least squares over the last WINDOW analyses. A trend only
+depends on the analysis and the WINDOW - 1 analyses before it, so a write
+recomputes the analysis and the WINDOW - 1 analyses after it, read with
+two queries on the (user, analysis_date, id) index, whatever the length
+of the history.
+"""
+from datetime import date
+
+from cbc.models import ANALYTES, INDICES, INDEX_FIELDS, CompleteBloodCount, Trend
+
+
+WINDOW = 5
+
+TREND_NAMES = ANALYTES + INDICES
+
+FIELDS = ('pk', 'analysis_date') + ANALYTES + tuple(f'blood_smear__{field}' for field in INDEX_FIELDS)
+
+TREND_FIELDS = ['previous', 'days'] + [
+    f'{name}_{suffix}' for name in TREND_NAMES for suffix in ('delta', 'change', 'slope')
+]
+
+
+def slope(points):
+    """
+    Returns the least squares slope of (day, value) points, None for less
+    than two days.
+    """
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def build_trends(rows, start):
+    """
+    Returns trends of rows[start:], rows are (pk, analysis_date, values)
+    of one patient ordered by date, earlier rows are only read.
+    """
+    trends = []
+    for i in range(start, len(rows)):
+        pk, analysis_date, values = rows[i]
+        trend = Trend(cbc_id=pk)
+        if i:
+            previous_pk, previous_date, previous_values = rows[i - 1]
+            trend.previous_id = previous_pk
+            trend.days = (analysis_date - previous_date).days
+            for name, value, previous in zip(TREND_NAMES, values, previous_values):
+                if value is None or previous is None:
+                    continue
+                setattr(trend, f'{name}_delta', value - previous)
+                if previous:
+                    setattr(trend, f'{name}_change', (value - previous) * 100 / previous)
+
+        window = rows[max(0, i - WINDOW + 1):i + 1]
+        for position, name in enumerate(TREND_NAMES):
+            points = [(day.toordinal(), row[position]) for _, day, row in window if row[position] is not None]
+            setattr(trend, f'{name}_slope', slope(points))
+        trends.append(trend)
+    return trends
+
+
+def store_trends(trends):
+    existing = set(Trend.objects.filter(pk__in=[trend.pk for trend in trends]).values_list('pk', flat=True))
+    created = [trend for trend in trends if trend.pk not in existing]
+    updated = [trend for trend in trends if trend.pk in existing]
+    if created:
+        Trend.objects.bulk_create(created)
+    if updated:
+        Trend.objects.bulk_update(updated, TREND_FIELDS)
+
+
+def refresh_trends(user_id, analysis_date, count=WINDOW):
+    """
+    Recomputes and stores trends of `count` analyses of the user from the
+    date on, of all of them when count is None. Returns the number of
+    stored trends, analyses without a patient have none.
+    """
+    if user_id is None:
+        return 0
+    queryset = CompleteBloodCount.objects.filter(user_id=user_id)
+    before = queryset.filter(analysis_date__lt=analysis_date).order_by('-analysis_date', '-id')
+    after = queryset.filter(analysis_date__gte=analysis_date).order_by('analysis_date', 'id')
+
+    rows = list(before.values_list(*FIELDS)[:WINDOW - 1])[::-1]
+    start = len(rows)
+    rows += list(after.values_list(*FIELDS)[:count])
+    if start == len(rows):
+        return 0
+
+    trends = build_trends([(row[0], row[1], row[2:]) for row in rows], start)
+    store_trends(trends)
+    return len(trends)
+
+
+def refresh_analysis_trends(cbc, previous_date=None):
+    """
+    Recomputes trends around a created or updated analysis, also around
+    its previous date when the update moved it.
+    """
+    refresh_trends(cbc.user_id, cbc.analysis_date)
+    if previous_date is not None and previous_date != cbc.analysis_date:
+        refresh_trends(cbc.user_id, previous_date)
+
+
+def refresh_user_trends(user_ids):
+    """
+    Recomputes trends of every analysis of the users.
+    """
+    updated = 0
+    for user_id in set(user_ids) - {None}:
+        updated += refresh_trends(user_id, date.min, None)
+    return updated
+
+
+def trend_payload(trend):
+    """
+    Returns {name: {delta, change, slope}} of the trend, for the API.
+    """
+    return {
+        name: {suffix: getattr(trend, f'{name}_{suffix}') for suffix in ('delta', 'change', 'slope')}
+        for name in TREND_NAMES
+    }
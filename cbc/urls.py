@@ -1,6 +1,11 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.urls import path
 
+from cbc.views.api import SeriesView, CBCPageView
+from cbc.views.export import ExportView
+from cbc.views.search import OutOfRangeSearchView, OutOfRangePageView, OutOfRangeExportView
+from cbc.views.stats import PopulationStatsView
 from cbc.views.general import (
     HomeView,
     CBCListView,
@@ -26,6 +31,15 @@ urlpatterns = [
     path('cbc/charts-diff', login_required(DiffChartsTemplateView.as_view()), name='cbc-charts-diff'),
     path('cbc/charts-index', login_required(IndexChartsTemplateView.as_view()), name='cbc-charts-index'),
 
+    path('cbc/api/list/', login_required(CBCPageView.as_view()), name='cbc-api-list'),
+    path('cbc/api/series/', login_required(SeriesView.as_view()), name='cbc-api-series'),
+    path('cbc/export/', login_required(ExportView.as_view()), name='cbc-export'),
+
+    path('cbc/search/', staff_member_required(OutOfRangeSearchView.as_view()), name='cbc-search'),
+    path('cbc/api/search/', staff_member_required(OutOfRangePageView.as_view()), name='cbc-api-search'),
+    path('cbc/search/export/', staff_member_required(OutOfRangeExportView.as_view()), name='cbc-search-export'),
+    path('cbc/stats/', staff_member_required(PopulationStatsView.as_view()), name='cbc-stats'),
+
     path('cbc/three-dif/create/', ThreeDifCreateView.as_view(), name='three-dif-create'),
     path('cbc/three-dif/<int:pk>', ThreeDifDetailView.as_view(), name='three-dif-detail'),
     path('cbc/three-dif/<int:pk>/update/', login_required(ThreeDifUpdateView.as_view()), name='three-dif-update'),
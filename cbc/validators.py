@@ -0,0 +1,16 @@
+from django.core.exceptions import ValidationError
+
+
+SUM_MIN = 98
+SUM_MAX = 102
+
+
+def validate_sum(value):
+    if value < SUM_MIN or value > SUM_MAX:
+        raise ValidationError('Сумма компонентов лейкоцитарной формулы не равна 100%. Пожалуйста, '
+                              'проверьте введенные значения и повторите попытку.')
+
+
+def duplicate_date_error(date):
+    date_formated = date.strftime('%d.%m.%Y')
+    return ValidationError('Результаты анализа за %s уже добавлены.' % date_formated)
@@ -0,0 +1,55 @@
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.views.generic import View
+
+from cbc.conditional import user_condition
+from cbc.flags import range_flags
+from cbc.forms import SeriesFilterForm
+from cbc.models import CompleteBloodCount
+from cbc.pagination import keyset_page
+from cbc.series import ANALYTES, cached_series
+from cbc.trends import trend_payload
+
+
+@method_decorator(user_condition, name='dispatch')
+class SeriesView(View):
+    def get(self, request, *args, **kwargs):
+        form = SeriesFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        series = cached_series(
+            request.user,
+            date_from=form.cleaned_data['date_from'],
+            date_to=form.cleaned_data['date_to'],
+            max_points=form.cleaned_data['max_points']
+        )
+        return HttpResponse(series, content_type='application/json')
+
+
+class CBCPageView(View):
+    def get(self, request, *args, **kwargs):
+        try:
+            items, cursor = keyset_page(
+                CompleteBloodCount.objects.filter(user=request.user).with_diff().select_related('trend'),
+                request.GET.get('cursor')
+            )
+        except ValueError:
+            return JsonResponse({'errors': {'cursor': ['Неверный курсор страницы.']}}, status=400)
+
+        results = []
+        for item in items:
+            result = {'pk': item.pk, 'date': item.analysis_date.isoformat(), 'type': item.type}
+            for name in ANALYTES:
+                result[name] = getattr(item, name)
+            result['flags'] = range_flags(item)
+            trend = getattr(item, 'trend', None)
+            result['trend'] = trend_payload(trend) if trend else None
+            results.append(result)
+
+        return JsonResponse({
+            'results': results,
+            'next': cursor,
+            'html': render_to_string('cbc/list/cbc_rows.html', {'object_list': items}, request=request)
+        })
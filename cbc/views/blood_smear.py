@@ -1,10 +1,16 @@
-from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, DetailView, UpdateView
 
+from cbc.conditional import analysis_condition
+from cbc.diff_types import TYPE_CODES
+from cbc.flags import analysis_flags, refresh_flags
+from cbc.indices import fill_indices, refresh_indices
 from cbc.models import CompleteBloodCount, BloodSmear
-from range.models import ReferenceRange, IndexRange
+from cbc.trends import refresh_analysis_trends
+from range.lookup import get_reference_range, get_index_range
 
 from cbc.forms import CBCModelForm, BloodSmearFormSet
 
@@ -27,7 +33,7 @@ class BloodSmearCreateView(CreateView):
             context['blood_smear'] = BloodSmearFormSet()
         if user.is_authenticated:
             context['cbc'] = CompleteBloodCount.objects.filter(user=user)
-            context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
+            context['blood_diagram'] = BloodSmear.objects.for_user(user)
         return context
 
     def form_valid(self, form):
@@ -37,21 +43,23 @@ class BloodSmearCreateView(CreateView):
         user = self.request.user
         if form.is_valid():
             with transaction.atomic():
-                cbc.content_type = ContentType.objects.get(app_label='cbc', model='bloodsmear')
-                cbc.object_id = 0
-                cbc.type = 9
+                cbc.type = TYPE_CODES[BloodSmear]
                 if user.is_authenticated:
                     cbc.user = user
                     cbc.age = user.patient.get_age()
                     cbc.sex = user.patient.sex
-                self.object = form.save()
+                smears = []
                 if blood_smear.is_valid():
-                    blood_smear.instance = self.object
-                    blood_smear.save()
-                    fd_object = BloodSmear.objects.get(cbc_id=self.object.id)
-                    cbc.object_id = fd_object.id
+                    blood_smear.instance = cbc
+                    smears = blood_smear.save(commit=False)
+                    fill_indices(smears)
+                cbc.flags = analysis_flags(cbc, smears[0] if smears else None)
                 self.object = form.save()
-        return super(BloodSmearCreateView, self).form_valid(form)
+                for smear in smears:
+                    smear.cbc = self.object
+                    smear.save()
+                refresh_analysis_trends(self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -76,18 +84,22 @@ class BloodSmearUpdateView(UpdateView):
         else:
             context['blood_smear'] = BloodSmearFormSet(instance=self.object)
         if user.is_authenticated:
-            context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
+            context['blood_diagram'] = BloodSmear.objects.for_user(user)
         return context
 
     def form_valid(self, form):
         context = self.get_context_data()
         blood_smear = context['blood_smear']
         if form.is_valid():
+            previous_date = form.initial.get('analysis_date')
             with transaction.atomic():
                 self.object = form.save()
                 if blood_smear.is_valid():
                     blood_smear.instance = self.object
                     blood_smear.save()
+                refresh_indices(BloodSmear.objects.filter(cbc=self.object))
+                refresh_flags(CompleteBloodCount.objects.filter(pk=self.object.pk))
+                refresh_analysis_trends(self.object, previous_date)
         return super(BloodSmearUpdateView, self).form_valid(form)
 
     def get_form_kwargs(self):
@@ -96,6 +108,7 @@ class BloodSmearUpdateView(UpdateView):
         return kwargs
 
 
+@method_decorator(analysis_condition, name='dispatch')
 class BloodSmearDetailView(DetailView):
     model = CompleteBloodCount
     template_name = 'cbc/cbc_detail.html'
@@ -105,21 +118,7 @@ class BloodSmearDetailView(DetailView):
         user = self.request.user
         blood_smear = BloodSmear.objects.get(cbc_id=self.object.id)
         context['blood_smear'] = blood_smear
-        context['index_range'] = IndexRange.objects.filter().last()
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
-        if user.is_authenticated:
-            age = user.patient.get_age()
-            context['range'] = ReferenceRange.objects.get(
-                cbc__sex=user.patient.sex,
-                cbc__age_min__lt=age,
-                cbc__age_max__gt=age,
-                diff__value_type=blood_smear.value_type
-            )
-        else:
-            context['range'] = ReferenceRange.objects.get(
-                cbc__sex=blood_smear.cbc.sex,
-                cbc__age_min__lt=blood_smear.cbc.age,
-                cbc__age_max__gt=blood_smear.cbc.age,
-                diff__value_type=blood_smear.value_type
-            )
+        context['index_range'] = get_index_range()
+        context['blood_diagram'] = BloodSmear.objects.for_user(user)
+        context['range'] = get_reference_range(self.object.sex, self.object.age, blood_smear.value_type)
         return context
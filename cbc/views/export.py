@@ -0,0 +1,16 @@
+from django.http import StreamingHttpResponse
+from django.views.generic import View
+
+from cbc.export import export_csv
+from cbc.models import CompleteBloodCount
+
+
+class ExportView(View):
+    def get(self, request, *args, **kwargs):
+        queryset = CompleteBloodCount.objects.all()
+        if not (request.user.is_staff and request.GET.get('all')):
+            queryset = queryset.filter(user=request.user)
+
+        response = StreamingHttpResponse(export_csv(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="cbc.csv"'
+        return response
@@ -1,10 +1,15 @@
-from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, DetailView, UpdateView
 
+from cbc.conditional import analysis_condition
+from cbc.diff_types import TYPE_CODES
+from cbc.flags import analysis_flags, refresh_flags
 from cbc.models import CompleteBloodCount, FiveDiff, BloodSmear
-from range.models import ReferenceRange
+from cbc.trends import refresh_analysis_trends
+from range.lookup import get_reference_range
 
 from cbc.forms import CBCModelForm, FiveDiffFormSet
 
@@ -27,7 +32,7 @@ class FiveDifCreateView(CreateView):
             context['five_dif'] = FiveDiffFormSet()
         if user.is_authenticated:
             context['cbc'] = CompleteBloodCount.objects.filter(user=user)
-            context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
+            context['blood_diagram'] = BloodSmear.objects.for_user(user)
         return context
 
     def form_valid(self, form):
@@ -36,21 +41,22 @@ class FiveDifCreateView(CreateView):
         cbc = form.instance
         user = self.request.user
         with transaction.atomic():
-            cbc.content_type = ContentType.objects.get(app_label='cbc', model='fivediff')
-            cbc.object_id = 0
-            cbc.type = 5
+            cbc.type = TYPE_CODES[FiveDiff]
             if user.is_authenticated:
                 cbc.user = user
                 cbc.age = user.patient.get_age()
                 cbc.sex = user.patient.sex
-            self.object = form.save()
+            diffs = []
             if five_dif.is_valid():
-                five_dif.instance = self.object
-                five_dif.save()
-                fd_object = FiveDiff.objects.get(cbc_id=self.object.id)
-                cbc.object_id = fd_object.id
+                five_dif.instance = cbc
+                diffs = five_dif.save(commit=False)
+            cbc.flags = analysis_flags(cbc, diffs[0] if diffs else None)
             self.object = form.save()
-        return super(FiveDifCreateView, self).form_valid(form)
+            for diff in diffs:
+                diff.cbc = self.object
+                diff.save()
+            refresh_analysis_trends(self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -75,17 +81,20 @@ class FiveDifUpdateView(UpdateView):
         else:
             context['five_dif'] = FiveDiffFormSet(instance=self.object)
         if user.is_authenticated:
-            context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
+            context['blood_diagram'] = BloodSmear.objects.for_user(user)
         return context
 
     def form_valid(self, form):
         context = self.get_context_data()
         five_dif = context['five_dif']
+        previous_date = form.initial.get('analysis_date')
         with transaction.atomic():
             self.object = form.save()
             if five_dif.is_valid():
                 five_dif.instance = self.object
                 five_dif.save()
+            refresh_flags(CompleteBloodCount.objects.filter(pk=self.object.pk))
+            refresh_analysis_trends(self.object, previous_date)
         return super(FiveDifUpdateView, self).form_valid(form)
 
     def get_form_kwargs(self):
@@ -94,6 +103,7 @@ class FiveDifUpdateView(UpdateView):
         return kwargs
 
 
+@method_decorator(analysis_condition, name='dispatch')
 class FiveDifDetailView(DetailView):
     model = CompleteBloodCount
     template_name = 'cbc/cbc_detail.html'
@@ -103,20 +113,7 @@ class FiveDifDetailView(DetailView):
         user = self.request.user
         five_diff = FiveDiff.objects.get(cbc_id=self.object.id)
         context['five_dif'] = five_diff
+        context['range'] = get_reference_range(self.object.sex, self.object.age, five_diff.value_type)
         if user.is_authenticated:
-            context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
-            age = user.patient.get_age()
-            context['range'] = ReferenceRange.objects.get(
-                cbc__sex=user.patient.sex,
-                cbc__age_min__lt=age,
-                cbc__age_max__gt=age,
-                diff__value_type=five_diff.value_type
-            )
-        else:
-            context['range'] = ReferenceRange.objects.get(
-                cbc__sex=five_diff.cbc.sex,
-                cbc__age_min__lt=five_diff.cbc.age,
-                cbc__age_max__gt=five_diff.cbc.age,
-                diff__value_type=five_diff.value_type
-            )
+            context['blood_diagram'] = BloodSmear.objects.for_user(user)
         return context
@@ -1,9 +1,16 @@
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import DeleteView, ListView, TemplateView
 
-from cbc.models import CompleteBloodCount, BloodSmear, FiveDiff, ThreeDiff
-from range.models import CBCRange, IndexRange
+from cbc.conditional import user_condition
+from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.pagination import keyset_page
+from cbc.series import cached_diff_series
+from cbc.trends import WINDOW, refresh_trends
+from range.lookup import get_cbc_range, get_index_range
 
 
 class CBCListView(ListView):
@@ -11,12 +18,17 @@ class CBCListView(ListView):
     template_name = 'cbc/cbc_list.html'
 
     def get_context_data(self, **kwargs):
-        context = super(CBCListView, self).get_context_data(**kwargs)
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=self.request.user)
+        try:
+            items, cursor = keyset_page(self.object_list, self.request.GET.get('cursor'))
+        except ValueError:
+            raise Http404('Неверный курсор страницы.')
+        context = super(CBCListView, self).get_context_data(object_list=items, **kwargs)
+        context['next_cursor'] = cursor
+        context['blood_diagram'] = BloodSmear.objects.for_user(self.request.user)
         return context
 
     def get_queryset(self):
-        return CompleteBloodCount.objects.filter(user=self.request.user)
+        return CompleteBloodCount.objects.filter(user=self.request.user).with_diff()
 
 
 class CBCDeleteView(DeleteView):
@@ -26,10 +38,19 @@ class CBCDeleteView(DeleteView):
 
     def get_context_data(self, **kwargs):
         context = super(CBCDeleteView, self).get_context_data(**kwargs)
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=self.request.user)
+        context['blood_diagram'] = BloodSmear.objects.for_user(self.request.user)
         return context
 
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            self.object.delete()
+            refresh_trends(self.object.user_id, self.object.analysis_date, WINDOW - 1)
+        return HttpResponseRedirect(success_url)
 
+
+@method_decorator(user_condition, name='dispatch')
 class CommonChartsTemplateView(TemplateView):
     template_name = 'cbc/cbc_chart_common.html'
 
@@ -37,31 +58,29 @@ class CommonChartsTemplateView(TemplateView):
         context = super(CommonChartsTemplateView, self).get_context_data(**kwargs)
         user = self.request.user
         context['cbc'] = CompleteBloodCount.objects.filter(user=user)
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
+        context['blood_diagram'] = cached_diff_series(user)['blood_smear']
         age = user.patient.get_age()
-        context['range'] = CBCRange.objects.filter(
-            sex=user.patient.sex,
-            age_min__lt=age,
-            age_max__gt=age
-        ).first()
+        context['range'] = get_cbc_range(user.patient.sex, age)
         return context
 
 
+@method_decorator(user_condition, name='dispatch')
 class DiffChartsTemplateView(TemplateView):
     template_name = 'cbc/cbc_chart_diff.html'
 
     def get_context_data(self, **kwargs):
         context = super(DiffChartsTemplateView, self).get_context_data(**kwargs)
         user = self.request.user
-        blood_smear = BloodSmear.objects.filter(cbc__user=user)
+        diffs = cached_diff_series(user)
         context['cbc'] = CompleteBloodCount.objects.filter(user=user)
-        context['three_dif'] = ThreeDiff.objects.filter(cbc__user=user)
-        context['five_dif'] = FiveDiff.objects.filter(cbc__user=user)
-        context['blood_smear'] = blood_smear
-        context['blood_diagram'] = blood_smear
+        context['three_dif'] = diffs['three_diff']
+        context['five_dif'] = diffs['five_diff']
+        context['blood_smear'] = diffs['blood_smear']
+        context['blood_diagram'] = diffs['blood_smear']
         return context
 
 
+@method_decorator(user_condition, name='dispatch')
 class IndexChartsTemplateView(TemplateView):
     template_name = 'cbc/cbc_chart_index.html'
 
@@ -69,8 +88,8 @@ class IndexChartsTemplateView(TemplateView):
         context = super(IndexChartsTemplateView, self).get_context_data(**kwargs)
         user = self.request.user
         context['cbc'] = CompleteBloodCount.objects.filter(user=user)
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=user)
-        context['range'] = IndexRange.objects.filter().last()
+        context['blood_diagram'] = cached_diff_series(user)['blood_smear']
+        context['range'] = get_index_range()
         return context
 
 
@@ -0,0 +1,64 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.views.generic import TemplateView, View
+
+from cbc.export import export_csv
+from cbc.flags import flag_names
+from cbc.forms import OutOfRangeSearchForm
+from cbc.pagination import keyset_page
+from cbc.search import out_of_range
+
+
+def search_queryset(form):
+    return out_of_range(**form.cleaned_data)
+
+
+class OutOfRangeSearchView(TemplateView):
+    template_name = 'cbc/cbc_search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super(OutOfRangeSearchView, self).get_context_data(**kwargs)
+        form = OutOfRangeSearchForm(self.request.GET)
+        context['form'] = form
+        if form.is_valid():
+            items, cursor = keyset_page(search_queryset(form))
+            context['object_list'] = items
+            context['next_cursor'] = cursor
+            context['query'] = self.request.GET.urlencode()
+        return context
+
+
+class OutOfRangePageView(View):
+    def get(self, request, *args, **kwargs):
+        form = OutOfRangeSearchForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        try:
+            items, cursor = keyset_page(search_queryset(form), request.GET.get('cursor'))
+        except ValueError:
+            return JsonResponse({'errors': {'cursor': ['Неверный курсор страницы.']}}, status=400)
+
+        results = [{
+            'pk': item.pk,
+            'username': item.user.username if item.user else None,
+            'date': item.analysis_date.isoformat(),
+            'type': item.type,
+            'flags': flag_names(item.flags)
+        } for item in items]
+
+        return JsonResponse({
+            'results': results,
+            'next': cursor,
+            'html': render_to_string('cbc/search/search_rows.html', {'object_list': items}, request=request)
+        })
+
+
+class OutOfRangeExportView(View):
+    def get(self, request, *args, **kwargs):
+        form = OutOfRangeSearchForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        response = StreamingHttpResponse(export_csv(search_queryset(form)), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="cbc-out-of-range.csv"'
+        return response
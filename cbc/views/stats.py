@@ -0,0 +1,24 @@
+from django.views.generic import TemplateView
+
+from cbc.flags import flag_label
+from cbc.stats import STAT_FIELDS, population_stats
+from range.models import CBCRange
+
+
+class PopulationStatsView(TemplateView):
+    template_name = 'cbc/cbc_stats.html'
+
+    def get_context_data(self, **kwargs):
+        context = super(PopulationStatsView, self).get_context_data(**kwargs)
+        sexes = dict(CBCRange.SEX_CHOICES)
+        cohorts = []
+        for cohort in population_stats():
+            rows = [dict(label=flag_label(name), **cohort['stats'][name]) for name, _ in STAT_FIELDS]
+            cohorts.append(dict(
+                sex=sexes.get(cohort['sex'], cohort['sex']),
+                age_min=cohort['age_min'],
+                age_max=cohort['age_max'],
+                rows=rows
+            ))
+        context['cohorts'] = cohorts
+        return context
@@ -37,9 +37,7 @@ class TestViewsPatient(TestCase):
             hematocrit=2,
             sed_rate=2,
             type=2,
-            sum=100,
-            object_id=1,
-            content_type_id=9
+            sum=100
         )
         self.blood_smear = BloodSmear.objects.create(
             cbc=self.cbc_blood_smear,
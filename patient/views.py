@@ -1,11 +1,15 @@
 from django.db import transaction
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.views import generic
 from django.views.generic import TemplateView
 
 from .forms import RegistrationForm, EditProfileForm
 from .models import Patient
+from cbc.cache import invalidate_user
+from cbc.flags import refresh_flags
 from cbc.models import CompleteBloodCount, BloodSmear
+from cbc.stats import invalidate_cohorts
 
 
 class RegisterView(generic.FormView):
@@ -27,15 +31,20 @@ class EditProfileView(generic.UpdateView):
     def get_context_data(self, **kwargs):
         context = super(EditProfileView, self).get_context_data(**kwargs)
         context['cbc'] = CompleteBloodCount.objects.filter(user=self.request.user)
-        context['blood_diagram'] = BloodSmear.objects.filter(cbc__user=self.request.user)
+        context['blood_diagram'] = BloodSmear.objects.for_user(self.request.user)
         return context
 
     def form_valid(self, form):
+        patient = form.instance
+        analyses = CompleteBloodCount.objects.filter(user=self.request.user)
         with transaction.atomic():
-            CompleteBloodCount.objects\
-                .filter(user=self.request.user)\
-                .update(age=self.request.user.patient.get_age(), sex=self.request.user.patient.sex)
-        return super(EditProfileView, self).form_valid(form)
+            cohorts = set(analyses.values_list('sex', 'age').distinct())
+            analyses.update(age=patient.get_age(), sex=patient.sex, updated_at=timezone.now())
+            refresh_flags(analyses)
+            cohorts.add((patient.sex, patient.get_age()))
+            invalidate_user(self.request.user.pk)
+            invalidate_cohorts(cohorts)
+            return super(EditProfileView, self).form_valid(form)
 
 
 class TOSView(TemplateView):
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from .drafts import apply_drafts, estimate_ranges
 from .models import CBCRange, DiffRange, IndexRange, ReferenceRange
 
 
@@ -11,8 +12,51 @@ class CBCAdmin(admin.ModelAdmin):
         ('erythrocyte_min', 'erythrocyte_max'),
         ('hemoglobin_min', 'hemoglobin_max'),
         ('hematocrit_min', 'hematocrit_max'),
-        ('sed_rate_min', 'sed_rate_max')
+        ('sed_rate_min', 'sed_rate_max'),
+        ('is_draft', 'sample_size')
     )
+    readonly_fields = ('sample_size',)
+    list_display = (
+        '__str__', 'is_draft', 'sample_size', 'leukocyte', 'erythrocyte', 'hemoglobin', 'hematocrit', 'sed_rate'
+    )
+    list_filter = ('is_draft', 'sex')
+    ordering = ('sex', 'age_min', 'age_max', 'is_draft')
+    actions = ('estimate', 'apply')
+
+    def bounds(self, obj, name):
+        return f"{getattr(obj, f'{name}_min')} - {getattr(obj, f'{name}_max')}"
+
+    def leukocyte(self, obj):
+        return self.bounds(obj, 'leukocyte')
+    leukocyte.short_description = 'Лейкоциты'
+
+    def erythrocyte(self, obj):
+        return self.bounds(obj, 'erythrocyte')
+    erythrocyte.short_description = 'Эритроциты'
+
+    def hemoglobin(self, obj):
+        return self.bounds(obj, 'hemoglobin')
+    hemoglobin.short_description = 'Гемоглобин'
+
+    def hematocrit(self, obj):
+        return self.bounds(obj, 'hematocrit')
+    hematocrit.short_description = 'Гематокрит'
+
+    def sed_rate(self, obj):
+        return self.bounds(obj, 'sed_rate')
+    sed_rate.short_description = 'СОЭ'
+
+    def estimate(self, request, queryset):
+        # No worker processes inside a request, the estimate_ranges command
+        # estimates all bands in parallel.
+        drafts = estimate_ranges(queryset, workers=1)
+        self.message_user(request, f'Создано черновиков: {len(drafts)}')
+    estimate.short_description = 'Оценить референтные значения по результатам анализов'
+
+    def apply(self, request, queryset):
+        updated = apply_drafts(queryset)
+        self.message_user(request, f'Применено черновиков: {updated}')
+    apply.short_description = 'Применить черновики'
 
 
 class FormulaAdmin(admin.ModelAdmin):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RangeConfig(AppConfig):
     name = 'range'
     verbose_name = 'Референтные значения'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,110 @@
+"""
+Draft reference ranges estimated from stored analyses.
+
+Values of every current CBCRange band are read from the analyses of its
+sex and ages, the bands are estimated with range.estimation in a pool of
+worker processes and the results are stored as draft CBCRange rows next
+to the current ones. Drafts are never used by range.lookup, an admin
+applies them to the current bands after comparing them.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import models, transaction
+
+from cbc.models import ANALYTES, CompleteBloodCount
+from cbc.stats import cohorts, read_columns
+
+from .estimation import estimate_band
+from .models import CBCRange
+
+
+def band_samples(band, ages, chunk_size=2000):
+    """
+    Returns {analyte: values} of the analyses of the band's sex and ages.
+    """
+    queryset = CompleteBloodCount.objects.filter(sex=band.sex, age__in=ages)
+    columns = read_columns(queryset, ANALYTES, chunk_size)
+    return {name: columns[:, position] for position, name in enumerate(ANALYTES)}
+
+
+def draft_values(band, estimates):
+    """
+    Returns {field: value} of the draft, analytes that could not be
+    estimated keep the values of the band. Integer fields are rounded.
+    """
+    values = {}
+    for name in ANALYTES:
+        bounds = estimates.get(name) or (getattr(band, f'{name}_min'), getattr(band, f'{name}_max'))
+        for suffix, value in zip(('min', 'max'), bounds):
+            field = CBCRange._meta.get_field(f'{name}_{suffix}')
+            values[field.name] = round(value) if isinstance(field, models.IntegerField) else round(value, 2)
+    return values
+
+
+def estimate_ranges(bands=None, workers=None):
+    """
+    Estimates current bands, all of them when not given, and stores the
+    results as drafts replacing earlier ones. Bands are estimated in
+    `workers` processes while the next band is read, in this process when
+    it is 1. Returns the drafts, bands without a single estimated analyte
+    get none.
+    """
+    bands = CBCRange.objects.all() if bands is None else bands
+    bands = list(bands.filter(is_draft=False).order_by('sex', 'age_min', 'age_max'))
+    ages = {(sex, age_min, age_max): band_ages for sex, age_min, age_max, band_ages in cohorts()}
+
+    executor = None
+    if workers != 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    jobs = []
+    try:
+        for band in bands:
+            samples = band_samples(band, ages.get((band.sex, band.age_min, band.age_max), []))
+            size = len(samples[ANALYTES[0]])
+            if executor is None:
+                jobs.append((band, size, estimate_band(samples)))
+            else:
+                jobs.append((band, size, executor.submit(estimate_band, samples)))
+        if executor is not None:
+            jobs = [(band, size, future.result()) for band, size, future in jobs]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    drafts = []
+    with transaction.atomic():
+        for band, size, estimates in jobs:
+            if not any(estimates.values()):
+                continue
+            values = draft_values(band, estimates)
+            values['sample_size'] = size
+            draft, _ = CBCRange.objects.update_or_create(
+                sex=band.sex, age_min=band.age_min, age_max=band.age_max, is_draft=True,
+                defaults=values
+            )
+            drafts.append(draft)
+    return drafts
+
+
+def apply_drafts(drafts):
+    """
+    Copies values of the drafts to their current bands and deletes the
+    drafts, returns the number of updated bands.
+    """
+    fields = [f'{name}_{suffix}' for name in ANALYTES for suffix in ('min', 'max')]
+    updated = 0
+    with transaction.atomic():
+        for draft in drafts.filter(is_draft=True):
+            band = CBCRange.objects.filter(
+                sex=draft.sex, age_min=draft.age_min, age_max=draft.age_max, is_draft=False
+            ).first()
+            if band is None:
+                continue
+            for field in fields:
+                setattr(band, field, getattr(draft, field))
+            band.save()
+            draft.delete()
+            updated += 1
+    return updated
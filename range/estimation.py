@@ -0,0 +1,126 @@
+"""
+Indirect estimation of reference intervals.
+
+The method of Bhattacharya: most analyses of a band come from healthy
+patients, so the histogram of a value has a Gaussian component around its
+mode. For a Gaussian with bins of width h the difference of log counts of
+adjacent bins is a line of slope -h/sd² crossing zero at the mean. The
+line is fitted by weighted least squares over every window of consecutive
+bins around the mode at once. The window with the best R², weighted
+towards longer windows, gives the mean and SD and the interval is
+mean ± 1.96 SD. Skewed analytes are estimated on the log scale.
+
+The module only depends on NumPy, so bands can be estimated in worker
+processes that never touch the database.
+"""
+import numpy as np
+
+
+Z = 1.959964
+
+MIN_SAMPLE = 200
+
+MIN_POINTS = 4
+
+BINS_PER_SD = 4
+
+LOG_ANALYTES = ('leukocyte', 'sed_rate')
+
+
+def cumulative(values):
+    return np.concatenate(([0.0], np.cumsum(values)))
+
+
+def histogram(values, bins_per_sd=BINS_PER_SD):
+    """
+    Returns counts and edges of bins of about SD / bins_per_sd around the
+    median, in whole steps of the resolution the values are stored with.
+    Values further than four SD from the median are left out.
+    """
+    q1, median, q3 = np.percentile(values, (25, 50, 75))
+    spread = (q3 - q1) / 1.349
+    steps = np.diff(np.unique(values))
+    if spread <= 0 or not steps.size:
+        return None, None
+
+    resolution = steps.min()
+    width = resolution * max(1, round(spread / bins_per_sd / resolution))
+    low = np.floor((median - 4 * spread) / resolution) * resolution - resolution / 2
+    edges = np.arange(low, median + 4 * spread + width, width)
+    return np.histogram(values, edges)
+
+
+def bhattacharya(values, bins_per_sd=BINS_PER_SD, min_points=MIN_POINTS):
+    """
+    Returns (mean, sd) of the Gaussian component of the values, None when
+    there are too few values or no window around the mode falls.
+    """
+    values = values[np.isfinite(values)]
+    if values.size < MIN_SAMPLE:
+        return None
+    counts, edges = histogram(values, bins_per_sd)
+    if counts is None:
+        return None
+
+    both = (counts[:-1] > 0) & (counts[1:] > 0)
+    x = edges[1:-1][both]
+    before = counts[:-1][both].astype(float)
+    after = counts[1:][both].astype(float)
+    y = np.log(after) - np.log(before)
+    w = before * after / (before + after)
+    if x.size < min_points:
+        return None
+
+    s, sx, sy = cumulative(w), cumulative(w * x), cumulative(w * y)
+    sxx, sxy, syy = cumulative(w * x * x), cumulative(w * x * y), cumulative(w * y * y)
+    start, stop = np.triu_indices(x.size + 1, min_points)
+    sw, swx, swy = s[stop] - s[start], sx[stop] - sx[start], sy[stop] - sy[start]
+    swxx, swxy, swyy = sxx[stop] - sxx[start], sxy[stop] - sxy[start], syy[stop] - syy[start]
+
+    denominator = sw * swxx - swx * swx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sw * swxy - swx * swy) / denominator
+        intercept = (swy - slope * swx) / sw
+        mean = -intercept / slope
+        residual = (swyy - 2 * intercept * swy - 2 * slope * swxy
+                    + intercept * intercept * sw + 2 * intercept * slope * swx + slope * slope * swxx)
+        r2 = 1 - residual / (swyy - swy * swy / sw)
+
+    mode = edges[np.argmax(counts)] + (edges[1] - edges[0]) / 2
+    valid = (
+        (denominator > 0) & (slope < 0)
+        & (x[start] <= mode) & (x[stop - 1] >= mode)
+        & (mean >= x[start]) & (mean <= x[stop - 1])
+    )
+    if not valid.any():
+        return None
+    best = np.argmax(np.where(valid, r2 * np.log(stop - start), -np.inf))
+
+    width = edges[1] - edges[0]
+    return float(mean[best]), float(np.sqrt(-width / slope[best]))
+
+
+def reference_interval(name, values):
+    """
+    Returns (low, high) estimated for the analyte, None when it cannot be
+    estimated.
+    """
+    log = name in LOG_ANALYTES
+    if log:
+        values = np.log1p(values[values >= 0])
+    estimate = bhattacharya(values)
+    if estimate is None:
+        return None
+
+    mean, sd = estimate
+    low, high = mean - Z * sd, mean + Z * sd
+    if log:
+        low, high = np.expm1(low), np.expm1(high)
+    return max(float(low), 0.0), float(high)
+
+
+def estimate_band(samples):
+    """
+    Returns {name: (low, high) or None} for {name: values} of a band.
+    """
+    return {name: reference_interval(name, values) for name, values in samples.items()}
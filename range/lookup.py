@@ -0,0 +1,96 @@
+"""
+Process-local index of reference ranges.
+
+Ranges are loaded once and resolved with bisect by age, draft ranges are
+never used. A band covers ages from age_min inclusive to age_max exclusive,
+so adjacent bands never share an age. An age equal to age_max of a band is
+only resolved to that band when no other band covers it, e.g. the upper age
+of the last band.
+"""
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+
+from .models import CBCRange, IndexRange, ReferenceRange
+
+
+class AgeBands:
+    def __init__(self, items):
+        items = sorted(items, key=lambda item: (item[0], item[1]))
+        self.starts = [age_min for age_min, _, _ in items]
+        self.ends = [age_max for _, age_max, _ in items]
+        self.values = [value for _, _, value in items]
+        self.reach = []
+        for age_max in self.ends:
+            self.reach.append(max(age_max, self.reach[-1]) if self.reach else age_max)
+
+    def find(self, age):
+        i = bisect_right(self.starts, age) - 1
+        closed = None
+        while i >= 0 and self.reach[i] >= age:
+            if age < self.ends[i]:
+                return self.values[i]
+            if age == self.ends[i] and closed is None:
+                closed = self.values[i]
+            i -= 1
+        return closed
+
+
+class RangeIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    def _load(self):
+        reference = defaultdict(list)
+        for item in ReferenceRange.objects.filter(cbc__is_draft=False).select_related('cbc', 'diff'):
+            reference[(item.cbc.sex, item.diff.value_type)].append((item.cbc.age_min, item.cbc.age_max, item))
+
+        cbc = defaultdict(list)
+        for item in CBCRange.objects.filter(is_draft=False):
+            cbc[item.sex].append((item.age_min, item.age_max, item))
+
+        return {
+            'reference': {key: AgeBands(items) for key, items in reference.items()},
+            'cbc': {key: AgeBands(items) for key, items in cbc.items()},
+            'index': IndexRange.objects.last()
+        }
+
+    def _get(self):
+        data = self._data
+        if data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._load()
+                data = self._data
+        return data
+
+    def reference_range(self, sex, age, value_type):
+        bands = self._get()['reference'].get((sex, value_type))
+        return bands.find(age) if bands else None
+
+    def cbc_range(self, sex, age):
+        bands = self._get()['cbc'].get(sex)
+        return bands.find(age) if bands else None
+
+    def index_range(self):
+        return self._get()['index']
+
+
+range_index = RangeIndex()
+
+
+def get_reference_range(sex, age, value_type):
+    return range_index.reference_range(sex, age, value_type)
+
+
+def get_cbc_range(sex, age):
+    return range_index.cbc_range(sex, age)
+
+
+def get_index_range():
+    return range_index.index_range()
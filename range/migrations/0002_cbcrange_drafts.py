@@ -0,0 +1,27 @@
+# Generated by Django 2.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('range', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cbcrange',
+            name='is_draft',
+            field=models.BooleanField(default=False, verbose_name='Черновик'),
+        ),
+        migrations.AddField(
+            model_name='cbcrange',
+            name='sample_size',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Размер выборки'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cbcrange',
+            unique_together={('sex', 'age_min', 'age_max', 'is_draft')},
+        ),
+    ]
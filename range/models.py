@@ -53,13 +53,24 @@ class CBCRange(models.Model):
     sed_rate_max = models.IntegerField(
         verbose_name=""
     )
+    is_draft = models.BooleanField(
+        verbose_name="Черновик",
+        default=False
+    )
+    sample_size = models.IntegerField(
+        verbose_name="Размер выборки",
+        null=True,
+        blank=True
+    )
 
     class Meta:
-        unique_together = ('sex', 'age_min', 'age_max')
+        unique_together = ('sex', 'age_min', 'age_max', 'is_draft')
         verbose_name = "Общий анализ крови"
         verbose_name_plural = "Общий анализ крови"
 
     def __str__(self):
+        if self.is_draft:
+            return f"{self.sex}: {self.age_min} - {self.age_max} (черновик)"
         return f"{self.sex}: {self.age_min} - {self.age_max}"
 
 
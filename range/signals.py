@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .lookup import range_index
+from .models import CBCRange, DiffRange, IndexRange, ReferenceRange
+
+
+@receiver(post_save, sender=CBCRange)
+@receiver(post_save, sender=DiffRange)
+@receiver(post_save, sender=IndexRange)
+@receiver(post_save, sender=ReferenceRange)
+@receiver(post_delete, sender=CBCRange)
+@receiver(post_delete, sender=DiffRange)
+@receiver(post_delete, sender=IndexRange)
+@receiver(post_delete, sender=ReferenceRange)
+def invalidate_range_index(sender, **kwargs):
+    range_index.invalidate()
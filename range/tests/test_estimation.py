@@ -0,0 +1,111 @@
+import datetime
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from cbc.models import CompleteBloodCount
+from range.drafts import apply_drafts, estimate_ranges
+from range.estimation import bhattacharya, reference_interval
+from range.lookup import range_index, get_cbc_range
+from range.models import CBCRange
+
+
+def mixture(generator, size, healthy, diseased, share=0.85, decimals=1):
+    count = int(size * share)
+    values = np.concatenate([generator.normal(*healthy, count), generator.normal(*diseased, size - count)])
+    return values.round(decimals)
+
+
+class TestEstimation(TestCase):
+
+    def setUp(self):
+        self.generator = np.random.default_rng(7)
+        self.addCleanup(range_index.invalidate)
+
+        self.band = CBCRange.objects.create(
+            sex='male', age_min=18, age_max=60,
+            leukocyte_min=4, leukocyte_max=9,
+            erythrocyte_min=3.9, erythrocyte_max=5.5,
+            hemoglobin_min=120, hemoglobin_max=160,
+            hematocrit_min=36, hematocrit_max=48,
+            sed_rate_min=2, sed_rate_max=15
+        )
+
+    def tearDown(self):
+        CompleteBloodCount.objects.all().delete()
+        CBCRange.objects.all().delete()
+
+    def create_analyses(self, size):
+        columns = dict(
+            leukocyte=np.exp(self.generator.normal(np.log(6), 0.25, size)).round(1),
+            erythrocyte=mixture(self.generator, size, (4.8, 0.35), (3.6, 0.4), decimals=2),
+            hemoglobin=mixture(self.generator, size, (145, 9), (105, 12), decimals=0),
+            hematocrit=mixture(self.generator, size, (43, 2.5), (34, 3)),
+            sed_rate=np.exp(self.generator.normal(np.log(7), 0.5, size)).round()
+        )
+        start = datetime.date(2000, 1, 1)
+        CompleteBloodCount.objects.bulk_create([
+            CompleteBloodCount(
+                sex='male', age=18 + i % 42, analysis_date=start + datetime.timedelta(days=i),
+                type=9, sum=100, **{name: float(values[i]) for name, values in columns.items()}
+            )
+            for i in range(size)
+        ])
+
+    def test_bhattacharya(self):
+        values = mixture(self.generator, 20000, (140, 10), (100, 15), decimals=0)
+        mean, sd = bhattacharya(values)
+        self.assertAlmostEqual(mean, 140, delta=2)
+        self.assertAlmostEqual(sd, 10, delta=1.5)
+
+        self.assertIsNone(bhattacharya(values[:100]))
+        self.assertIsNone(bhattacharya(np.full(1000, 5.0)))
+
+        low, high = reference_interval('leukocyte', np.exp(self.generator.normal(np.log(6), 0.25, 20000)))
+        self.assertAlmostEqual(low, 3.7, delta=0.5)
+        self.assertAlmostEqual(high, 9.8, delta=1)
+
+    def test_estimate_ranges(self):
+        self.create_analyses(3000)
+
+        drafts = estimate_ranges(workers=1)
+        self.assertEqual(len(drafts), 1)
+        draft = drafts[0]
+        self.assertTrue(draft.is_draft)
+        self.assertEqual(draft.sample_size, 3000)
+        self.assertAlmostEqual(draft.hemoglobin_min, 127, delta=5)
+        self.assertAlmostEqual(draft.hemoglobin_max, 163, delta=5)
+        self.assertIsInstance(draft.hemoglobin_min, int)
+        self.assertEqual(get_cbc_range('male', 30), self.band)
+
+        self.assertEqual(estimate_ranges(workers=1)[0].pk, draft.pk)
+        self.assertEqual(CBCRange.objects.filter(is_draft=True).count(), 1)
+
+        self.assertEqual(apply_drafts(CBCRange.objects.all()), 1)
+        self.band.refresh_from_db()
+        self.assertEqual(self.band.hemoglobin_min, draft.hemoglobin_min)
+        self.assertFalse(CBCRange.objects.filter(is_draft=True).exists())
+
+    def test_estimate_ranges_in_processes(self):
+        self.create_analyses(600)
+        draft = estimate_ranges(workers=2)[0]
+        self.assertEqual(draft.sample_size, 600)
+        self.assertEqual(draft.leukocyte_min, estimate_ranges(workers=1)[0].leukocyte_min)
+
+    def test_estimate_without_analyses(self):
+        self.assertEqual(estimate_ranges(workers=1), [])
+
+    def test_estimate_action(self):
+        self.create_analyses(600)
+        user = User.objects.create_superuser(username='admin', password='qwerty123', email='admin@gmail.com')
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('admin:range_cbcrange_changelist'), {
+            'action': 'estimate',
+            '_selected_action': [self.band.pk]
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(CBCRange.objects.get(is_draft=True).sample_size, 600)
+        user.delete()
@@ -0,0 +1,103 @@
+from django.test import TestCase
+
+from range.lookup import range_index, get_cbc_range, get_reference_range, get_index_range
+from range.models import CBCRange, DiffRange, ReferenceRange
+
+
+class TestLookupRange(TestCase):
+
+    def create_cbc_range(self, age_min, age_max, sex='male'):
+        return CBCRange.objects.create(
+            sex=sex,
+            age_min=age_min,
+            age_max=age_max,
+            leukocyte_min=1,
+            leukocyte_max=2,
+            erythrocyte_min=1,
+            erythrocyte_max=2,
+            hemoglobin_min=1,
+            hemoglobin_max=2,
+            hematocrit_min=1,
+            hematocrit_max=2,
+            sed_rate_min=1,
+            sed_rate_max=2
+        )
+
+    def setUp(self):
+        self.cbc_child = self.create_cbc_range(0, 18)
+        self.cbc_adult = self.create_cbc_range(18, 60)
+        self.cbc_senior = self.create_cbc_range(60, 120)
+        self.diff_range = DiffRange.objects.create(
+            age_min=0,
+            age_max=120,
+            value_type='relative',
+            promyelocyte_min=1,
+            promyelocyte_max=2,
+            myelocyte_min=1,
+            myelocyte_max=2,
+            metamyelocyte_min=1,
+            metamyelocyte_max=2,
+            banded_neutrophil_min=1,
+            banded_neutrophil_max=2,
+            segmented_neutrophil_min=1,
+            segmented_neutrophil_max=2,
+            neutrophil_min=1,
+            neutrophil_max=2,
+            lymphocyte_min=1,
+            lymphocyte_max=2,
+            monocyte_min=1,
+            monocyte_max=2,
+            eosinophil_min=1,
+            eosinophil_max=2,
+            basophil_min=1,
+            basophil_max=2,
+            plasma_cell_min=1,
+            plasma_cell_max=2
+        )
+        self.reference_child = ReferenceRange.objects.create(cbc=self.cbc_child, diff=self.diff_range)
+        self.reference_adult = ReferenceRange.objects.create(cbc=self.cbc_adult, diff=self.diff_range)
+
+    def tearDown(self):
+        range_index.invalidate()
+
+    def test_lookup_cbc_range_boundaries(self):
+        self.assertEqual(get_cbc_range('male', 0), self.cbc_child)
+        self.assertEqual(get_cbc_range('male', 17), self.cbc_child)
+        self.assertEqual(get_cbc_range('male', 18), self.cbc_adult)
+        self.assertEqual(get_cbc_range('male', 60), self.cbc_senior)
+        self.assertEqual(get_cbc_range('male', 120), self.cbc_senior)
+        self.assertIsNone(get_cbc_range('male', 121))
+        self.assertIsNone(get_cbc_range('female', 30))
+
+    def test_lookup_reference_range(self):
+        self.assertEqual(get_reference_range('male', 10, 'relative'), self.reference_child)
+        self.assertEqual(get_reference_range('male', 18, 'relative'), self.reference_adult)
+        self.assertEqual(get_reference_range('male', 60, 'relative'), self.reference_adult)
+        self.assertIsNone(get_reference_range('male', 61, 'relative'))
+        self.assertIsNone(get_reference_range('male', 30, 'absolute'))
+
+    def test_lookup_without_queries(self):
+        get_reference_range('male', 30, 'relative')
+
+        with self.assertNumQueries(0):
+            reference_range = get_reference_range('male', 30, 'relative')
+            self.assertEqual(reference_range.cbc.leukocyte_max, 2)
+            self.assertEqual(reference_range.diff.monocyte_max, 2)
+            get_cbc_range('male', 30)
+            get_index_range()
+
+    def test_lookup_invalidated_on_save(self):
+        self.assertIsNone(get_cbc_range('female', 30))
+
+        cbc_range = self.create_cbc_range(18, 60, sex='female')
+        self.assertEqual(get_cbc_range('female', 30), cbc_range)
+
+        cbc_range.age_max = 25
+        cbc_range.save()
+        self.assertIsNone(get_cbc_range('female', 30))
+
+        cbc_range.age_max = 60
+        cbc_range.save()
+
+        cbc_range.delete()
+        self.assertIsNone(get_cbc_range('female', 30))
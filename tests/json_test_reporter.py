@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+from django.test.runner import DiscoverRunner
+
+
+measurements = []
+
+
+def record(**values):
+    """
+    Adds a measurement to the report, e.g. query count and time of a view.
+    """
+    measurements.append(values)
+
+
+class JsonTestReporter(DiscoverRunner):
+    """
+    Runs tests as usual and writes outcomes with recorded measurements to
+    the JSON file from JSON_REPORT, reports/tests.json by default.
+    """
+    report_path = os.environ.get('JSON_REPORT', os.path.join('reports', 'tests.json'))
+
+    def run_suite(self, suite, **kwargs):
+        start = time.perf_counter()
+        result = super().run_suite(suite, **kwargs)
+
+        report = {
+            'tests': result.testsRun,
+            'failures': [test.id() for test, _ in result.failures],
+            'errors': [test.id() for test, _ in result.errors],
+            'skipped': [test.id() for test, _ in result.skipped],
+            'time': round(time.perf_counter() - start, 3),
+            'measurements': measurements
+        }
+        directory = os.path.dirname(self.report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        return result